@@ -62,8 +62,13 @@ class TrainingImageController
 
         $this->ensureUploadDir();
         $allowedExt = ['jpg', 'jpeg', 'png', 'gif'];
+        $perceptualHashes = is_array($_POST['perceptual_hash'] ?? null) ? $_POST['perceptual_hash'] : [];
+        $nearDuplicateDistance = max(0, (int) ($_POST['near_duplicate_distance'] ?? 0));
         $uploadedCount = 0;
         $storedFiles = [];
+        $duplicates = [];
+        // Hash perseptual yang sudah diterima di request ini (id => hash), dicek sebelum query database.
+        $acceptedHashes = [];
 
         foreach ($files as $file) {
             if ($file['error'] !== UPLOAD_ERR_OK) {
@@ -79,17 +84,44 @@ class TrainingImageController
                 continue;
             }
 
-            $filename = sprintf(
-                '%s_%s_%s_%s.%s',
-                $kodePart,
-                $label,
-                date('Ymd_His'),
-                bin2hex(random_bytes(3)),
-                $ext
-            );
+            // Penyimpanan content-addressed: nama file = sha256 isi file.
+            $contentHash = hash_file('sha256', $file['tmp_name']);
+            $existing = $this->trainingImages->findByContentHash($contentHash, $kodePart);
+            if ($existing) {
+                $duplicates[] = [
+                    'original_name' => $file['name'],
+                    'reason' => 'duplicate',
+                    'match_id' => (int) $existing['id'],
+                    'distance' => 0,
+                ];
+                continue;
+            }
+
+            $perceptualHash = $perceptualHashes[$file['name']] ?? null;
+            if (!is_string($perceptualHash) || strlen($perceptualHash) !== 16 || !ctype_xdigit($perceptualHash)) {
+                $perceptualHash = null;
+            }
+            if ($perceptualHash !== null && $nearDuplicateDistance > 0) {
+                $near = $this->findNearDuplicateInBatch($acceptedHashes, $perceptualHash, $nearDuplicateDistance)
+                    ?? $this->trainingImages->findNearDuplicate($kodePart, $perceptualHash, $nearDuplicateDistance);
+                if ($near) {
+                    $duplicates[] = [
+                        'original_name' => $file['name'],
+                        'reason' => 'near_duplicate',
+                        'match_id' => (int) $near['id'],
+                        'distance' => (int) $near['distance'],
+                    ];
+                    continue;
+                }
+            }
+
+            $filename = $contentHash . '.' . $ext;
             $targetPath = $this->uploadDir . DIRECTORY_SEPARATOR . $filename;
 
-            if (!move_uploaded_file($file['tmp_name'], $targetPath)) {
+            if (is_file($targetPath)) {
+                // Isi yang sama sudah tersimpan (untuk part lain): cukup tambah referensi baru.
+                @unlink($file['tmp_name']);
+            } elseif (!move_uploaded_file($file['tmp_name'], $targetPath)) {
                 continue;
             }
 
@@ -98,21 +130,42 @@ class TrainingImageController
                 'kode_part' => $kodePart,
                 'filename' => $filename,
                 'file_url' => $this->publicPrefix . '/' . $filename,
+                'content_hash' => $contentHash,
+                'perceptual_hash' => $perceptualHash,
                 'label' => $label,
                 'note' => $note !== '' ? $note : null,
                 'uploaded_by' => AuthController::adminId(),
             ];
 
-            $imageId = $this->trainingImages->create($record);
+            try {
+                $imageId = $this->trainingImages->create($record);
+            } catch (PDOException $e) {
+                if (!TrainingImage::isDuplicateKey($e)) {
+                    throw $e;
+                }
+                // Request paralel lain baru saja menyimpan isi yang sama; file di disk dipakai bersama.
+                $existing = $this->trainingImages->findByContentHash($contentHash, $kodePart);
+                $duplicates[] = [
+                    'original_name' => $file['name'],
+                    'reason' => 'duplicate',
+                    'match_id' => $existing ? (int) $existing['id'] : null,
+                    'distance' => 0,
+                ];
+                continue;
+            }
             $uploadedCount++;
+            if ($perceptualHash !== null) {
+                $acceptedHashes[$imageId] = $perceptualHash;
+            }
             $storedFiles[] = [
                 'id' => $imageId,
+                'original_name' => $file['name'],
                 'filename' => $filename,
                 'url' => $record['file_url'],
             ];
         }
 
-        if ($uploadedCount === 0) {
+        if ($uploadedCount === 0 && empty($duplicates)) {
             json_response([
                 'status' => 'error',
                 'message' => 'Tidak ada gambar valid yang berhasil diupload'
@@ -124,6 +177,7 @@ class TrainingImageController
             'message' => "Berhasil upload {$uploadedCount} gambar",
             'uploaded' => $uploadedCount,
             'files' => $storedFiles,
+            'duplicates' => $duplicates,
         ], 201);
     }
 
@@ -150,6 +204,9 @@ class TrainingImageController
             'total' => $stats['total'],
             'asli' => $stats['asli'],
             'palsu' => $stats['palsu'],
+            'unique_total' => $stats['unique_total'],
+            'unique_asli' => $stats['unique_asli'],
+            'unique_palsu' => $stats['unique_palsu'],
         ]);
     }
 
@@ -165,21 +222,45 @@ class TrainingImageController
         }
 
         $filename = $image['filename'] ?? basename($image['file_url'] ?? '');
-        if ($filename) {
+        $this->trainingImages->delete($id);
+
+        // File content-addressed bisa dipakai beberapa baris: hapus hanya bila referensi terakhir.
+        if ($filename && $this->trainingImages->countByFilename($filename) === 0) {
             $filePath = $this->uploadDir . DIRECTORY_SEPARATOR . $filename;
             if (is_file($filePath)) {
                 @unlink($filePath);
             }
         }
 
-        $this->trainingImages->delete($id);
-
         json_response([
             'status' => 'success',
             'message' => 'Gambar berhasil dihapus'
         ]);
     }
 
+    private function findNearDuplicateInBatch(array $acceptedHashes, string $perceptualHash, int $maxDistance): ?array
+    {
+        $best = null;
+        foreach ($acceptedHashes as $imageId => $acceptedHash) {
+            $distance = $this->hammingDistance($acceptedHash, $perceptualHash);
+            if ($distance <= $maxDistance && ($best === null || $distance < $best['distance'])) {
+                $best = ['id' => $imageId, 'distance' => $distance];
+            }
+        }
+        return $best;
+    }
+
+    private function hammingDistance(string $left, string $right): int
+    {
+        // Hash 64-bit dalam hex dibandingkan per 32-bit agar tidak melewati batas integer bertanda PHP.
+        $distance = 0;
+        foreach ([0, 8] as $offset) {
+            $xor = hexdec(substr($left, $offset, 8)) ^ hexdec(substr($right, $offset, 8));
+            $distance += substr_count(decbin($xor), '1');
+        }
+        return $distance;
+    }
+
     private function ensureUploadDir(): void
     {
         if (!is_dir($this->uploadDir)) {
@@ -0,0 +1,11 @@
+-- Index lookup balik dari payload QR / kode hologram ke sparepart.
+-- Import with: mysql -u root -p honda_spareparts < spareparts_security_code_indexes.sql
+--
+-- Verifikasi Flask memetakan hasil decode QR (mis. QR-BEAT-001) dan kode
+-- hologram langsung ke kode part; tanpa index ini fallback query-nya full scan.
+
+USE honda_spareparts;
+
+ALTER TABLE spareparts
+    ADD INDEX idx_spareparts_qr_code (qr_code),
+    ADD INDEX idx_spareparts_hologram_code (hologram_code);
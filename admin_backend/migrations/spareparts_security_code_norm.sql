@@ -0,0 +1,17 @@
+-- Kolom ternormalisasi untuk lookup balik payload QR / kode hologram.
+-- Import with: mysql -u root -p honda_spareparts < spareparts_security_code_norm.sql
+--
+-- Jalankan setelah spareparts_security_code_indexes.sql. Kolom qr_code dan
+-- hologram_code disimpan mentah, sedangkan Flask membandingkan payload yang
+-- sudah di-UPPER + TRIM; kolom STORED generated di bawah menyimpan bentuk yang
+-- sama sehingga fallback query tetap memakai index biasa (MySQL 5.7+ / MariaDB 10.2+).
+
+USE honda_spareparts;
+
+ALTER TABLE spareparts
+    ADD COLUMN qr_code_norm VARCHAR(80) GENERATED ALWAYS AS (UPPER(TRIM(qr_code))) STORED,
+    ADD COLUMN hologram_code_norm VARCHAR(80) GENERATED ALWAYS AS (UPPER(TRIM(hologram_code))) STORED,
+    ADD INDEX idx_spareparts_qr_code_norm (qr_code_norm),
+    ADD INDEX idx_spareparts_hologram_code_norm (hologram_code_norm),
+    DROP INDEX idx_spareparts_qr_code,
+    DROP INDEX idx_spareparts_hologram_code;
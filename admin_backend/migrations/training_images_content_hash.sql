@@ -0,0 +1,17 @@
+-- Tambah kolom hash untuk penyimpanan gambar training content-addressed.
+-- Import with: mysql -u root -p honda_spareparts < training_images_content_hash.sql
+--
+-- content_hash  : sha256 isi file (nama file baru = <content_hash>.<ext>)
+-- perceptual_hash: dHash 64-bit dari proxy Flask, untuk deteksi near-duplicate
+--
+-- Baris lama tetap memakai nama file lamanya; isi hash-nya dengan
+-- `flask backfill-training-hashes` setelah migrasi ini dijalankan.
+
+USE honda_spareparts;
+
+ALTER TABLE training_images
+    ADD COLUMN content_hash CHAR(64) NULL AFTER file_url,
+    ADD COLUMN perceptual_hash BIGINT UNSIGNED NULL AFTER content_hash,
+    ADD INDEX idx_training_content_hash (content_hash, kode_part),
+    ADD INDEX idx_training_kode_phash (kode_part, perceptual_hash),
+    ADD INDEX idx_training_filename (filename);
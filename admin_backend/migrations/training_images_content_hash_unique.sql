@@ -0,0 +1,24 @@
+-- Jadikan (content_hash, kode_part) UNIQUE agar dedupe tidak bergantung pada check-then-insert.
+-- Import with: mysql -u root -p honda_spareparts < training_images_content_hash_unique.sql
+--
+-- Jalankan setelah training_images_content_hash.sql. Chunk dari satu batch upload
+-- diteruskan paralel, sehingga dua request bisa sama-sama lolos pengecekan lalu
+-- menyisipkan file identik. Duplikat yang sudah terlanjur ada dipertahankan
+-- barisnya, hanya content_hash-nya dikosongkan (NULL boleh berulang di index UNIQUE).
+
+USE honda_spareparts;
+
+UPDATE training_images ti
+JOIN (
+    SELECT content_hash, kode_part, MIN(id) AS keep_id
+    FROM training_images
+    WHERE content_hash IS NOT NULL
+    GROUP BY content_hash, kode_part
+    HAVING COUNT(*) > 1
+) dup ON dup.content_hash = ti.content_hash AND dup.kode_part = ti.kode_part
+SET ti.content_hash = NULL
+WHERE ti.id <> dup.keep_id;
+
+ALTER TABLE training_images
+    DROP INDEX idx_training_content_hash,
+    ADD UNIQUE INDEX uq_training_content_hash (content_hash, kode_part);
@@ -0,0 +1,25 @@
+-- Opt-in: ubah verification_logs menjadi tabel berpartisi per bulan.
+-- Import with: mysql -u root -p honda_spareparts < verification_logs_partitioning.sql
+--
+-- MySQL tidak mengizinkan foreign key pada tabel berpartisi dan mewajibkan kolom
+-- partisi menjadi bagian dari setiap unique key, sehingga FK ke spareparts dilepas
+-- dan primary key menjadi (id, created_at).
+--
+-- Partisi awal menampung seluruh data lama; sesuaikan batasnya dengan bulan berjalan.
+-- Setelah itu log_storage.py (flask maintain-logs / otomatis dari penulis log)
+-- menambah partisi bulan berikutnya dan me-rollup + drop partisi yang melewati retensi.
+
+USE honda_spareparts;
+
+ALTER TABLE verification_logs DROP FOREIGN KEY fk_verif_sparepart;
+
+ALTER TABLE verification_logs
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at);
+
+ALTER TABLE verification_logs
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+        PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+        PARTITION pmax VALUES LESS THAN MAXVALUE
+    );
@@ -10,12 +10,14 @@ class TrainingImage
 
     public function create(array $data): int
     {
-        $stmt = $this->db->prepare('INSERT INTO training_images (sparepart_id, kode_part, filename, file_url, label, note, uploaded_by) VALUES (:sparepart_id, :kode_part, :filename, :file_url, :label, :note, :uploaded_by)');
+        $stmt = $this->db->prepare('INSERT INTO training_images (sparepart_id, kode_part, filename, file_url, content_hash, perceptual_hash, label, note, uploaded_by) VALUES (:sparepart_id, :kode_part, :filename, :file_url, :content_hash, CAST(CONV(:perceptual_hash, 16, 10) AS UNSIGNED), :label, :note, :uploaded_by)');
         $stmt->execute([
             'sparepart_id' => $data['sparepart_id'],
             'kode_part' => $data['kode_part'],
             'filename' => $data['filename'],
             'file_url' => $data['file_url'],
+            'content_hash' => $data['content_hash'] ?? null,
+            'perceptual_hash' => $data['perceptual_hash'] ?? null,
             'label' => $data['label'],
             'note' => $data['note'] ?? null,
             'uploaded_by' => $data['uploaded_by'],
@@ -24,6 +26,12 @@ class TrainingImage
         return (int) $this->db->lastInsertId();
     }
 
+    public static function isDuplicateKey(PDOException $e): bool
+    {
+        // 1062 = ER_DUP_ENTRY (index UNIQUE content_hash + kode_part)
+        return (int) ($e->errorInfo[1] ?? 0) === 1062;
+    }
+
     public function list(int $limit = 100, int $offset = 0): array
     {
         $stmt = $this->db->prepare('SELECT ti.*, s.nama_part FROM training_images ti LEFT JOIN spareparts s ON s.id = ti.sparepart_id ORDER BY ti.uploaded_at DESC LIMIT :offset, :limit');
@@ -35,15 +43,64 @@ class TrainingImage
 
     public function stats(): array
     {
-        $stmt = $this->db->query("SELECT COUNT(*) AS total, SUM(label = 'ASLI') AS asli, SUM(label = 'PALSU') AS palsu FROM training_images");
+        // Baris lama tanpa content_hash dihitung unik per file.
+        $stmt = $this->db->query(
+            "SELECT COUNT(*) AS total, SUM(label = 'ASLI') AS asli, SUM(label = 'PALSU') AS palsu,
+                COUNT(DISTINCT COALESCE(content_hash, filename)) AS unique_total,
+                COUNT(DISTINCT CASE WHEN label = 'ASLI' THEN COALESCE(content_hash, filename) END) AS unique_asli,
+                COUNT(DISTINCT CASE WHEN label = 'PALSU' THEN COALESCE(content_hash, filename) END) AS unique_palsu
+             FROM training_images"
+        );
         $row = $stmt->fetch();
         return [
             'total' => (int) ($row['total'] ?? 0),
             'asli' => (int) ($row['asli'] ?? 0),
             'palsu' => (int) ($row['palsu'] ?? 0),
+            'unique_total' => (int) ($row['unique_total'] ?? 0),
+            'unique_asli' => (int) ($row['unique_asli'] ?? 0),
+            'unique_palsu' => (int) ($row['unique_palsu'] ?? 0),
         ];
     }
 
+    public function findByContentHash(string $contentHash, ?string $kodePart = null): ?array
+    {
+        $sql = 'SELECT id, kode_part, label, filename, file_url FROM training_images WHERE content_hash = ?';
+        $params = [$contentHash];
+        if ($kodePart !== null) {
+            $sql .= ' AND kode_part = ?';
+            $params[] = $kodePart;
+        }
+        $stmt = $this->db->prepare($sql . ' LIMIT 1');
+        $stmt->execute($params);
+        $data = $stmt->fetch();
+        return $data ?: null;
+    }
+
+    public function findNearDuplicate(string $kodePart, string $perceptualHash, int $maxDistance): ?array
+    {
+        $stmt = $this->db->prepare(
+            'SELECT id, label, filename, BIT_COUNT(perceptual_hash ^ CAST(CONV(:phash, 16, 10) AS UNSIGNED)) AS distance
+             FROM training_images
+             WHERE kode_part = :kode_part AND perceptual_hash IS NOT NULL
+             HAVING distance <= :max_distance
+             ORDER BY distance
+             LIMIT 1'
+        );
+        $stmt->bindValue(':phash', $perceptualHash);
+        $stmt->bindValue(':kode_part', $kodePart);
+        $stmt->bindValue(':max_distance', $maxDistance, PDO::PARAM_INT);
+        $stmt->execute();
+        $data = $stmt->fetch();
+        return $data ?: null;
+    }
+
+    public function countByFilename(string $filename): int
+    {
+        $stmt = $this->db->prepare('SELECT COUNT(*) FROM training_images WHERE filename = ?');
+        $stmt->execute([$filename]);
+        return (int) $stmt->fetchColumn();
+    }
+
     public function delete(int $id): bool
     {
         $stmt = $this->db->prepare('DELETE FROM training_images WHERE id = ?');
@@ -10,16 +10,18 @@ class VerificationLog
 
     public function countToday(): int
     {
-        $stmt = $this->db->query('SELECT COUNT(*) as total FROM verification_logs WHERE DATE(created_at) = CURDATE()');
+        $stmt = $this->db->query('SELECT total FROM verification_log_daily WHERE tanggal = CURDATE()');
         $row = $stmt->fetch();
         return (int) ($row['total'] ?? 0);
     }
 
     public function latest(int $limit = 10): array
     {
-        $stmt = $this->db->prepare('SELECT kode_part, status, ip_address, user_agent, created_at AS waktu_cek
-            FROM verification_logs
-            ORDER BY created_at DESC
+        $stmt = $this->db->prepare('SELECT vl.kode_part, vl.status, vl.ip_address,
+                COALESCE(ua.user_agent, vl.user_agent) AS user_agent, vl.created_at AS waktu_cek
+            FROM verification_logs vl
+            LEFT JOIN verification_user_agents ua ON ua.id = vl.user_agent_id
+            ORDER BY vl.created_at DESC, vl.id DESC
             LIMIT :limit');
         $stmt->bindValue(':limit', $limit, PDO::PARAM_INT);
         $stmt->execute();
@@ -44,17 +46,50 @@ class VerificationLog
             $sparepartId = $this->findSparepartIdByCode($kodePart);
         }
 
-        $stmt = $this->db->prepare('INSERT INTO verification_logs (sparepart_id, kode_part, status, ip_address, user_agent)
-            VALUES (:sparepart_id, :kode_part, :status, :ip_address, :user_agent)');
+        $stmt = $this->db->prepare('INSERT INTO verification_logs (sparepart_id, kode_part, status, ip_address, user_agent_id)
+            VALUES (:sparepart_id, :kode_part, :status, :ip_address, :user_agent_id)');
         $stmt->execute([
             'sparepart_id' => $sparepartId,
             'kode_part' => $kodePart,
             'status' => $status,
             'ip_address' => $data['ip_address'] ?? null,
-            'user_agent' => $data['user_agent'] ?? null,
+            'user_agent_id' => $this->userAgentId($data['user_agent'] ?? null),
         ]);
+        $logId = (int) $this->db->lastInsertId();
+        $this->incrementDaily($status);
 
-        return (int) $this->db->lastInsertId();
+        return $logId;
+    }
+
+    private function userAgentId(?string $userAgent): ?int
+    {
+        if ($userAgent === null || $userAgent === '') {
+            return null;
+        }
+
+        $hash = sha1($userAgent);
+        $stmt = $this->db->prepare('INSERT IGNORE INTO verification_user_agents (ua_hash, user_agent) VALUES (?, ?)');
+        $stmt->execute([$hash, substr($userAgent, 0, 512)]);
+
+        $stmt = $this->db->prepare('SELECT id FROM verification_user_agents WHERE ua_hash = ? LIMIT 1');
+        $stmt->execute([$hash]);
+        $row = $stmt->fetch();
+        return $row ? (int) $row['id'] : null;
+    }
+
+    private function incrementDaily(string $status): void
+    {
+        $isAsli = $status === 'ASLI' ? 1 : 0;
+        $stmt = $this->db->prepare('INSERT INTO verification_log_daily (tanggal, total, total_asli, total_tidak_valid)
+            VALUES (CURDATE(), 1, :asli, :tidak_valid)
+            ON DUPLICATE KEY UPDATE
+                total = total + 1,
+                total_asli = total_asli + VALUES(total_asli),
+                total_tidak_valid = total_tidak_valid + VALUES(total_tidak_valid)');
+        $stmt->execute([
+            'asli' => $isAsli,
+            'tidak_valid' => 1 - $isAsli,
+        ]);
     }
 
     private function findSparepartIdByCode(?string $kodePart): ?int
@@ -43,6 +43,10 @@ CREATE TABLE IF NOT EXISTS spareparts (
     tanggal_produksi DATE,
     is_original TINYINT(1) NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    qr_code_norm VARCHAR(80) GENERATED ALWAYS AS (UPPER(TRIM(qr_code))) STORED,
+    hologram_code_norm VARCHAR(80) GENERATED ALWAYS AS (UPPER(TRIM(hologram_code))) STORED,
+    INDEX idx_spareparts_qr_code_norm (qr_code_norm),
+    INDEX idx_spareparts_hologram_code_norm (hologram_code_norm),
     CONSTRAINT fk_spareparts_category FOREIGN KEY (kategori_id) REFERENCES categories(id)
         ON UPDATE CASCADE
         ON DELETE SET NULL
@@ -98,24 +102,61 @@ CREATE TABLE IF NOT EXISTS verification_logs (
     sparepart_id INT UNSIGNED NULL,
     kode_part VARCHAR(40) NOT NULL,
     status ENUM('ASLI', 'TIDAK VALID', 'TIDAK DITEMUKAN') NOT NULL,
+    metode VARCHAR(10) NOT NULL DEFAULT 'QR',
     ip_address VARCHAR(45),
     user_agent VARCHAR(255),
+    user_agent_id INT UNSIGNED NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_verif_created (created_at, id),
+    INDEX idx_verif_metode_created (metode, created_at, id),
     CONSTRAINT fk_verif_sparepart FOREIGN KEY (sparepart_id) REFERENCES spareparts(id)
         ON UPDATE CASCADE
         ON DELETE SET NULL
 ) ENGINE=InnoDB;
 
+-- Dictionary user agent: log hanya menyimpan user_agent_id
+CREATE TABLE IF NOT EXISTS verification_user_agents (
+    id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    ua_hash CHAR(40) NOT NULL UNIQUE,
+    user_agent VARCHAR(512) NOT NULL
+) ENGINE=InnoDB;
+
+-- Agregat bulanan untuk log yang sudah melewati retensi (LOG_RETENTION_MONTHS).
+-- Partisi bulanan verification_logs bersifat opt-in: migrations/verification_logs_partitioning.sql
+CREATE TABLE IF NOT EXISTS verification_log_monthly (
+    bulan CHAR(7) NOT NULL,
+    kode_part VARCHAR(40) NOT NULL,
+    metode VARCHAR(10) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    total INT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (bulan, kode_part, metode, status)
+) ENGINE=InnoDB;
+
+-- Rekap harian verifikasi, di-increment oleh penulis log (Flask & PHP)
+-- sehingga statistik landing page tidak perlu memindai verification_logs.
+-- Backfill: app.rebuild_verification_rollup() atau query GROUP BY DATE(created_at).
+CREATE TABLE IF NOT EXISTS verification_log_daily (
+    tanggal DATE PRIMARY KEY,
+    total INT UNSIGNED NOT NULL DEFAULT 0,
+    total_asli INT UNSIGNED NOT NULL DEFAULT 0,
+    total_tidak_valid INT UNSIGNED NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
 CREATE TABLE IF NOT EXISTS training_images (
     id BIGINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
     sparepart_id INT UNSIGNED NOT NULL,
     kode_part VARCHAR(40) NOT NULL,
     filename VARCHAR(255) NOT NULL,
     file_url VARCHAR(255) NOT NULL,
+    content_hash CHAR(64) NULL,
+    perceptual_hash BIGINT UNSIGNED NULL,
     label ENUM('ASLI', 'PALSU') NOT NULL,
     note VARCHAR(255),
     uploaded_by INT UNSIGNED,
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE INDEX uq_training_content_hash (content_hash, kode_part),
+    INDEX idx_training_kode_phash (kode_part, perceptual_hash),
+    INDEX idx_training_filename (filename),
     CONSTRAINT fk_training_sparepart FOREIGN KEY (sparepart_id) REFERENCES spareparts(id)
         ON UPDATE CASCADE
         ON DELETE CASCADE,
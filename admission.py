@@ -0,0 +1,249 @@
+"""Admission control dan load shedding untuk endpoint verifikasi.
+
+Setiap kelas endpoint (mis. ``image`` untuk CNN+OCR, ``lookup`` untuk cek kode
+QR) punya batas konkurensi dan antrean sendiri, sehingga lonjakan upload foto
+tidak membuat lookup murah ikut mengantre:
+
+* slot kosong -> request langsung jalan;
+* semua slot terpakai -> menunggu di antrean terbatas paling lama ``queue_timeout``;
+* antrean penuh / waktu tunggu habis -> :class:`Overloaded` (view membalas
+  503 + ``Retry-After`` yang diperkirakan dari rata-rata durasi layanan);
+* bila antrean sudah sedalam ``degrade_queue`` saat request masuk, atau ia
+  menunggu lebih dari ``degrade_wait`` detik, request ditandai *degraded*
+  (:func:`degraded`) sehingga view bisa melewati tahap mahal (OCR).
+"""
+from __future__ import annotations
+
+import functools
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional
+
+from instrumentation import REGISTRY
+
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total",
+    "Request yang ditolak (503) per kelas endpoint dan alasan (queue_full / timeout).",
+    labels=("admission_class", "reason"),
+)
+ADMISSION_DEGRADED = REGISTRY.counter(
+    "admission_degraded_total",
+    "Request yang dijalankan dalam mode degradasi per kelas endpoint.",
+    labels=("admission_class",),
+)
+ADMISSION_QUEUE = REGISTRY.gauge(
+    "admission_queue_depth",
+    "Jumlah request yang sedang menunggu slot per kelas endpoint.",
+    labels=("admission_class",),
+)
+ADMISSION_WAIT = REGISTRY.histogram(
+    "admission_wait_seconds",
+    "Lama request menunggu slot sebelum dijalankan.",
+    labels=("admission_class",),
+)
+
+_local = threading.local()
+
+
+class Overloaded(Exception):
+    """Kelas endpoint penuh; ``retry_after`` dalam detik (bilangan bulat >= 1)."""
+
+    def __init__(self, admission_class: str, reason: str, retry_after: int) -> None:
+        super().__init__(f"Server sedang sibuk ({admission_class}), coba lagi dalam {retry_after} detik")
+        self.admission_class = admission_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class Ticket:
+    admission_class: str
+    degraded: bool
+    waited: float
+    admitted_at: float
+
+
+class AdmissionClass:
+    """Batas konkurensi + antrean FIFO terbatas untuk satu kelas endpoint.
+
+    Args:
+        max_concurrent: request yang boleh berjalan bersamaan.
+        max_queue: request yang boleh menunggu; 0 = langsung tolak bila penuh.
+        queue_timeout: detik maksimum menunggu slot.
+        degrade_queue: kedalaman antrean saat masuk yang memicu mode degradasi
+            (0 = nonaktif).
+        degrade_wait: lama menunggu (detik) yang memicu mode degradasi (0 = nonaktif).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        degrade_queue: int = 0,
+        degrade_wait: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.degrade_queue = degrade_queue
+        self.degrade_wait = degrade_wait
+        self._service_time = 1.0  # EWMA durasi layanan (detik) untuk Retry-After
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._active = 0
+        self._queue: Deque[object] = deque()  # penanda request yang menunggu, urut FIFO
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active": self._active,
+            "waiting": len(self._queue),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "service_time": round(self._service_time, 3),
+        }
+
+    def retry_after(self) -> int:
+        """Perkiraan detik sampai antrean saat ini habis dilayani."""
+        backlog = (len(self._queue) + 1) / self.max_concurrent
+        return max(1, math.ceil(backlog * self._service_time))
+
+    def acquire(self) -> Ticket:
+        if self._pid != os.getpid():
+            self._reset()  # setelah fork: hitungan slot induk tidak berlaku
+        started = time.monotonic()
+        with self._condition:
+            if self._active < self.max_concurrent and not self._queue:
+                self._active += 1
+                return Ticket(self.name, False, 0.0, started)
+            if len(self._queue) >= self.max_queue:
+                ADMISSION_REJECTED.inc(admission_class=self.name, reason="queue_full")
+                raise Overloaded(self.name, "queue_full", self.retry_after())
+
+            depth_on_entry = len(self._queue)
+            marker = object()
+            self._queue.append(marker)
+            ADMISSION_QUEUE.inc(admission_class=self.name)
+            deadline = started + self.queue_timeout
+            try:
+                while not (self._queue[0] is marker and self._active < self.max_concurrent):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        ADMISSION_REJECTED.inc(admission_class=self.name, reason="timeout")
+                        raise Overloaded(self.name, "timeout", self.retry_after())
+                    self._condition.wait(remaining)
+                self._active += 1
+            finally:
+                self._queue.remove(marker)
+                ADMISSION_QUEUE.dec(admission_class=self.name)
+                self._condition.notify_all()  # penunggu berikutnya mungkin kini di depan
+
+        waited = time.monotonic() - started
+        ADMISSION_WAIT.observe(waited, admission_class=self.name)
+        degraded = bool(
+            (self.degrade_queue and depth_on_entry + 1 >= self.degrade_queue)
+            or (self.degrade_wait and waited >= self.degrade_wait)
+        )
+        if degraded:
+            ADMISSION_DEGRADED.inc(admission_class=self.name)
+        return Ticket(self.name, degraded, waited, time.monotonic())
+
+    def release(self, ticket: Ticket) -> None:
+        duration = time.monotonic() - ticket.admitted_at
+        with self._condition:
+            self._active = max(0, self._active - 1)
+            self._service_time = 0.8 * self._service_time + 0.2 * duration
+            self._condition.notify_all()
+
+
+class AdmissionController:
+    """Kumpulan :class:`AdmissionClass` + decorator view.
+
+    ``enabled=False`` membuat decorator langsung memanggil view.
+    """
+
+    def __init__(self, *, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.classes: Dict[str, AdmissionClass] = {}
+
+    def add_class(self, name: str, **options) -> AdmissionClass:
+        admission_class = AdmissionClass(name, **options)
+        self.classes[name] = admission_class
+        return admission_class
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {name: admission_class.stats() for name, admission_class in self.classes.items()}
+
+    def admit(self, class_name: str, *, on_overload: Callable[[Overloaded], object]) -> Callable:
+        """Decorator view: ambil slot kelas ``class_name`` selama view (dan body streaming-nya) berjalan.
+
+        ``on_overload(exc)`` membentuk respons penolakan. Respons streaming
+        (``is_streamed``) melepas slot lewat ``call_on_close`` setelah body habis dikirim.
+        """
+
+        def decorator(view: Callable) -> Callable:
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                admission_class = self.classes.get(class_name)
+                if not self.enabled or admission_class is None:
+                    return view(*args, **kwargs)
+                try:
+                    ticket = admission_class.acquire()
+                except Overloaded as exc:
+                    return on_overload(exc)
+
+                def release() -> None:
+                    if getattr(_local, "ticket", None) is ticket:
+                        _local.ticket = None
+                    admission_class.release(ticket)
+
+                _local.ticket = ticket
+                streamed = False
+                try:
+                    response = view(*args, **kwargs)
+                    streamed = bool(getattr(response, "is_streamed", False)) and hasattr(response, "call_on_close")
+                    if streamed:
+                        response.call_on_close(release)
+                    return response
+                finally:
+                    if not streamed:
+                        release()
+
+            return wrapper
+
+        return decorator
+
+
+def current_ticket() -> Optional[Ticket]:
+    """Tiket admission request pada thread ini (``None`` di luar view yang dikontrol)."""
+    return getattr(_local, "ticket", None)
+
+
+def degraded() -> bool:
+    """``True`` bila request ini sebaiknya melewati tahap mahal (mis. OCR)."""
+    ticket = current_ticket()
+    return bool(ticket and ticket.degraded)
+
+
+__all__ = [
+    "ADMISSION_DEGRADED",
+    "ADMISSION_QUEUE",
+    "ADMISSION_REJECTED",
+    "ADMISSION_WAIT",
+    "AdmissionClass",
+    "AdmissionController",
+    "Overloaded",
+    "Ticket",
+    "current_ticket",
+    "degraded",
+]
@@ -1,23 +1,56 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory, flash
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory, flash, make_response, Response, has_request_context, stream_with_context
 
+import base64
+import io
 import hashlib
+import json
 import sqlite3
 
 import os
+import random
 import re
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from urllib.parse import urljoin
 from typing import Optional, List
 
+import click
 import cv2
 import numpy as np
 import requests
 import pymysql
 from pymysql.cursors import DictCursor
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import get_input_stream
 
 from cnn_detector import HybridDetectionEngine, SparePartDetector
-from ocr_reader import PartCodeOCR
+from ocr_reader import OCRBatcher, PartCodeOCR
+from response_cache import SingleFlightCache
+from sqlite_store import SQLiteConnectionManager
+from log_storage import SQLITE_STORAGE_DDL, VerificationLogStorage, encode_csv, encode_ndjson
+from instrumentation import REGISTRY, STAGE_LATENCY, VERIFICATION_OUTCOMES, instrument_endpoint
+from request_profiler import DEBUG_HEADER, RequestProfiler
+from image_ingest import ImageRejected, decode_upload, file_difference_hash
+from image_quality import ImageQualityGate
+from training_upload import TrainingUploadManager, UploadNotFound
+from feature_index import detector_feature_index
+from reference_matcher import ReferenceMatcher
+from calibration import CRITERIA, calibrate_detector
+from object_detector import PartObjectDetector, crop_region
+from part_code_index import CodeMatch, PartCodeIndex, SecurityCodeIndex, compact_code, normalize_payload
+from stream_verification import (
+    StreamSessionBusy,
+    StreamSessionLimit,
+    StreamSessionNotFound,
+    StreamVerifier,
+    VERDICT_PENDING,
+    iter_jpeg_frames,
+)
+from admission import AdmissionController, degraded as admission_degraded
+from verification_jobs import JobNotFound, JobQueueFull, VerificationJobQueue
+from hotspot_analytics import HotspotTracker
+from prefork import after_fork, memory_report
 
 app = Flask(__name__)
 app.secret_key = 'kunci_rahasia_honda_2024_super_secret_key_xyz_12345'
@@ -25,10 +58,114 @@ app.secret_key = 'kunci_rahasia_honda_2024_super_secret_key_xyz_12345'
 # Konfigurasi upload
 UPLOAD_FOLDER = 'uploads/training'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 32 * 1024 * 1024))
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', 15 * 1024 * 1024))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000))
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+TRAINING_SPOOL_FOLDER = os.getenv('TRAINING_SPOOL_FOLDER', 'uploads/spool')
+TRAINING_UPLOAD_CHUNK_FILES = int(os.getenv('TRAINING_UPLOAD_CHUNK_FILES', 10))
+TRAINING_UPLOAD_WORKERS = int(os.getenv('TRAINING_UPLOAD_WORKERS', 3))
+TRAINING_UPLOAD_TIMEOUT = int(os.getenv('TRAINING_UPLOAD_TIMEOUT', 120))
+TRAINING_UPLOAD_TTL = float(os.getenv('TRAINING_UPLOAD_TTL', 24 * 3600))
+TRAINING_UPLOAD_LEASE = float(os.getenv('TRAINING_UPLOAD_LEASE', 60))
+TRAINING_NEAR_DUPLICATE_DISTANCE = int(os.getenv('TRAINING_NEAR_DUPLICATE_DISTANCE', 5))
+FEATURE_INDEX_DIR = os.getenv('FEATURE_INDEX_DIR', 'uploads/feature_index')
+
+# Pencocokan dengan foto referensi ASLI (nearest-neighbour per kode part)
+REFERENCE_MATCH_ENABLED = os.getenv('REFERENCE_MATCH_ENABLED', '1') == '1'
+REFERENCE_EMBEDDING_LAYER = os.getenv('CNN_EMBEDDING_LAYER')  # nama layer penultimate model ONNX
+REFERENCE_MATCH_TOP_K = int(os.getenv('REFERENCE_MATCH_TOP_K', 3))
+REFERENCE_MATCH_THRESHOLD = float(os.getenv('REFERENCE_MATCH_THRESHOLD', 0.85))
+REFERENCE_REFRESH_INTERVAL = float(os.getenv('REFERENCE_REFRESH_INTERVAL', 30))
+REFERENCE_IVF_MIN_SIZE = int(os.getenv('REFERENCE_IVF_MIN_SIZE', 256))
+REFERENCE_IVF_NPROBE = int(os.getenv('REFERENCE_IVF_NPROBE', 4))
 
 # Konfigurasi deteksi CNN
 MODEL_PATH = os.getenv('CNN_MODEL_PATH')  # optional, fallback heuristik jika None
 DETECTOR_CONFIDENCE_THRESHOLD = float(os.getenv('CNN_CONFIDENCE_THRESHOLD', 0.65))
+CNN_CALIBRATION_PATH = os.getenv('CNN_CALIBRATION_PATH', 'uploads/cnn_calibration.json')  # hasil `flask calibrate-detector`
+
+# Deteksi multi-objek (YOLO/SSD ONNX, fallback kontur tepi bila kosong)
+OBJECT_MODEL_PATH = os.getenv('OBJECT_MODEL_PATH')
+OBJECT_MODEL_FORMAT = os.getenv('OBJECT_MODEL_FORMAT', 'yolo')
+OBJECT_INPUT_SIZE = int(os.getenv('OBJECT_INPUT_SIZE', 640))
+OBJECT_CLASS_NAMES = [name.strip() for name in os.getenv('OBJECT_CLASS_NAMES', '').split(',') if name.strip()]
+OBJECT_SCORE_THRESHOLD = float(os.getenv('OBJECT_SCORE_THRESHOLD', 0.35))
+OBJECT_IOU_THRESHOLD = float(os.getenv('OBJECT_IOU_THRESHOLD', 0.45))
+OBJECT_MAX_DETECTIONS = int(os.getenv('OBJECT_MAX_DETECTIONS', 10))
+
+# Indeks kode part katalog (toleran salah baca OCR)
+CATALOG_INDEX_REFRESH = float(os.getenv('CATALOG_INDEX_REFRESH', 60))
+CATALOG_MATCH_MAX_EDITS = int(os.getenv('CATALOG_MATCH_MAX_EDITS', 1))
+
+# OCR batch + penggabungan request bersamaan
+OCR_BATCH_SIZE = int(os.getenv('OCR_BATCH_SIZE', 16))
+OCR_COALESCE_ENABLED = os.getenv('OCR_COALESCE_ENABLED', '1') == '1'
+OCR_COALESCE_MAX_BATCH = int(os.getenv('OCR_COALESCE_MAX_BATCH', 8))
+OCR_COALESCE_WAIT_MS = float(os.getenv('OCR_COALESCE_WAIT_MS', 5))
+
+# Verifikasi stream kamera (keyframe + voting)
+STREAM_SHARPNESS_THRESHOLD = float(os.getenv('STREAM_SHARPNESS_THRESHOLD', 60))
+STREAM_MOTION_THRESHOLD = float(os.getenv('STREAM_MOTION_THRESHOLD', 8))
+STREAM_KEYFRAME_MIN_GAP = int(os.getenv('STREAM_KEYFRAME_MIN_GAP', 5))
+STREAM_KEYFRAME_MAX_GAP = int(os.getenv('STREAM_KEYFRAME_MAX_GAP', 30))
+STREAM_VOTE_WINDOW = int(os.getenv('STREAM_VOTE_WINDOW', 7))
+STREAM_MIN_VOTES = int(os.getenv('STREAM_MIN_VOTES', 3))
+STREAM_SESSION_TTL = float(os.getenv('STREAM_SESSION_TTL', 300))
+# Sesi frame-per-frame disimpan di SQLite bersama agar frame boleh mendarat di worker mana pun
+STREAM_SESSION_STORE_PATH = os.getenv('STREAM_SESSION_STORE_PATH', 'uploads/stream_sessions.db')
+STREAM_MAX_SESSIONS = int(os.getenv('STREAM_MAX_SESSIONS', 64))
+STREAM_MAX_SESSIONS_PER_CLIENT = int(os.getenv('STREAM_MAX_SESSIONS_PER_CLIENT', 4))
+STREAM_MAX_FRAMES = int(os.getenv('STREAM_MAX_FRAMES', 3000))
+STREAM_MAX_FRAME_BYTES = int(os.getenv('STREAM_MAX_FRAME_BYTES', 4 * 1024 * 1024))
+# Batas body khusus /api/verify-stream (menggantikan MAX_CONTENT_LENGTH global untuk route ini)
+STREAM_MAX_BODY_BYTES = int(os.getenv('STREAM_MAX_BODY_BYTES', 512 * 1024 * 1024))
+
+# Admission control: batas konkurensi + antrean per kelas endpoint, 503 saat penuh
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', '1') == '1'
+ADMISSION_IMAGE_CONCURRENCY = int(os.getenv('ADMISSION_IMAGE_CONCURRENCY', 4))
+ADMISSION_IMAGE_QUEUE = int(os.getenv('ADMISSION_IMAGE_QUEUE', 16))
+ADMISSION_IMAGE_TIMEOUT = float(os.getenv('ADMISSION_IMAGE_TIMEOUT', 15))
+ADMISSION_DEGRADE_QUEUE = int(os.getenv('ADMISSION_DEGRADE_QUEUE', 4))  # 0 = tanpa degradasi
+ADMISSION_DEGRADE_WAIT = float(os.getenv('ADMISSION_DEGRADE_WAIT', 2))
+ADMISSION_LOOKUP_CONCURRENCY = int(os.getenv('ADMISSION_LOOKUP_CONCURRENCY', 32))
+ADMISSION_LOOKUP_QUEUE = int(os.getenv('ADMISSION_LOOKUP_QUEUE', 64))
+ADMISSION_LOOKUP_TIMEOUT = float(os.getenv('ADMISSION_LOOKUP_TIMEOUT', 2))
+ADMISSION_STREAM_CONCURRENCY = int(os.getenv('ADMISSION_STREAM_CONCURRENCY', 4))
+ADMISSION_EXPORT_CONCURRENCY = int(os.getenv('ADMISSION_EXPORT_CONCURRENCY', 2))
+ADMISSION_EVENTS_CONCURRENCY = int(os.getenv('ADMISSION_EVENTS_CONCURRENCY', 8))
+
+# Mode async verify-image (?async=1 atau header Prefer: respond-async)
+VERIFY_ASYNC_ENABLED = os.getenv('VERIFY_ASYNC_ENABLED', '1') == '1'
+VERIFY_JOB_WORKERS = int(os.getenv('VERIFY_JOB_WORKERS', 2))
+VERIFY_JOB_MAX_PENDING = int(os.getenv('VERIFY_JOB_MAX_PENDING', 32))
+VERIFY_JOB_TTL = float(os.getenv('VERIFY_JOB_TTL', 120))
+VERIFY_JOB_RESULT_TTL = float(os.getenv('VERIFY_JOB_RESULT_TTL', 600))
+VERIFY_JOB_STORE_PATH = os.getenv('VERIFY_JOB_STORE_PATH', 'uploads/verification_jobs.db')
+VERIFY_JOB_SSE_TIMEOUT = float(os.getenv('VERIFY_JOB_SSE_TIMEOUT', 60))
+
+# Analitik hotspot pemalsuan: sketch bermemori tetap per jendela waktu, snapshot dibagi antar worker
+HOTSPOT_ENABLED = os.getenv('HOTSPOT_ENABLED', '1') == '1'
+HOTSPOT_STORE_PATH = os.getenv('HOTSPOT_STORE_PATH', 'uploads/hotspots.db')
+HOTSPOT_WINDOW_SECONDS = int(os.getenv('HOTSPOT_WINDOW_SECONDS', 3600))
+HOTSPOT_WINDOWS = int(os.getenv('HOTSPOT_WINDOWS', 24))
+HOTSPOT_SNAPSHOT_INTERVAL = float(os.getenv('HOTSPOT_SNAPSHOT_INTERVAL', 30))
+HOTSPOT_SKETCH_WIDTH = int(os.getenv('HOTSPOT_SKETCH_WIDTH', 2048))
+HOTSPOT_TOP_K = int(os.getenv('HOTSPOT_TOP_K', 64))
+
+# Gerbang kualitas foto sebelum CNN/QR/OCR (ambang ketajaman berlaku pada skala QUALITY_ANALYSIS_SIDE)
+QUALITY_GATE_ENABLED = os.getenv('QUALITY_GATE_ENABLED', '1') == '1'
+QUALITY_ANALYSIS_SIDE = int(os.getenv('QUALITY_ANALYSIS_SIDE', 320))
+QUALITY_MIN_SIDE = int(os.getenv('QUALITY_MIN_SIDE', 240))
+QUALITY_MIN_SHARPNESS = float(os.getenv('QUALITY_MIN_SHARPNESS', 15))
+QUALITY_MIN_BRIGHTNESS = float(os.getenv('QUALITY_MIN_BRIGHTNESS', 35))
+QUALITY_MAX_BRIGHTNESS = float(os.getenv('QUALITY_MAX_BRIGHTNESS', 235))
+QUALITY_MIN_CONTRAST = float(os.getenv('QUALITY_MIN_CONTRAST', 8))
+QUALITY_MAX_GLARE = float(os.getenv('QUALITY_MAX_GLARE', 0.2))
+
+# Server pre-fork: jumlah thread torch / OpenCV per worker (0 = bawaan library)
+TORCH_THREADS_PER_WORKER = int(os.getenv('TORCH_THREADS_PER_WORKER', 0))
+CV2_THREADS_PER_WORKER = int(os.getenv('CV2_THREADS_PER_WORKER', 0))
 PHP_API_BASE_URL = os.getenv('PHP_API_BASE_URL', 'http://localhost/deteksi_sparepart/admin_backend/public')
 PHP_INTERNAL_API_TOKEN = os.getenv('PHP_INTERNAL_API_TOKEN', 'dev-internal-token')
 
@@ -39,6 +176,22 @@ MYSQL_USER = os.getenv('MYSQL_USER', 'root')
 MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', '')
 MYSQL_CHARSET = os.getenv('MYSQL_CHARSET', 'utf8mb4')
 DB_BACKEND = os.getenv('DB_BACKEND', 'mysql').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'honda_spareparts.db')
+SQLITE_PERFORMANCE_MODE = os.getenv('SQLITE_PERFORMANCE_MODE', '1') != '0'
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 16384))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+VERIFICATION_HISTORY_MAX_LIMIT = int(os.getenv('VERIFICATION_HISTORY_MAX_LIMIT', 100))
+LANDING_CACHE_TTL = float(os.getenv('LANDING_CACHE_TTL', 10))
+LOG_HOT_MONTHS = int(os.getenv('LOG_HOT_MONTHS', 3))
+LOG_RETENTION_MONTHS = int(os.getenv('LOG_RETENTION_MONTHS', 24))
+LOG_MAINTENANCE_INTERVAL = float(os.getenv('LOG_MAINTENANCE_INTERVAL', 3600))
+LOG_EXPORT_CHUNK_ROWS = int(os.getenv('LOG_EXPORT_CHUNK_ROWS', 500))
+LOG_EXPORT_FETCH_ROWS = int(os.getenv('LOG_EXPORT_FETCH_ROWS', 2000))
+PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', '0') == '1'
+PROFILER_THRESHOLD_MS = float(os.getenv('PROFILER_THRESHOLD_MS', 2000))
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', 0))
+PROFILER_BUFFER_SIZE = int(os.getenv('PROFILER_BUFFER_SIZE', 20))
+PROFILER_SAMPLING_INTERVAL_MS = float(os.getenv('PROFILER_SAMPLING_INTERVAL_MS', 5))
 
 
 class PHPAPIError(RuntimeError):
@@ -56,16 +209,30 @@ def build_php_api_url(path: str) -> str:
     return f'{base}/{suffix}' if suffix else base
 
 
+def current_admin_identity() -> dict:
+    """Identitas admin dari sesi, untuk diteruskan ke pekerjaan di luar request."""
+    return {'id': session.get('admin_id'), 'name': session.get('nama_lengkap')}
+
+
 def php_api_request(path: str, method: str = 'GET', *, json_payload=None,
-                    data=None, files=None, params=None, include_token: bool = True, timeout: int = 15):
+                    data=None, files=None, params=None, include_token: bool = True, timeout: int = 15,
+                    headers: Optional[dict] = None, admin: Optional[dict] = None):
+    """Panggil backend PHP.
+
+    Di luar request context (thread background) sesi tidak tersedia, jadi
+    identitas admin harus diberikan lewat ``admin`` (lihat ``current_admin_identity``).
+    """
     url = build_php_api_url(path)
-    headers = {}
+    headers = dict(headers or {})
 
     if include_token and PHP_INTERNAL_API_TOKEN:
         headers['X-Internal-Token'] = PHP_INTERNAL_API_TOKEN
 
-        admin_id = session.get('admin_id')
-        admin_name = session.get('nama_lengkap')
+        if admin is None and has_request_context():
+            admin = current_admin_identity()
+        admin = admin or {}
+        admin_id = admin.get('id')
+        admin_name = admin.get('name')
         if admin_id:
             headers['X-Admin-Id'] = str(admin_id)
         if admin_name:
@@ -97,16 +264,45 @@ def php_api_request(path: str, method: str = 'GET', *, json_payload=None,
     return payload
 
 
+detector = SparePartDetector(
+    model_path=MODEL_PATH,
+    confidence_threshold=DETECTOR_CONFIDENCE_THRESHOLD,
+    embedding_layer=REFERENCE_EMBEDDING_LAYER,
+    calibration_path=CNN_CALIBRATION_PATH,
+)
+training_feature_index = detector_feature_index(detector, FEATURE_INDEX_DIR)
+reference_matcher = ReferenceMatcher(
+    training_feature_index,
+    detector.embed,
+    refresh_interval=REFERENCE_REFRESH_INTERVAL,
+    ivf_min_size=REFERENCE_IVF_MIN_SIZE,
+    nprobe=REFERENCE_IVF_NPROBE,
+) if REFERENCE_MATCH_ENABLED else None
 detector_engine = HybridDetectionEngine(
-    detector=SparePartDetector(
-        model_path=MODEL_PATH,
-        confidence_threshold=DETECTOR_CONFIDENCE_THRESHOLD,
-    )
+    detector=detector,
+    reference_matcher=reference_matcher,
+    reference_top_k=REFERENCE_MATCH_TOP_K,
+    reference_threshold=REFERENCE_MATCH_THRESHOLD,
+    object_detector=PartObjectDetector(
+        model_path=OBJECT_MODEL_PATH,
+        output_format=OBJECT_MODEL_FORMAT,
+        input_size=(OBJECT_INPUT_SIZE, OBJECT_INPUT_SIZE),
+        class_names=OBJECT_CLASS_NAMES,
+        score_threshold=OBJECT_SCORE_THRESHOLD,
+        iou_threshold=OBJECT_IOU_THRESHOLD,
+        max_detections=OBJECT_MAX_DETECTIONS,
+    ),
 )
 
 HONDA_KEYWORDS = ('honda', 'astra honda', 'ahm')
 PART_CODE_REGEX = re.compile(r'^[0-9A-Z]{3,5}-[A-Z]{3}-[0-9A-Z]{3}$')
-ocr_engine = PartCodeOCR()
+ocr_engine = PartCodeOCR(batch_size=OCR_BATCH_SIZE)
+ocr_batcher = OCRBatcher(
+    ocr_engine,
+    enabled=OCR_COALESCE_ENABLED,
+    max_batch=OCR_COALESCE_MAX_BATCH,
+    max_wait=OCR_COALESCE_WAIT_MS / 1000.0,
+)
 
 # Pastikan folder upload ada
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -115,24 +311,42 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def load_image_from_upload(file_storage):
-    """Konversi FileStorage menjadi ndarray OpenCV."""
+    """Konversi FileStorage menjadi ndarray OpenCV.
+
+    Buffer upload dibaca tanpa salinan tambahan dan header divalidasi dulu
+    (magic byte, ukuran, resolusi) sebelum piksel di-decode.
+    """
 
     if file_storage.filename == '':
-        raise ValueError('File tidak valid')
+        raise ImageRejected('File tidak valid')
+
+    with STAGE_LATENCY.time(stage='image_decode'):
+        return decode_upload(
+            file_storage.stream,
+            max_bytes=IMAGE_MAX_BYTES,
+            max_pixels=IMAGE_MAX_PIXELS,
+        )
 
-    if file_storage.stream.seekable():
-        file_storage.stream.seek(0)
-    file_bytes = np.frombuffer(file_storage.read(), np.uint8)
-    if file_storage.stream.seekable():
-        file_storage.stream.seek(0)
+quality_gate = ImageQualityGate(
+    enabled=QUALITY_GATE_ENABLED,
+    analysis_side=QUALITY_ANALYSIS_SIDE,
+    min_side=QUALITY_MIN_SIDE,
+    min_sharpness=QUALITY_MIN_SHARPNESS,
+    min_brightness=QUALITY_MIN_BRIGHTNESS,
+    max_brightness=QUALITY_MAX_BRIGHTNESS,
+    min_contrast=QUALITY_MIN_CONTRAST,
+    max_glare=QUALITY_MAX_GLARE,
+)
 
-    if file_bytes.size == 0:
-        raise ValueError('File kosong atau rusak')
 
-    image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-    if image is None:
-        raise ValueError('Gagal membaca isi gambar, pastikan format valid')
-    return image
+def _quality_rejected(report):
+    """Respons 422 untuk foto yang ditolak gerbang kualitas, berisi saran perbaikan."""
+    return jsonify({
+        'status': 'error',
+        'code': 'image_quality',
+        'message': report.message,
+        'quality': report.to_dict(),
+    }), 422
 
 def _contains_honda_keyword(value):
     if not value:
@@ -196,23 +410,132 @@ def _fetch_sparepart_local(kode_part):
     if not kode_part:
         return None
     normalized_code = kode_part.strip().upper()
-    conn = get_sparepart_connection()
+    with STAGE_LATENCY.time(stage='db_lookup'):
+        if DB_BACKEND != 'mysql':
+            return _fetch_sparepart_sqlite(normalized_code)
+        conn = get_sparepart_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    '''
+                    SELECT s.*, c.nama_kategori
+                    FROM spareparts s
+                    LEFT JOIN categories c ON s.kategori_id = c.id
+                    WHERE UPPER(s.kode_part) = %s AND s.is_original = 1
+                    ''',
+                    (normalized_code,),
+                )
+                return cursor.fetchone()
+        finally:
+            conn.close()
+
+
+def _fetch_sparepart_sqlite(normalized_code):
+    """Padanan _fetch_sparepart_local untuk skema SQLite (kolom disamakan dengan MySQL)."""
+    conn = get_db_connection()
     try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                '''
-                SELECT s.*, c.nama_kategori
-                FROM spareparts s
-                LEFT JOIN categories c ON s.kategori_id = c.id
-                WHERE UPPER(s.kode_part) = %s AND s.is_original = 1
-                ''',
-                (normalized_code,),
-            )
-            return cursor.fetchone()
+        cursor = conn.cursor()
+        cursor.execute(
+            '''
+            SELECT s.*, s.id_sparepart AS id, k.nama_kategori
+            FROM spareparts s
+            LEFT JOIN kategori k ON s.id_kategori = k.id_kategori
+            WHERE s.kode_part = ? AND s.is_original = 1
+            ''',
+            (normalized_code,),
+        )
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def _load_catalog_codes():
+    """Seluruh kode part original untuk indeks katalog (MySQL dipakai bersama backend PHP)."""
+    conn = get_db_connection()
+    try:
+        if DB_BACKEND == 'mysql':
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT kode_part FROM spareparts WHERE is_original = 1')
+                return [row['kode_part'] for row in cursor.fetchall()]
+        cursor = conn.cursor()
+        cursor.execute('SELECT kode_part FROM spareparts WHERE is_original = 1')
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+part_code_index = PartCodeIndex(
+    _load_catalog_codes,
+    refresh_interval=CATALOG_INDEX_REFRESH,
+    max_edits=CATALOG_MATCH_MAX_EDITS,
+)
+
+_SECURITY_CODES_QUERY = (
+    'SELECT kode_part, qr_code, hologram_code FROM spareparts '
+    'WHERE is_original = 1 AND (qr_code IS NOT NULL OR hologram_code IS NOT NULL)'
+)
+
+
+def _load_security_codes():
+    """Pasangan (kode_part, qr_code, hologram_code) untuk indeks balik QR/hologram."""
+    conn = get_db_connection()
+    try:
+        if DB_BACKEND == 'mysql':
+            with conn.cursor() as cursor:
+                cursor.execute(_SECURITY_CODES_QUERY)
+                return [(row['kode_part'], row['qr_code'], row['hologram_code']) for row in cursor.fetchall()]
+        cursor = conn.cursor()
+        cursor.execute(_SECURITY_CODES_QUERY)
+        return [tuple(row) for row in cursor.fetchall()]
     finally:
         conn.close()
 
 
+security_code_index = SecurityCodeIndex(_load_security_codes, refresh_interval=CATALOG_INDEX_REFRESH)
+
+
+def _fetch_part_code_by_security_code(payload):
+    """Fallback database bila indeks belum termuat.
+
+    Kolom tersimpan mentah; sisi database dinormalisasi ``UPPER(TRIM(...))`` (kolom
+    generated ``*_norm`` di MySQL, index ekspresi di SQLite), sama dengan
+    :func:`normalize_payload` yang dipakai ``security_code_index``.
+    """
+    normalized = normalize_payload(payload)
+    if not normalized:
+        return None
+    if DB_BACKEND == 'mysql':
+        query = (
+            'SELECT kode_part FROM spareparts WHERE is_original = 1 '
+            'AND (qr_code_norm = %s OR hologram_code_norm = %s) LIMIT 1'
+        )
+    else:
+        query = (
+            'SELECT kode_part FROM spareparts WHERE is_original = 1 '
+            'AND (UPPER(TRIM(qr_code)) = ? OR UPPER(TRIM(hologram_code)) = ?) LIMIT 1'
+        )
+    with STAGE_LATENCY.time(stage='db_lookup'):
+        conn = get_db_connection()
+        try:
+            if DB_BACKEND == 'mysql':
+                with conn.cursor() as cursor:
+                    cursor.execute(query, (normalized, normalized))
+                    row = cursor.fetchone()
+                    return row['kode_part'] if row else None
+            cursor = conn.cursor()
+            cursor.execute(query, (normalized, normalized))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+
+def _invalidate_catalog_indexes():
+    part_code_index.invalidate()
+    security_code_index.invalidate()
+
+
 def fetch_sparepart_by_code(kode_part):
     if not kode_part:
         return None
@@ -220,11 +543,12 @@ def fetch_sparepart_by_code(kode_part):
     normalized_code = kode_part.strip().upper()
     local_row = _fetch_sparepart_local(normalized_code)
     try:
-        response = php_api_request(
-            '/admin-api/spareparts/detail',
-            method='GET',
-            params={'kode_part': normalized_code},
-        )
+        with STAGE_LATENCY.time(stage='php_lookup'):
+            response = php_api_request(
+                '/admin-api/spareparts/detail',
+                method='GET',
+                params={'kode_part': normalized_code},
+            )
     except PHPAPIError as exc:
         message = str(exc).lower()
         if 'tidak ditemukan' in message or 'not found' in message:
@@ -246,55 +570,120 @@ def log_verification_event(
     method: Optional[str] = 'QR',
     sparepart_id: Optional[int] = None,
 ):
-    kode_part_normalized = (kode_part or 'UNKNOWN').upper()
-    if DB_BACKEND == 'mysql':
-        conn = get_sparepart_connection()
+    with STAGE_LATENCY.time(stage='log_write'):
+        kode_part_normalized = (kode_part or 'UNKNOWN').upper()
+        _ensure_verification_rollup()
+        ensure_verifikasi_log_metode_column()
+        if DB_BACKEND == 'mysql':
+            conn = get_sparepart_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        '''
+                        INSERT INTO verification_logs (sparepart_id, kode_part, status, metode, ip_address, user_agent_id)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ''',
+                        (
+                            sparepart_id,
+                            kode_part_normalized,
+                            status,
+                            method or 'QR',
+                            ip_address or 'Unknown',
+                            log_storage.user_agent_id(cursor, user_agent or 'Unknown'),
+                        ),
+                    )
+                    _increment_verification_rollup(cursor, status)
+                conn.commit()
+            finally:
+                conn.close()
+            hotspot_tracker.record(kode_part_normalized, status, ip_address)
+            log_storage.maybe_run_maintenance()
+            return
+
+        conn = get_db_connection()
         try:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    '''
-                    INSERT INTO verification_logs (sparepart_id, kode_part, status, ip_address, user_agent)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ''',
-                    (
-                        sparepart_id,
-                        kode_part_normalized,
-                        status,
-                        ip_address or 'Unknown',
-                        user_agent or 'Unknown',
-                    ),
-                )
+            cursor = conn.cursor()
+            cursor.execute(
+                '''
+                INSERT INTO verifikasi_log (kode_part, status, ip_address, user_agent_id, metode)
+                VALUES (?, ?, ?, ?, ?)
+                ''',
+                (
+                    kode_part_normalized,
+                    status,
+                    ip_address or 'Unknown',
+                    log_storage.user_agent_id(cursor, user_agent or 'Unknown'),
+                    method or 'QR',
+                ),
+            )
+            _increment_verification_rollup(cursor, status)
             conn.commit()
         finally:
             conn.close()
-        return
+        hotspot_tracker.record(kode_part_normalized, status, ip_address)
+        log_storage.maybe_run_maintenance()
 
-    ensure_verifikasi_log_metode_column()
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+
+def _increment_verification_rollup(cursor, status: str):
+    """Naikkan counter harian dalam transaksi yang sama dengan insert log."""
+    is_asli = 1 if status == 'ASLI' else 0
+    if DB_BACKEND == 'mysql':
         cursor.execute(
             '''
-            INSERT INTO verifikasi_log (kode_part, status, ip_address, user_agent, metode)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO verification_log_daily (tanggal, total, total_asli, total_tidak_valid)
+            VALUES (CURDATE(), 1, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                total = total + 1,
+                total_asli = total_asli + VALUES(total_asli),
+                total_tidak_valid = total_tidak_valid + VALUES(total_tidak_valid)
             ''',
-            (
-                kode_part_normalized,
-                status,
-                ip_address or 'Unknown',
-                user_agent or 'Unknown',
-                method or 'QR',
-            ),
+            (is_asli, 1 - is_asli),
         )
-        conn.commit()
-    finally:
-        conn.close()
+        return
+
+    cursor.execute(
+        '''
+        INSERT INTO verifikasi_log_harian (tanggal, total, total_asli, total_tidak_valid)
+        VALUES (DATE('now', 'localtime'), 1, ?, ?)
+        ON CONFLICT(tanggal) DO UPDATE SET
+            total = total + 1,
+            total_asli = total_asli + excluded.total_asli,
+            total_tidak_valid = total_tidak_valid + excluded.total_tidak_valid
+        ''',
+        (is_asli, 1 - is_asli),
+    )
+
+
+_verification_log_schema_checked = False
+
+SQLITE_VERIFICATION_LOG_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_verifikasi_log_waktu ON verifikasi_log (waktu_cek, id_log)',
+    'CREATE INDEX IF NOT EXISTS idx_verifikasi_log_metode_waktu ON verifikasi_log (metode, waktu_cek, id_log)',
+)
+
+# Lookup balik payload QR / kode hologram -> sparepart (index ekspresi, sama dengan normalisasi query)
+SQLITE_SPAREPART_INDEXES = (
+    'DROP INDEX IF EXISTS idx_spareparts_qr_code',
+    'DROP INDEX IF EXISTS idx_spareparts_hologram_code',
+    'CREATE INDEX IF NOT EXISTS idx_spareparts_qr_code_norm ON spareparts (UPPER(TRIM(qr_code)))',
+    'CREATE INDEX IF NOT EXISTS idx_spareparts_hologram_code_norm ON spareparts (UPPER(TRIM(hologram_code)))',
+)
 
 
 def ensure_verifikasi_log_metode_column():
-    """Pastikan kolom metode tersedia pada tabel verifikasi_log untuk kompatibilitas lama."""
-    if DB_BACKEND != 'sqlite':
+    """Pastikan kolom metode + index riwayat tersedia pada tabel log untuk kompatibilitas lama.
+
+    Pemeriksaan skema cukup sekali per proses.
+    """
+    global _verification_log_schema_checked
+    if _verification_log_schema_checked:
         return
+
+    if DB_BACKEND == 'mysql':
+        _ensure_verification_logs_mysql_schema()
+        _verification_log_schema_checked = True
+        return
+
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
@@ -304,10 +693,57 @@ def ensure_verifikasi_log_metode_column():
         if not cursor.fetchone():
             return
         cursor.execute("PRAGMA table_info(verifikasi_log)")
-        has_metode = any(row['name'] == 'metode' for row in cursor.fetchall())
-        if not has_metode:
+        columns = {row['name'] for row in cursor.fetchall()}
+        if 'metode' not in columns:
             cursor.execute("ALTER TABLE verifikasi_log ADD COLUMN metode TEXT DEFAULT 'QR'")
-            conn.commit()
+        if 'user_agent_id' not in columns:
+            cursor.execute("ALTER TABLE verifikasi_log ADD COLUMN user_agent_id INTEGER")
+        for statement in SQLITE_VERIFICATION_LOG_INDEXES + SQLITE_STORAGE_DDL:
+            cursor.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+    _verification_log_schema_checked = True
+
+
+def _ensure_verification_logs_mysql_schema():
+    conn = get_sparepart_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                '''
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'verification_logs'
+                '''
+            )
+            columns = {row['COLUMN_NAME'] for row in cursor.fetchall()}
+            if not columns:
+                return
+            if 'metode' not in columns:
+                cursor.execute(
+                    "ALTER TABLE verification_logs ADD COLUMN metode VARCHAR(10) NOT NULL DEFAULT 'QR' AFTER status"
+                )
+            if 'user_agent_id' not in columns:
+                cursor.execute(
+                    "ALTER TABLE verification_logs ADD COLUMN user_agent_id INT UNSIGNED NULL AFTER user_agent"
+                )
+            cursor.execute(
+                '''
+                SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'verification_logs'
+                '''
+            )
+            indexes = {row['INDEX_NAME'] for row in cursor.fetchall()}
+            if 'idx_verif_created' not in indexes:
+                cursor.execute('CREATE INDEX idx_verif_created ON verification_logs (created_at, id)')
+            if 'idx_verif_metode_created' not in indexes:
+                cursor.execute(
+                    'CREATE INDEX idx_verif_metode_created ON verification_logs (metode, created_at, id)'
+                )
+        conn.commit()
+    except pymysql.MySQLError as exc:
+        # Migrasi otomatis butuh hak ALTER; jika tidak ada, jalankan mysql_schema.sql manual.
+        app.logger.warning('Migrasi verification_logs gagal: %s', exc)
     finally:
         conn.close()
 
@@ -322,73 +758,252 @@ def _format_timestamp(value: str) -> str:
     return dt.strftime('%d %b %Y %H:%M')
 
 
+def _encode_history_cursor(waktu, log_id) -> str:
+    if isinstance(waktu, datetime):
+        waktu = waktu.strftime('%Y-%m-%d %H:%M:%S')
+    raw = json.dumps([waktu, int(log_id)], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_history_cursor(cursor_token: str):
+    try:
+        padded = cursor_token + '=' * (-len(cursor_token) % 4)
+        waktu, log_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(waktu), int(log_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError('Cursor riwayat tidak valid') from exc
+
+
+def get_verification_logs_page(
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    method: Optional[str] = None,
+    methods: Optional[List[str]] = None,
+):
+    """Satu halaman riwayat verifikasi terbaru dengan keyset pagination.
+
+    Urutan (waktu, id) DESC dilayani langsung oleh index komposit, dan halaman
+    berikutnya diambil lewat ``next_cursor`` sehingga biaya per halaman tetap
+    konstan berapapun dalamnya halaman yang diminta.
+    """
+    if method and methods:
+        raise ValueError('Gunakan method atau methods, bukan keduanya sekaligus')
+
+    limit = max(1, min(int(limit), VERIFICATION_HISTORY_MAX_LIMIT))
+    after = _decode_history_cursor(cursor) if cursor else None
+    ensure_verifikasi_log_metode_column()
+
+    if DB_BACKEND == 'mysql':
+        placeholder, table, time_col, id_col = '%s', 'verification_logs', 'created_at', 'id'
+    else:
+        placeholder, table, time_col, id_col = '?', 'verifikasi_log', 'waktu_cek', 'id_log'
+
+    conditions = []
+    params = []
+    if methods:
+        conditions.append(f"metode IN ({','.join(placeholder for _ in methods)})")
+        params.extend(methods)
+    elif method:
+        conditions.append(f'metode = {placeholder}')
+        params.append(method)
+    if after:
+        conditions.append(
+            f'({time_col} < {placeholder} OR ({time_col} = {placeholder} AND {id_col} < {placeholder}))'
+        )
+        params.extend([after[0], after[0], after[1]])
+
+    query = f'''
+        SELECT {id_col} AS log_id, kode_part, status, {time_col} AS waktu_cek, metode
+        FROM {{table}}
+    '''
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += f' ORDER BY {time_col} DESC, {id_col} DESC LIMIT {placeholder}'
+    params.append(limit + 1)
+
+    conn = get_db_connection()
+    try:
+        if DB_BACKEND == 'mysql':
+            with conn.cursor() as db_cursor:
+                db_cursor.execute(query.format(table=table), tuple(params))
+                rows = db_cursor.fetchall()
+        else:
+            # Tabel panas dulu lalu arsip bulanan dari yang terbaru, sampai halaman penuh.
+            db_cursor = conn.cursor()
+            rows = []
+            for log_table in log_storage.sqlite_log_tables(db_cursor, newest_first=True):
+                params[-1] = limit + 1 - len(rows)
+                db_cursor.execute(query.format(table=log_table), tuple(params))
+                rows.extend(db_cursor.fetchall())
+                if len(rows) > limit:
+                    break
+    finally:
+        conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = _encode_history_cursor(rows[-1]['waktu_cek'], rows[-1]['log_id'])
+
+    items = []
+    for row in rows:
+        waktu = row['waktu_cek']
+        if isinstance(waktu, datetime):
+            waktu_label = waktu.strftime('%d %b %Y %H:%M')
+        else:
+            waktu_label = _format_timestamp(waktu)
+        items.append(
+            {
+                'kode_part': row['kode_part'],
+                'status': row['status'],
+                'waktu_cek': waktu_label,
+                'metode': row['metode'] or 'QR',
+            }
+        )
+    return {'items': items, 'next_cursor': next_cursor}
+
+
 def get_recent_verification_logs(
     limit: int = 10,
     method: Optional[str] = None,
     methods: Optional[List[str]] = None,
 ):
+    return get_verification_logs_page(limit=limit, method=method, methods=methods)['items']
+
+
+SQLITE_VERIFICATION_ROLLUP_DDL = '''
+    CREATE TABLE IF NOT EXISTS verifikasi_log_harian (
+        tanggal TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        total_asli INTEGER NOT NULL DEFAULT 0,
+        total_tidak_valid INTEGER NOT NULL DEFAULT 0
+    )
+'''
+_verification_rollup_checked = False
+
+
+def rebuild_verification_rollup():
+    """Hitung ulang tabel rekap harian dari seluruh log (backfill / rekonsiliasi).
+
+    Log mentah dibaca dari tabel panas beserta seluruh arsip bulanan. Bulan yang
+    mentahnya sudah dibuang retensi hanya tersisa di rollup bulanan, jadi ditulis
+    sebagai satu baris bertanggal hari pertama bulan tersebut.
+    """
     if DB_BACKEND == 'mysql':
         conn = get_sparepart_connection()
         try:
             with conn.cursor() as cursor:
+                cursor.execute('DELETE FROM verification_log_daily')
                 cursor.execute(
                     '''
-                    SELECT kode_part, status, created_at
+                    INSERT INTO verification_log_daily (tanggal, total, total_asli, total_tidak_valid)
+                    SELECT
+                        DATE(created_at),
+                        COUNT(*),
+                        SUM(CASE WHEN status = 'ASLI' THEN 1 ELSE 0 END),
+                        SUM(CASE WHEN status <> 'ASLI' THEN 1 ELSE 0 END)
                     FROM verification_logs
-                    ORDER BY created_at DESC
-                    LIMIT %s
-                    ''',
-                    (limit,),
+                    GROUP BY DATE(created_at)
+                    '''
+                )
+                cursor.execute(
+                    '''
+                    INSERT INTO verification_log_daily (tanggal, total, total_asli, total_tidak_valid)
+                    SELECT
+                        STR_TO_DATE(CONCAT(bulan, '-01'), '%Y-%m-%d'),
+                        SUM(total),
+                        SUM(CASE WHEN status = 'ASLI' THEN total ELSE 0 END),
+                        SUM(CASE WHEN status <> 'ASLI' THEN total ELSE 0 END)
+                    FROM verification_log_monthly
+                    WHERE bulan NOT IN (
+                        SELECT bulan FROM (
+                            SELECT DISTINCT DATE_FORMAT(tanggal, '%Y-%m') AS bulan FROM verification_log_daily
+                        ) AS bulan_mentah
+                    )
+                    GROUP BY bulan
+                    '''
                 )
-                rows = cursor.fetchall()
+            conn.commit()
         finally:
             conn.close()
-        return [
-            {
-                'kode_part': row['kode_part'],
-                'status': row['status'],
-                'waktu_cek': row['created_at'].strftime('%d %b %Y %H:%M') if row['created_at'] else '-',
-                'metode': 'QR',
-            }
-            for row in rows
-        ]
+        return
 
-    ensure_verifikasi_log_metode_column()
-    if method and methods:
-        raise ValueError('Gunakan method atau methods, bukan keduanya sekaligus')
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SQLITE_VERIFICATION_ROLLUP_DDL)
+        log_storage.ensure_sqlite_tables(cursor)
+        raw_logs = ' UNION ALL '.join(
+            f'SELECT waktu_cek, status FROM {table}' for table in log_storage.sqlite_log_tables(cursor)
+        )
+        cursor.execute('DELETE FROM verifikasi_log_harian')
+        cursor.execute(
+            f'''
+            INSERT INTO verifikasi_log_harian (tanggal, total, total_asli, total_tidak_valid)
+            SELECT
+                DATE(waktu_cek, 'localtime'),
+                COUNT(*),
+                SUM(CASE WHEN status = 'ASLI' THEN 1 ELSE 0 END),
+                SUM(CASE WHEN status <> 'ASLI' THEN 1 ELSE 0 END)
+            FROM ({raw_logs})
+            GROUP BY DATE(waktu_cek, 'localtime')
+            '''
+        )
+        cursor.execute(
+            '''
+            INSERT INTO verifikasi_log_harian (tanggal, total, total_asli, total_tidak_valid)
+            SELECT
+                bulan || '-01',
+                SUM(total),
+                SUM(CASE WHEN status = 'ASLI' THEN total ELSE 0 END),
+                SUM(CASE WHEN status <> 'ASLI' THEN total ELSE 0 END)
+            FROM verifikasi_log_bulanan
+            WHERE bulan NOT IN (SELECT DISTINCT substr(tanggal, 1, 7) FROM verifikasi_log_harian)
+            GROUP BY bulan
+            '''
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ensure_verification_rollup():
+    """Backfill sekali per proses bila tabel rekap masih kosong padahal log (panas, arsip, atau rollup bulanan) sudah ada."""
+    global _verification_rollup_checked
+    if _verification_rollup_checked:
+        return
 
     conn = get_db_connection()
-    cursor = conn.cursor()
-    query = '''
-        SELECT kode_part, status, waktu_cek, metode
-        FROM verifikasi_log
-    '''
-    params = []
-    if methods:
-        placeholders = ','.join('?' for _ in methods)
-        query += f' WHERE metode IN ({placeholders})'
-        params.extend(methods)
-    elif method:
-        query += ' WHERE metode = ?'
-        params.append(method)
-    query += ' ORDER BY datetime(waktu_cek) DESC LIMIT ?'
-    params.append(limit)
+    try:
+        cursor = conn.cursor()
+        if DB_BACKEND == 'mysql':
+            rollup_table = 'verification_log_daily'
+            log_tables = ['verification_logs', 'verification_log_monthly']
+        else:
+            cursor.execute(SQLITE_VERIFICATION_ROLLUP_DDL)
+            log_storage.ensure_sqlite_tables(cursor)
+            rollup_table = 'verifikasi_log_harian'
+            log_tables = log_storage.sqlite_log_tables(cursor) + ['verifikasi_log_bulanan']
+        cursor.execute(f'SELECT 1 AS ada FROM {rollup_table} LIMIT 1')
+        has_rollup = cursor.fetchone() is not None
+        has_logs = False
+        for table in log_tables:
+            cursor.execute(f'SELECT 1 AS ada FROM {table} LIMIT 1')
+            if cursor.fetchone() is not None:
+                has_logs = True
+                break
+    finally:
+        conn.close()
 
-    cursor.execute(query, tuple(params))
-    rows = cursor.fetchall()
-    conn.close()
-    return [
-        {
-            'kode_part': row['kode_part'],
-            'status': row['status'],
-            'waktu_cek': _format_timestamp(row['waktu_cek']),
-            'metode': row['metode'] or 'QR',
-        }
-        for row in rows
-    ]
+    if has_logs and not has_rollup:
+        rebuild_verification_rollup()
+    _verification_rollup_checked = True
 
 
 def get_verification_stats():
+    """Statistik landing page dari tabel rekap harian (satu baris per hari, bukan per log)."""
+    _ensure_verification_rollup()
     if DB_BACKEND == 'mysql':
         conn = get_sparepart_connection()
         try:
@@ -396,21 +1011,21 @@ def get_verification_stats():
                 cursor.execute(
                     '''
                     SELECT
-                        COUNT(*) AS total_semua,
-                        SUM(CASE WHEN status = 'ASLI' THEN 1 ELSE 0 END) AS total_asli,
-                        SUM(CASE WHEN status <> 'ASLI' THEN 1 ELSE 0 END) AS total_tidak_valid,
-                        SUM(CASE WHEN DATE(created_at) = CURDATE() THEN 1 ELSE 0 END) AS total_hari_ini
-                    FROM verification_logs
+                        SUM(total) AS total_semua,
+                        SUM(total_asli) AS total_asli,
+                        SUM(total_tidak_valid) AS total_tidak_valid,
+                        SUM(CASE WHEN tanggal = CURDATE() THEN total ELSE 0 END) AS total_hari_ini
+                    FROM verification_log_daily
                     '''
                 )
                 row = cursor.fetchone() or {}
         finally:
             conn.close()
         return {
-            'total_semua': row.get('total_semua', 0) or 0,
-            'total_asli': row.get('total_asli', 0) or 0,
-            'total_tidak_valid': row.get('total_tidak_valid', 0) or 0,
-            'total_hari_ini': row.get('total_hari_ini', 0) or 0,
+            'total_semua': int(row.get('total_semua') or 0),
+            'total_asli': int(row.get('total_asli') or 0),
+            'total_tidak_valid': int(row.get('total_tidak_valid') or 0),
+            'total_hari_ini': int(row.get('total_hari_ini') or 0),
         }
 
     conn = get_db_connection()
@@ -418,11 +1033,11 @@ def get_verification_stats():
     cursor.execute(
         '''
         SELECT
-            COUNT(*) AS total_semua,
-            SUM(CASE WHEN status = 'ASLI' THEN 1 ELSE 0 END) AS total_asli,
-            SUM(CASE WHEN status <> 'ASLI' THEN 1 ELSE 0 END) AS total_tidak_valid,
-            SUM(CASE WHEN DATE(waktu_cek) = DATE('now', 'localtime') THEN 1 ELSE 0 END) AS total_hari_ini
-        FROM verifikasi_log
+            SUM(total) AS total_semua,
+            SUM(total_asli) AS total_asli,
+            SUM(total_tidak_valid) AS total_tidak_valid,
+            SUM(CASE WHEN tanggal = DATE('now', 'localtime') THEN total ELSE 0 END) AS total_hari_ini
+        FROM verifikasi_log_harian
         '''
     )
     row = cursor.fetchone() or {}
@@ -436,12 +1051,37 @@ def get_verification_stats():
 
 
 # Fungsi koneksi database
+sqlite_connections = SQLiteConnectionManager(
+    SQLITE_PATH,
+    performance_mode=SQLITE_PERFORMANCE_MODE,
+    cache_size_kib=SQLITE_CACHE_SIZE_KB,
+    mmap_size=SQLITE_MMAP_SIZE,
+)
+
+
 def get_db_connection():
     if DB_BACKEND == 'mysql':
         return get_sparepart_connection()
-    conn = sqlite3.connect('honda_spareparts.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    return sqlite_connections.connect()
+
+
+log_storage = VerificationLogStorage(
+    DB_BACKEND,
+    get_db_connection,
+    hot_months=LOG_HOT_MONTHS,
+    retention_months=LOG_RETENTION_MONTHS,
+    interval=LOG_MAINTENANCE_INTERVAL,
+)
+
+hotspot_tracker = HotspotTracker(
+    HOTSPOT_STORE_PATH,
+    window_seconds=HOTSPOT_WINDOW_SECONDS,
+    windows=HOTSPOT_WINDOWS,
+    snapshot_interval=HOTSPOT_SNAPSHOT_INTERVAL,
+    width=HOTSPOT_SKETCH_WIDTH,
+    top_k=HOTSPOT_TOP_K,
+    enabled=HOTSPOT_ENABLED,
+)
 
 # Fungsi inisialisasi database
 def init_db():
@@ -479,6 +1119,8 @@ def init_db():
             FOREIGN KEY (id_kategori) REFERENCES kategori(id_kategori)
         )
     ''')
+    for statement in SQLITE_SPAREPART_INDEXES:
+        cursor.execute(statement)
     
     # Tabel Verifikasi (Log pengecekan)
     cursor.execute('''
@@ -488,10 +1130,20 @@ def init_db():
             status TEXT,
             ip_address TEXT,
             user_agent TEXT,
+            user_agent_id INTEGER,
             metode TEXT DEFAULT 'QR',
             waktu_cek TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    for statement in SQLITE_VERIFICATION_LOG_INDEXES:
+        cursor.execute(statement)
+
+    # Dictionary user agent + agregat bulanan untuk log yang sudah melewati retensi
+    for statement in SQLITE_STORAGE_DDL:
+        cursor.execute(statement)
+
+    # Tabel rekap harian verifikasi (dipelihara oleh log_verification_event)
+    cursor.execute(SQLITE_VERIFICATION_ROLLUP_DDL)
     
     # Tabel Admin
     cursor.execute('''
@@ -559,9 +1211,23 @@ def init_db():
         password_hash = hashlib.sha256('admin123'.encode()).hexdigest()
         cursor.execute("INSERT INTO admin (username, password, nama_lengkap) VALUES (?, ?, ?)",
                       ('admin', password_hash, 'Administrator'))
-# ============= ROUTES =============
+
+    conn.commit()
+    conn.close()
+# ============= ROUTES =============
 
 # Route Home/Landing Page
+landing_cache = SingleFlightCache(ttl=LANDING_CACHE_TTL)
+
+
+def _load_landing_widgets():
+    return {
+        'verification_stats': get_verification_stats(),
+        'qr_history': get_recent_verification_logs(limit=5, method='QR'),
+        'foto_history': get_recent_verification_logs(limit=5, method='FOTO'),
+    }
+
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
 
@@ -571,16 +1237,12 @@ def index():
     if request.args.get('admin') == 'true' or request.method == 'POST':
         return login_page()
     
-    stats = get_verification_stats()
-    qr_history = get_recent_verification_logs(limit=5, method='QR')
-    foto_history = get_recent_verification_logs(limit=5, method='FOTO')
+    widgets = landing_cache.get_or_compute('landing', _load_landing_widgets)
     
-    return render_template(
-        'landing.html',
-        verification_stats=stats,
-        qr_history=qr_history,
-        foto_history=foto_history,
-    )
+    response = make_response(render_template('landing.html', **widgets))
+    response.headers['Cache-Control'] = f'public, max-age={int(LANDING_CACHE_TTL)}'
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -637,14 +1299,25 @@ def logout():
 @app.route('/api/verification-history')
 def api_verification_history():
     method_param = request.args.get('method')
+    methods_param = [m.strip().upper() for m in request.args.get('methods', '').split(',') if m.strip()]
     limit = request.args.get('limit', default=10, type=int)
+    cursor_param = request.args.get('cursor') or None
 
     try:
-        logs = get_recent_verification_logs(limit=limit, method=method_param)
+        page = get_verification_logs_page(
+            limit=limit,
+            cursor=cursor_param,
+            method=method_param,
+            methods=methods_param or None,
+        )
     except ValueError as exc:
         return jsonify({'status': 'error', 'message': str(exc)}), 400
 
-    return jsonify({'status': 'success', 'history': logs})
+    return jsonify({
+        'status': 'success',
+        'history': page['items'],
+        'next_cursor': page['next_cursor'],
+    })
 
 
 @app.route('/panduan')
@@ -669,7 +1342,76 @@ def upload_training():
     """Halaman upload gambar training (Admin only)"""
     if 'admin_id' not in session:
         return redirect(url_for('login_page'))
-    return render_template('upload-training.html')
+    return render_template('upload-training.html', max_request_bytes=MAX_CONTENT_LENGTH)
+
+request_profiler = RequestProfiler(
+    enabled=PROFILER_ENABLED,
+    threshold_ms=PROFILER_THRESHOLD_MS,
+    sample_rate=PROFILER_SAMPLE_RATE,
+    capacity=PROFILER_BUFFER_SIZE,
+    sampling_interval_ms=PROFILER_SAMPLING_INTERVAL_MS,
+)
+
+
+def _profile_debug_requested() -> bool:
+    """Header debug hanya dihormati untuk sesi admin."""
+    return request.headers.get(DEBUG_HEADER) == '1' and 'admin_id' in session
+
+
+def profile_endpoint(endpoint: str):
+    return request_profiler.profile_endpoint(
+        endpoint,
+        path_getter=lambda: request.path,
+        debug_requested=_profile_debug_requested,
+    )
+
+
+# Kelas admission: CNN+OCR (image), lookup kode/QR murah (lookup), stream kamera berumur panjang (stream),
+# ekspor log besar (export), SSE status job async yang menahan worker hingga selesai (events)
+admission_controller = AdmissionController(enabled=ADMISSION_ENABLED)
+admission_controller.add_class(
+    'image',
+    max_concurrent=ADMISSION_IMAGE_CONCURRENCY,
+    max_queue=ADMISSION_IMAGE_QUEUE,
+    queue_timeout=ADMISSION_IMAGE_TIMEOUT,
+    degrade_queue=ADMISSION_DEGRADE_QUEUE,
+    degrade_wait=ADMISSION_DEGRADE_WAIT,
+)
+admission_controller.add_class(
+    'lookup',
+    max_concurrent=ADMISSION_LOOKUP_CONCURRENCY,
+    max_queue=ADMISSION_LOOKUP_QUEUE,
+    queue_timeout=ADMISSION_LOOKUP_TIMEOUT,
+)
+admission_controller.add_class(
+    'stream',
+    max_concurrent=ADMISSION_STREAM_CONCURRENCY,
+    max_queue=0,
+    queue_timeout=0,
+)
+admission_controller.add_class(
+    'export',
+    max_concurrent=ADMISSION_EXPORT_CONCURRENCY,
+    max_queue=0,
+    queue_timeout=0,
+)
+admission_controller.add_class(
+    'events',
+    max_concurrent=ADMISSION_EVENTS_CONCURRENCY,
+    max_queue=0,
+    queue_timeout=0,
+)
+
+
+def _admission_rejected(exc):
+    response = jsonify({'status': 'error', 'message': str(exc), 'retry_after': exc.retry_after})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+def admission_controlled(class_name: str):
+    return admission_controller.admit(class_name, on_overload=_admission_rejected)
 
 # Route Dashboard Admin
 @app.route('/dashboard')
@@ -693,6 +1435,12 @@ def dashboard():
     
     local_logs = get_recent_verification_logs(10)
     logs = local_logs or dashboard_data.get('logs', [])
+    hotspots = None
+    if hotspot_tracker.enabled:
+        try:
+            hotspots = hotspot_tracker.summary(hours=24, limit=5)
+        except Exception as exc:  # noqa: BLE001 - panel analitik tidak boleh menggagalkan dashboard
+            app.logger.warning('Ringkasan hotspot gagal: %s', exc)
     
     return render_template(
         'dashboard.html',
@@ -706,6 +1454,9 @@ def dashboard():
         admin_name=session.get('nama_lengkap'),
         dashboard_error=error_message,
         categories=categories,
+        profiler_enabled=request_profiler.enabled,
+        profiles=[record.to_dict() for record in request_profiler.records()],
+        hotspots=hotspots,
     )
 
 @app.route('/dashboard/api/spareparts', methods=['POST'])
@@ -746,6 +1497,7 @@ def dashboard_create_sparepart():
     except PHPAPIError as exc:
         return jsonify({'status': 'error', 'message': str(exc)}), 400
 
+    _invalidate_catalog_indexes()
     return jsonify({
         'status': 'success',
         'message': response.get('message', 'Sparepart berhasil ditambahkan'),
@@ -765,12 +1517,122 @@ def dashboard_delete_sparepart(sparepart_id: int):
     except PHPAPIError as exc:
         return jsonify({'status': 'error', 'message': str(exc)}), 400
 
+    _invalidate_catalog_indexes()
     return jsonify({
         'status': 'success',
         'message': response.get('message', 'Sparepart berhasil dihapus'),
     })
 
+# Hotspot pemalsuan: top kode part / IP dengan hasil mencurigakan dan jumlah IP unik
+@app.route('/dashboard/api/hotspots', methods=['GET'])
+def dashboard_hotspots():
+    if 'admin_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    hours = request.args.get('hours', default=24, type=float)
+    limit = max(1, min(request.args.get('limit', default=10, type=int), HOTSPOT_TOP_K))
+    data = hotspot_tracker.summary(hours=hours, limit=limit)
+    kode_part = request.args.get('kode_part')
+    ip_address = request.args.get('ip')
+    if kode_part or ip_address:
+        data['estimate'] = {
+            'kode_part': kode_part,
+            'ip_address': ip_address,
+            'suspicious': hotspot_tracker.estimate(kode_part=kode_part, ip_address=ip_address, hours=hours),
+        }
+    return jsonify({'status': 'success', 'enabled': hotspot_tracker.enabled, 'data': data})
+
+@app.route('/dashboard/api/profiles', methods=['GET'])
+def dashboard_profiles():
+    if 'admin_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    return jsonify({
+        'status': 'success',
+        'enabled': request_profiler.enabled,
+        'threshold_ms': request_profiler.threshold_ms,
+        'sample_rate': request_profiler.sample_rate,
+        'data': [record.to_dict() for record in request_profiler.records()],
+    })
+
+@app.route('/dashboard/api/profiles/<int:profile_id>', methods=['GET'])
+def dashboard_profile_detail(profile_id: int):
+    if 'admin_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    record = request_profiler.get(profile_id)
+    if record is None:
+        return jsonify({'status': 'error', 'message': 'Profil tidak ditemukan'}), 404
+    return jsonify({'status': 'success', 'data': record.to_dict(include_summary=True)})
+
+@app.route('/dashboard/api/profiles/<int:profile_id>/download', methods=['GET'])
+def dashboard_profile_download(profile_id: int):
+    if 'admin_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    record = request_profiler.get(profile_id)
+    if record is None:
+        return jsonify({'status': 'error', 'message': 'Profil tidak ditemukan'}), 404
+    mimetype = 'application/octet-stream' if record.artifact_kind == 'pstats' else 'text/plain'
+    response = Response(record.artifact, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={record.download_name}'
+    return response
+
+def _parse_export_bound(value, *, end=False):
+    """``YYYY-MM-DD`` atau ``YYYY-MM-DD HH:MM[:SS]`` -> batas string; tanggal akhir tanpa jam bersifat inklusif."""
+    if not value:
+        return None
+    value = value.strip().replace('T', ' ')
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if end and fmt == '%Y-%m-%d':
+            parsed += timedelta(days=1)
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    raise ValueError(f'Format tanggal tidak valid: {value}')
+
+
+def _split_export_param(name):
+    return [item.strip().upper() for item in request.args.get(name, '').split(',') if item.strip()]
+
+
+# Ekspor log verifikasi (CSV / NDJSON) untuk rentang waktu panjang, di-stream dengan memori konstan
+@app.route('/dashboard/api/verification-logs/export', methods=['GET'])
+@admission_controlled('export')
+def dashboard_export_verification_logs():
+    if 'admin_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'status': 'error', 'message': 'Format harus csv atau ndjson'}), 400
+    try:
+        start = _parse_export_bound(request.args.get('start'))
+        end = _parse_export_bound(request.args.get('end'), end=True)
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    if start and end and start >= end:
+        return jsonify({'status': 'error', 'message': 'Tanggal awal harus sebelum tanggal akhir'}), 400
+
+    ensure_verifikasi_log_metode_column()
+    rows = log_storage.iter_logs(
+        start,
+        end,
+        methods=_split_export_param('methods'),
+        statuses=_split_export_param('status'),
+        batch_size=LOG_EXPORT_FETCH_ROWS,
+    )
+    encode = encode_csv if export_format == 'csv' else encode_ndjson
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    label = '_'.join(
+        secure_filename(request.args.get(name, ''))[:10] for name in ('start', 'end') if request.args.get(name)
+    ) or 'semua'
+    response = Response(stream_with_context(encode(rows, chunk_rows=LOG_EXPORT_CHUNK_ROWS)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=verifikasi_log_{label}.{export_format}'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/verify', methods=['POST'])
+@instrument_endpoint('verify')
+@admission_controlled('lookup')
 def verify_sparepart():
     data = request.get_json()
     kode_part = data.get('kode_part', '').strip().upper()
@@ -785,6 +1647,7 @@ def verify_sparepart():
     ip_address = request.remote_addr
     user_agent = request.headers.get('User-Agent', 'Unknown')
     status = 'ASLI' if sparepart_data else 'TIDAK DITEMUKAN'
+    VERIFICATION_OUTCOMES.inc(endpoint='verify', status=status)
     log_verification_event(
         kode_part,
         status,
@@ -831,12 +1694,36 @@ def _format_detection_message(analysis, sparepart_data, kode_part, brand_verifie
     return 'Produk ASLI Honda dan terdaftar di database'
 
 def _match_part_from_qr_codes(qr_codes):
-    for code in qr_codes:
-        row = fetch_sparepart_by_code(code)
-        if row:
-            return code, row
+    """Part pemilik payload QR/hologram terdaftar: (kode_part, sparepart) atau (None, None)."""
+    with STAGE_LATENCY.time(stage='resolve_sparepart'):
+        for payload in qr_codes or []:
+            if security_code_index.ready:
+                code = security_code_index.lookup(payload)
+            else:
+                code = _fetch_part_code_by_security_code(payload)
+            row = fetch_sparepart_by_code(code) if code else None
+            if row:
+                return code, row
     return None, None
 
+def _identify_part(image, kode_part, qr_codes, skip_ocr=None):
+    """(matched_code, sparepart, ocr_codes) untuk satu gambar.
+
+    QR/hologram yang terdaftar langsung menentukan part sehingga OCR dilewati;
+    bila pengguna mengetik kode lain, jalur OCR + katalog tetap dijalankan.
+    Saat server sibuk (admission degraded, atau ``skip_ocr=True``) OCR juga
+    dilewati: hanya QR + CNN.
+    """
+    matched_code, sparepart_data = _match_part_from_qr_codes(qr_codes)
+    if sparepart_data and (not kode_part or compact_code(kode_part) == compact_code(matched_code)):
+        return matched_code, sparepart_data, []
+    if admission_degraded() if skip_ocr is None else skip_ocr:
+        matched_code, sparepart_data = _resolve_sparepart(kode_part, [], qr_codes)
+        return matched_code, sparepart_data, []
+    ocr_codes = ocr_batcher.detect_part_codes(image)
+    matched_code, sparepart_data = _resolve_sparepart(kode_part, ocr_codes, qr_codes)
+    return matched_code, sparepart_data, ocr_codes
+
 def _normalize_part_code(value):
     if not value:
         return None
@@ -846,6 +1733,42 @@ def _normalize_part_code(value):
     return None
 
 def _resolve_sparepart(initial_code, ocr_codes, qr_codes):
+    with STAGE_LATENCY.time(stage='resolve_sparepart'):
+        if part_code_index.ready:
+            return _resolve_sparepart_indexed(initial_code, ocr_codes, qr_codes)
+        return _resolve_sparepart_candidates(initial_code, ocr_codes, qr_codes)
+
+def _resolve_sparepart_indexed(initial_code, ocr_codes, qr_codes):
+    """Seperti _resolve_sparepart_candidates, tetapi kandidat dipetakan dulu ke kode katalog.
+
+    Kode ketikan pengguna hanya dicocokkan persis (bentuk kompak) dan tetap
+    didahulukan. String OCR/QR boleh dikoreksi asalkan bedanya murni tertukar
+    confusable (0/O, 1/I, ...); kandidat yang butuh edit lain tidak dianggap
+    kode yang sama sehingga tidak bisa menghasilkan status ASLI. Data part
+    menyertakan ``distance`` dan ``corrected_from`` (string asli bila dikoreksi).
+    """
+    exact_code = part_code_index.lookup(initial_code) if initial_code else None
+    matches = [CodeMatch(exact_code, 0.0, initial_code)] if exact_code else []
+    matches += [
+        match for match in part_code_index.match_many(list(ocr_codes or []) + list(qr_codes or []))
+        if match.confusable_only
+    ]
+
+    seen = set()
+    for match in matches:
+        if match.kode_part in seen:
+            continue
+        seen.add(match.kode_part)
+        row = fetch_sparepart_by_code(match.kode_part)
+        if row:
+            sparepart_data = serialize_sparepart(row)
+            sparepart_data['distance'] = match.distance
+            sparepart_data['corrected_from'] = match.query if match.distance else None
+            return match.kode_part, sparepart_data
+
+    return _normalize_part_code(initial_code), None
+
+def _resolve_sparepart_candidates(initial_code, ocr_codes, qr_codes):
     candidates = []
     if initial_code:
         candidates.append(initial_code)
@@ -866,6 +1789,20 @@ def _resolve_sparepart(initial_code, ocr_codes, qr_codes):
     fallback = _normalize_part_code(initial_code)
     return fallback, None
 
+def _reference_evidence(image, analysis, matched_code):
+    """Hasil pencocokan referensi untuk kode part final beserta catatannya."""
+    reference = analysis.get('reference')
+    notes = list(analysis['notes'])
+    if matched_code and (not reference or reference['kode_part'] != matched_code):
+        stale_note = HybridDetectionEngine.reference_note(reference)
+        if stale_note in notes:
+            notes.remove(stale_note)
+        reference = detector_engine.match_references(image, matched_code)
+        note = HybridDetectionEngine.reference_note(reference)
+        if note:
+            notes.insert(max(len(notes) - 1, 0), note)
+    return reference, notes
+
 def _merge_brand_notes(notes, brand_verified):
     merged = list(notes)
     if brand_verified:
@@ -874,23 +1811,17 @@ def _merge_brand_notes(notes, brand_verified):
         merged.append('Brand tidak cocok dengan Honda sehingga status ditolak.')
     return merged
 
-# API Verifikasi dengan Image
-@app.route('/api/verify-image', methods=['POST'])
-def verify_image():
-    if 'image' not in request.files:
-        return jsonify({'status': 'error', 'message': 'Tidak ada file yang diupload'}), 400
-
-    file = request.files['image']
-    kode_part = request.form.get('kode_part', '').strip().upper() or None
-
-    try:
-        image = load_image_from_upload(file)
-    except ValueError as exc:
-        return jsonify({'status': 'error', 'message': str(exc)}), 400
+def _verify_image_result(image, kode_part, ip_address, user_agent):
+    """Pipeline verify-image (CNN + QR + OCR + database); dipakai mode sinkron maupun job async.
 
+    Bila OCR dilewati (degraded) dan part tidak teridentifikasi, hasilnya
+    ``TIDAK TERBACA``: bukan vonis keaslian, jadi tidak dicatat ke log maupun analitik.
+    """
+    started = time.perf_counter()
+    degraded = admission_degraded()
     analysis = detector_engine.analyze(image, kode_part)
-    ocr_codes = ocr_engine.detect_part_codes(image)
-    matched_code, sparepart_data = _resolve_sparepart(kode_part, ocr_codes, analysis['qr_codes'])
+    matched_code, sparepart_data, ocr_codes = _identify_part(image, kode_part, analysis['qr_codes'], skip_ocr=degraded)
+    reference, notes = _reference_evidence(image, analysis, matched_code)
     brand_verified = _is_honda_sparepart(
         sparepart_data,
         analysis['qr_codes'],
@@ -901,38 +1832,435 @@ def verify_image():
     if matched_code:
         final_authentic = final_authentic and bool(sparepart_data)
 
-    status = 'ASLI' if final_authentic else 'TIDAK VALID'
-    log_verification_event(
-        matched_code or kode_part,
-        status,
-        request.remote_addr,
-        request.headers.get('User-Agent'),
-        method='FOTO',
-    )
+    unreadable = degraded and not sparepart_data
+    if unreadable:
+        status = 'TIDAK TERBACA'
+        final_authentic = False
+        message = ('Server sedang sibuk sehingga pembacaan kode part dilewati. '
+                   'Coba lagi beberapa saat atau ketik kode part secara manual.')
+    else:
+        status = 'ASLI' if final_authentic else 'TIDAK VALID'
+        message = _format_detection_message(
+            analysis,
+            sparepart_data,
+            matched_code,
+            brand_verified,
+            final_authentic,
+        )
+    VERIFICATION_OUTCOMES.inc(endpoint='verify_image', status=status)
+    if not unreadable:
+        log_verification_event(
+            matched_code or kode_part,
+            status,
+            ip_address,
+            user_agent,
+            method='FOTO',
+        )
 
     response = {
         'status': 'success',
+        'verification_status': status,
         'authentic': final_authentic,
         'brand_verified': brand_verified,
         'confidence': analysis['confidence'],
         'qr_codes': analysis['qr_codes'],
         'ocr_codes': ocr_codes,
+        'degraded': degraded,
         'matched_code': matched_code,
-        'notes': _merge_brand_notes(analysis['notes'], brand_verified),
+        'notes': _merge_brand_notes(notes, brand_verified),
+        'reference_match': reference,
         'database_match': sparepart_data,
-        'message': _format_detection_message(
-            analysis,
+        'message': message,
+    }
+
+    if not degraded:  # durasi pipeline tanpa OCR bukan dasar perkiraan yang adil
+        quality_gate.observe_pipeline(time.perf_counter() - started)
+    return response, 200
+
+
+def _run_verification_job(payload):
+    """Antrean menyimpan byte terkompresi (bukan piksel ter-decode); decode dilakukan di worker."""
+    try:
+        with STAGE_LATENCY.time(stage='image_decode'):
+            image = decode_upload(
+                io.BytesIO(payload['image_bytes']),
+                max_bytes=IMAGE_MAX_BYTES,
+                max_pixels=IMAGE_MAX_PIXELS,
+            )
+    except ImageRejected as exc:
+        return {'status': 'error', 'message': str(exc)}, exc.status_code
+    return _verify_image_result(
+        image,
+        payload['kode_part'],
+        payload['ip_address'],
+        payload['user_agent'],
+    )
+
+
+verification_jobs = VerificationJobQueue(
+    _run_verification_job,
+    store_path=VERIFY_JOB_STORE_PATH,
+    workers=VERIFY_JOB_WORKERS,
+    max_pending=VERIFY_JOB_MAX_PENDING,
+    job_ttl=VERIFY_JOB_TTL,
+    result_ttl=VERIFY_JOB_RESULT_TTL,
+    encode=app.json.dumps,
+)
+
+
+def _async_requested():
+    if not VERIFY_ASYNC_ENABLED:
+        return False
+    flag = request.args.get('async') or request.form.get('async')
+    return flag == '1' or 'respond-async' in request.headers.get('Prefer', '')
+
+
+# API Verifikasi dengan Image
+@app.route('/api/verify-image', methods=['POST'])
+@instrument_endpoint('verify_image')
+@admission_controlled('image')
+@profile_endpoint('verify_image')
+def verify_image():
+    if 'image' not in request.files:
+        return jsonify({'status': 'error', 'message': 'Tidak ada file yang diupload'}), 400
+
+    file = request.files['image']
+    kode_part = request.form.get('kode_part', '').strip().upper() or None
+
+    try:
+        image = load_image_from_upload(file)
+    except ImageRejected as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), exc.status_code
+
+    quality = quality_gate.check(image, endpoint='verify_image')
+    if not quality.passed:
+        return _quality_rejected(quality)
+
+    if _async_requested():
+        del image  # job menunggu di antrean dengan byte terkompresi, jauh lebih kecil dari piksel
+        file.stream.seek(0)
+        try:
+            job = verification_jobs.submit({
+                'image_bytes': file.stream.read(),
+                'kode_part': kode_part,
+                'ip_address': request.remote_addr,
+                'user_agent': request.headers.get('User-Agent'),
+            })
+        except JobQueueFull as exc:
+            response = jsonify({'status': 'error', 'message': str(exc), 'retry_after': 5})
+            response.status_code = 503
+            response.headers['Retry-After'] = '5'
+            return response
+        status_url = url_for('verification_job_status', job_id=job['job_id'])
+        response = jsonify({
+            'status': 'accepted',
+            **job,
+            'status_url': status_url,
+            'events_url': url_for('verification_job_events', job_id=job['job_id']),
+        })
+        response.status_code = 202
+        response.headers['Location'] = status_url
+        return response
+
+    response, status_code = _verify_image_result(
+        image,
+        kode_part,
+        request.remote_addr,
+        request.headers.get('User-Agent'),
+    )
+    return jsonify(response), status_code
+
+# Status job verifikasi async (polling)
+@app.route('/api/verify-jobs/<job_id>', methods=['GET'])
+@instrument_endpoint('verify_job_status')
+def verification_job_status(job_id):
+    try:
+        job = verification_jobs.get(job_id)
+    except JobNotFound:
+        return jsonify({'status': 'error', 'message': 'Job tidak ditemukan atau sudah kedaluwarsa'}), 404
+    return jsonify({'status': 'success', **job})
+
+def _job_events_rejected(exc):
+    """Slot SSE penuh: arahkan klien ke polling status biasa."""
+    response = _admission_rejected(exc)
+    job_id = (request.view_args or {}).get('job_id')
+    if job_id:
+        status_url = url_for('verification_job_status', job_id=job_id)
+        response.set_data(app.json.dumps({
+            'status': 'error',
+            'message': str(exc),
+            'retry_after': exc.retry_after,
+            'status_url': status_url,
+        }))
+        response.headers['Location'] = status_url
+    return response
+
+
+# Status job verifikasi async via Server-Sent Events (event per perubahan state)
+@app.route('/api/verify-jobs/<job_id>/events', methods=['GET'])
+@admission_controller.admit('events', on_overload=_job_events_rejected)
+def verification_job_events(job_id):
+    try:
+        verification_jobs.get(job_id)
+    except JobNotFound:
+        return jsonify({'status': 'error', 'message': 'Job tidak ditemukan atau sudah kedaluwarsa'}), 404
+
+    def generate():
+        try:
+            for job in verification_jobs.iter_updates(job_id, timeout=VERIFY_JOB_SSE_TIMEOUT):
+                if job is None:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield f"event: {job['state']}\ndata: {app.json.dumps(job)}\n\n"
+        except JobNotFound:
+            yield 'event: expired\ndata: {}\n\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+# API Verifikasi banyak part dalam satu foto
+@app.route('/api/verify-image-multi', methods=['POST'])
+@instrument_endpoint('verify_image_multi')
+@admission_controlled('image')
+@profile_endpoint('verify_image_multi')
+def verify_image_multi():
+    """Deteksi setiap part dalam foto lalu verifikasi per bounding box (QR/OCR hanya di dalam box)."""
+    if 'image' not in request.files:
+        return jsonify({'status': 'error', 'message': 'Tidak ada file yang diupload'}), 400
+
+    try:
+        image = load_image_from_upload(request.files['image'])
+    except ImageRejected as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), exc.status_code
+
+    objects = detector_engine.analyze_objects(image)
+    crops = [crop_region(image, obj['bbox']) for obj in objects]
+    # Box dengan QR/hologram terdaftar sudah teridentifikasi; OCR batch hanya untuk sisanya
+    identified = [_match_part_from_qr_codes(obj['qr_codes']) for obj in objects]
+    pending = [] if admission_degraded() else [
+        index for index, (_, sparepart_data) in enumerate(identified) if not sparepart_data
+    ]
+    ocr_results = [[] for _ in objects]
+    for index, codes in zip(pending, ocr_engine.detect_part_codes_batch([crops[index] for index in pending])):
+        ocr_results[index] = codes
+
+    results = []
+    for obj, crop, ocr_codes, (matched_code, sparepart_data) in zip(objects, crops, ocr_results, identified):
+        if not sparepart_data:
+            matched_code, sparepart_data = _resolve_sparepart(None, ocr_codes, obj['qr_codes'])
+        reference, notes = _reference_evidence(crop, obj, matched_code)
+        brand_verified = _is_honda_sparepart(
             sparepart_data,
-            matched_code,
-            brand_verified,
-            final_authentic,
-        ),
+            obj['qr_codes'],
+            matched_code or (ocr_codes[0] if ocr_codes else None),
+        )
+        final_authentic = obj['authentic'] and brand_verified and bool(sparepart_data)
+        status = 'ASLI' if final_authentic else 'TIDAK VALID'
+        VERIFICATION_OUTCOMES.inc(endpoint='verify_image_multi', status=status)
+        if matched_code:  # box tanpa kode terbaca (latar/noise) tidak dicatat ke log
+            log_verification_event(
+                matched_code,
+                status,
+                request.remote_addr,
+                request.headers.get('User-Agent'),
+                method='FOTO',
+            )
+        results.append({
+            'bbox': obj['bbox'],
+            'detection': obj['detection'],
+            'authentic': final_authentic,
+            'brand_verified': brand_verified,
+            'confidence': obj['confidence'],
+            'qr_codes': obj['qr_codes'],
+            'ocr_codes': ocr_codes,
+            'matched_code': matched_code,
+            'notes': _merge_brand_notes(notes, brand_verified),
+            'reference_match': reference,
+            'cnn': obj['cnn'],
+            'database_match': sparepart_data,
+            'message': _format_detection_message(obj, sparepart_data, matched_code, brand_verified, final_authentic),
+        })
+
+    authentic_count = sum(1 for item in results if item['authentic'])
+    return jsonify({
+        'status': 'success',
+        'count': len(results),
+        'authentic_count': authentic_count,
+        'image_size': [int(image.shape[1]), int(image.shape[0])],
+        'degraded': admission_degraded(),
+        'objects': results,
+    })
+
+# ============= VERIFIKASI STREAM KAMERA =============
+
+def _verify_stream_keyframe(frame, qr_codes, kode_part):
+    """Verifikasi penuh (CNN + OCR + database) untuk satu keyframe."""
+    detection = detector_engine.detector.detect(frame)
+    matched_code, sparepart_data, ocr_codes = _identify_part(frame, kode_part, qr_codes)
+    brand_verified = _is_honda_sparepart(
+        sparepart_data,
+        qr_codes,
+        matched_code or (ocr_codes[0] if ocr_codes else None),
+    )
+    cnn_authentic = (
+        detection.label.upper() == 'ASLI'
+        and detection.confidence >= detector_engine.detector.confidence_threshold
+    )
+    authentic = cnn_authentic and brand_verified and (bool(sparepart_data) if matched_code else True)
+    return {
+        'authentic': authentic,
+        'confidence': round(detection.confidence, 3),
+        'cnn_label': detection.label,
+        'ocr_codes': ocr_codes,
+        'matched_code': matched_code,
+        'brand_verified': brand_verified,
+        'database_match': sparepart_data,
     }
 
-    return jsonify(response)
+
+stream_verifier = StreamVerifier(
+    detector_engine.qr_decoder.decode,
+    _verify_stream_keyframe,
+    sharpness_threshold=STREAM_SHARPNESS_THRESHOLD,
+    motion_threshold=STREAM_MOTION_THRESHOLD,
+    min_gap=STREAM_KEYFRAME_MIN_GAP,
+    max_gap=STREAM_KEYFRAME_MAX_GAP,
+    window=STREAM_VOTE_WINDOW,
+    min_votes=STREAM_MIN_VOTES,
+    ttl=STREAM_SESSION_TTL,
+    store_path=STREAM_SESSION_STORE_PATH,
+    max_sessions=STREAM_MAX_SESSIONS,
+    max_sessions_per_client=STREAM_MAX_SESSIONS_PER_CLIENT,
+    encode=app.json.dumps,
+)
+
+
+def _finish_stream_session(stream_session, remote_addr, user_agent):
+    """Catat verdict akhir sesi (sekali per sesi, bukan per frame)."""
+    summary = stream_session.summary()
+    if summary['verdict'] != VERDICT_PENDING:
+        VERIFICATION_OUTCOMES.inc(endpoint='verify_stream', status=summary['verdict'])
+        log_verification_event(
+            summary['matched_code'] or stream_session.kode_part,
+            summary['verdict'],
+            remote_addr,
+            user_agent,
+            method='VIDEO',
+        )
+    return summary
+
+
+# Stream MJPEG (multipart/x-mixed-replace atau JPEG bersambung) -> NDJSON per frame
+@app.route('/api/verify-stream', methods=['POST'])
+@instrument_endpoint('verify_stream')
+@admission_controlled('stream')
+def verify_stream():
+    """Body dibaca lewat stream sendiri dengan batas ``STREAM_MAX_BODY_BYTES`` (bukan MAX_CONTENT_LENGTH).
+
+    Batas frame/byte ditegakkan di generator; apa pun alasan berhentinya
+    (selesai, batas tercapai, klien putus) verdict akhir selalu dicatat dan
+    record ``final`` dikirim dengan ``stopped`` berisi alasannya.
+    """
+    try:
+        body = get_input_stream(request.environ, max_content_length=STREAM_MAX_BODY_BYTES)
+    except RequestEntityTooLarge:
+        limit_mb = STREAM_MAX_BODY_BYTES // (1024 * 1024)
+        return jsonify({'status': 'error', 'message': f'Ukuran stream melebihi batas {limit_mb} MB'}), 413
+
+    kode_part = (request.args.get('kode_part') or '').strip().upper() or None
+    # Satu request = satu proses: state sesi cukup di memori, tidak perlu store bersama
+    stream_session = stream_verifier.new_session(kode_part)
+    remote_addr = request.remote_addr
+    user_agent = request.headers.get('User-Agent')
+
+    def generate():
+        stopped = None
+        try:
+            for index, payload in enumerate(iter_jpeg_frames(body, max_frame_bytes=STREAM_MAX_FRAME_BYTES)):
+                if index >= STREAM_MAX_FRAMES:
+                    stopped = 'max_frames'
+                    break
+                try:
+                    frame = decode_upload(
+                        io.BytesIO(payload),
+                        max_bytes=STREAM_MAX_FRAME_BYTES,
+                        max_pixels=IMAGE_MAX_PIXELS,
+                        allowed_formats=('jpeg',),
+                    )
+                except ImageRejected as exc:
+                    yield json.dumps({'frame': index + 1, 'error': str(exc)}) + '\n'
+                    continue
+                yield json.dumps(stream_verifier.process(stream_session, frame)) + '\n'
+        except RequestEntityTooLarge:
+            stopped = 'max_bytes'
+        except ClientDisconnected:
+            stopped = 'disconnected'
+        finally:
+            # dicatat di finally agar tetap tercatat walau respons ditutup di tengah jalan
+            summary = _finish_stream_session(stream_session, remote_addr, user_agent)
+        yield json.dumps({'final': True, 'stopped': stopped, **summary}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+# Sesi stream untuk klien yang mengirim frame satu per satu (mis. webcam di browser)
+@app.route('/api/verify-stream/session', methods=['POST'])
+@instrument_endpoint('verify_stream_session')
+@admission_controlled('lookup')
+def open_stream_session():
+    """Sesi baru ditolak saat batas tercapai (429 per klien, 503 global), sesi aktif tidak digusur."""
+    payload = request.get_json(silent=True) or request.form
+    kode_part = (payload.get('kode_part') or '').strip().upper() or None
+    try:
+        stream_session = stream_verifier.open_session(kode_part, client=request.remote_addr)
+    except StreamSessionLimit as exc:
+        response = jsonify({'status': 'error', 'message': str(exc), 'retry_after': int(STREAM_SESSION_TTL)})
+        response.status_code = 429 if exc.per_client else 503
+        response.headers['Retry-After'] = str(int(STREAM_SESSION_TTL))
+        return response
+    return jsonify({'status': 'success', 'session_id': stream_session.session_id, 'ttl': STREAM_SESSION_TTL}), 201
+
+@app.route('/api/verify-stream/<session_id>/frame', methods=['POST'])
+@instrument_endpoint('verify_stream_frame')
+@admission_controlled('image')
+def verify_stream_frame(session_id):
+    try:
+        if 'frame' in request.files:
+            frame = load_image_from_upload(request.files['frame'])
+        else:
+            with STAGE_LATENCY.time(stage='image_decode'):
+                frame = decode_upload(request.stream, max_bytes=STREAM_MAX_FRAME_BYTES, max_pixels=IMAGE_MAX_PIXELS)
+    except ImageRejected as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), exc.status_code
+
+    try:
+        result = stream_verifier.process_frame(session_id, frame)
+    except StreamSessionNotFound:
+        return jsonify({'status': 'error', 'message': 'Sesi stream tidak ditemukan atau kedaluwarsa'}), 404
+    except StreamSessionBusy as exc:
+        # Klien kamera cukup membuang frame ini dan mengirim frame berikutnya
+        return jsonify({'status': 'error', 'message': str(exc)}), 409
+    return jsonify({'status': 'success', **result})
+
+@app.route('/api/verify-stream/<session_id>', methods=['GET', 'DELETE'])
+def stream_session_summary(session_id):
+    try:
+        if request.method == 'DELETE':
+            stream_session = stream_verifier.close(session_id)
+            summary = _finish_stream_session(stream_session, request.remote_addr, request.headers.get('User-Agent'))
+        else:
+            summary = stream_verifier.get(session_id).summary()
+    except StreamSessionNotFound:
+        return jsonify({'status': 'error', 'message': 'Sesi stream tidak ditemukan atau kedaluwarsa'}), 404
+    return jsonify({'status': 'success', **summary})
 
 # API Analisa Foto
 @app.route('/api/analyze-photo', methods=['POST'])
+@instrument_endpoint('analyze_photo')
+@admission_controlled('image')
+@profile_endpoint('analyze_photo')
 def analyze_photo():
     """API untuk menganalisa foto dan mendeteksi kode part"""
     if 'photo' not in request.files:
@@ -942,14 +2270,18 @@ def analyze_photo():
 
     try:
         image = load_image_from_upload(file)
-    except ValueError as exc:
-        return jsonify({'status': 'error', 'message': str(exc)}), 400
+    except ImageRejected as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), exc.status_code
+
+    quality = quality_gate.check(image, endpoint='analyze_photo')
+    if not quality.passed:
+        return _quality_rejected(quality)
 
     analysis = detector_engine.analyze(image)
-    ocr_codes = ocr_engine.detect_part_codes(image)
-    matched_code, sparepart_data = _resolve_sparepart(None, ocr_codes, analysis['qr_codes'])
+    matched_code, sparepart_data, ocr_codes = _identify_part(image, None, analysis['qr_codes'])
 
     if not matched_code:
+        VERIFICATION_OUTCOMES.inc(endpoint='analyze_photo', status='TIDAK TERBACA')
         return jsonify({
             'status': 'error',
             'kode_part': None,
@@ -957,17 +2289,21 @@ def analyze_photo():
             'message': 'Kode part tidak dapat dibaca dari foto. Pastikan area kode jelas.',
             'qr_codes': analysis['qr_codes'],
             'ocr_codes': ocr_codes,
+            'degraded': admission_degraded(),
         }), 404
 
+    reference, notes = _reference_evidence(image, analysis, matched_code)
     brand_verified = _is_honda_sparepart(
         sparepart_data,
         analysis['qr_codes'],
         matched_code or (ocr_codes[0] if ocr_codes else None),
     )
     final_authentic = analysis['authentic'] and brand_verified and bool(sparepart_data)
+    status = 'ASLI' if final_authentic else 'TIDAK VALID'
+    VERIFICATION_OUTCOMES.inc(endpoint='analyze_photo', status=status)
     log_verification_event(
         matched_code,
-        'ASLI' if final_authentic else 'TIDAK VALID',
+        status,
         request.remote_addr,
         request.headers.get('User-Agent'),
         method='FOTO',
@@ -979,11 +2315,13 @@ def analyze_photo():
         'confidence': analysis['confidence'],
         'qr_codes': analysis['qr_codes'],
         'ocr_codes': ocr_codes,
+        'degraded': admission_degraded(),
         'brand_verified': brand_verified,
         'analysis': {
             'authentic': final_authentic,
-            'notes': _merge_brand_notes(analysis['notes'], brand_verified),
+            'notes': _merge_brand_notes(notes, brand_verified),
             'cnn': analysis['cnn'],
+            'reference_match': reference,
         },
         'sparepart': sparepart_data,
         'message': _format_detection_message(
@@ -995,18 +2333,122 @@ def analyze_photo():
         ),
     })
 
+@app.errorhandler(413)
+def request_entity_too_large(_exc):
+    limit_mb = MAX_CONTENT_LENGTH // (1024 * 1024)
+    message = f'Ukuran upload melebihi batas {limit_mb} MB'
+    if request.path.startswith('/api/') or request.path.startswith('/dashboard/api/'):
+        return jsonify({'status': 'error', 'message': message}), 413
+    return message, 413
+
+# Endpoint metrik format Prometheus (aktif bila METRICS_ENABLED=1)
+@app.route('/metrics')
+def metrics():
+    if not REGISTRY.enabled:
+        return jsonify({'status': 'error', 'message': 'Metrik tidak diaktifkan'}), 404
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+# Memori unik (USS) vs bersama per worker server pre-fork
+@app.route('/dashboard/api/memory')
+def dashboard_memory():
+    if 'admin_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    return jsonify({'status': 'success', 'data': memory_report()})
+
+# ============= PRE-FORK (gunicorn --preload) =============
+
+@after_fork
+def _init_worker_state():
+    """State mutable per worker setelah fork; bobot model tetap dibagi copy-on-write dari master.
+
+    Objek lain (koneksi SQLite, OCRBatcher, antrean job, admission, pool upload,
+    tracker hotspot) sudah memeriksa ``os.getpid()`` sendiri dan membuat ulang state-nya.
+    Metrik dimulai dari nol per worker; dengan ``METRICS_MULTIPROC_DIR`` snapshot-nya
+    ditulis berkala dan ``/metrics`` menjumlahkan semua worker.
+    """
+    REGISTRY.reset()
+    REGISTRY.start_flusher()
+    random.seed()
+    np.random.seed()
+    if CV2_THREADS_PER_WORKER:
+        cv2.setNumThreads(CV2_THREADS_PER_WORKER)
+    if TORCH_THREADS_PER_WORKER:
+        try:
+            import torch
+        except ImportError:
+            return
+        torch.set_num_threads(TORCH_THREADS_PER_WORKER)
+
+
+def create_app():
+    """Factory WSGI untuk server pre-fork (lihat ``wsgi.py`` dan ``gunicorn.conf.py``).
+
+    Bobot CNN/ONNX dan EasyOCR sudah dimuat saat modul ini di-import. Dengan
+    ``preload_app`` gunicorn, import dan fungsi ini berjalan sekali di master:
+    skema SQLite dan indeks katalog/referensi disiapkan di sini sehingga
+    worker mewarisinya copy-on-write alih-alih membangun sendiri. Jangan
+    menjalankan inferensi torch di master - thread pool OpenMP tidak aman
+    dibawa melintasi fork.
+    """
+    init_db()
+    len(part_code_index)  # memuat snapshot katalog
+    len(security_code_index)
+    if reference_matcher is not None:
+        try:
+            reference_matcher.rebuild()
+        except Exception as exc:  # noqa: BLE001 - dibangun ulang lazy di worker
+            app.logger.warning('Gagal menyiapkan indeks referensi di master: %s', exc)
+    # Koneksi SQLite tidak boleh melintasi fork; worker membuka koneksinya sendiri.
+    sqlite_connections.close_all()
+    return app
+
 # ============= TRAINING IMAGES API (BARU) =============
 
 # API Upload Training Images
+def _forward_training_chunk(body, admin):
+    return php_api_request(
+        '/admin-api/training-images/upload',
+        method='POST',
+        data=body,
+        headers={'Content-Type': body.content_type},
+        admin=admin,
+        timeout=TRAINING_UPLOAD_TIMEOUT,
+    )
+
+
+def _index_stored_training_image(batch, item, path):
+    """Tambahkan tensor preprocess gambar yang baru tersimpan ke feature index."""
+    training_feature_index.add_file(
+        item.image_id, path, kode_part=batch.kode_part, label=batch.label, filename=item.stored_name
+    )
+
+
+training_uploads = TrainingUploadManager(
+    TRAINING_SPOOL_FOLDER,
+    _forward_training_chunk,
+    chunk_files=TRAINING_UPLOAD_CHUNK_FILES,
+    max_workers=TRAINING_UPLOAD_WORKERS,
+    ttl=TRAINING_UPLOAD_TTL,
+    perceptual_hash=file_difference_hash,
+    near_duplicate_distance=TRAINING_NEAR_DUPLICATE_DISTANCE,
+    on_stored=_index_stored_training_image,
+    lease_seconds=TRAINING_UPLOAD_LEASE,
+)
+
 @app.route('/api/upload-training-images', methods=['POST'])
 def upload_training_images():
-    """Proxy upload gambar training ke backend PHP"""
+    """Terima gambar training ke spool lalu teruskan ke backend PHP di background.
+
+    Batch besar bisa dikirim dalam beberapa request dengan ``upload_id`` yang
+    sama; ``keys`` (sejajar dengan ``images``) mencegah file dikirim ulang.
+    """
     if 'admin_id' not in session:
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
 
     kode_part = request.form.get('kode_part', '').strip().upper()
     label = request.form.get('label', '').strip().upper()
     catatan = request.form.get('catatan', '').strip()
+    upload_id = request.form.get('upload_id', '').strip() or None
 
     if not kode_part or not label:
         return jsonify({'status': 'error', 'message': 'Kode part dan label wajib diisi'}), 400
@@ -1017,28 +2459,64 @@ def upload_training_images():
     files = request.files.getlist('images')
     if not files:
         return jsonify({'status': 'error', 'message': 'Tidak ada gambar'}), 400
+    keys = request.form.getlist('keys')
 
-    formatted_files = []
-    for file in files:
+    uploads = []
+    for index, file in enumerate(files):
         if not file or not allowed_file(file.filename):
             continue
         safe_name = secure_filename(file.filename) or f'file_{datetime.now().timestamp():.0f}.jpg'
-        formatted_files.append(('images', (safe_name, file.stream, file.mimetype or 'application/octet-stream')))
+        key = keys[index] if index < len(keys) else None
+        uploads.append((key, safe_name, file))
 
-    if not formatted_files:
+    if not uploads:
         return jsonify({'status': 'error', 'message': 'Tidak ada gambar valid yang diupload'}), 400
 
     try:
-        payload = php_api_request(
-            '/admin-api/training-images/upload',
-            method='POST',
-            data={'kode_part': kode_part, 'label': label, 'catatan': catatan},
-            files=formatted_files,
-        )
-    except PHPAPIError as exc:
-        return jsonify({'status': 'error', 'message': str(exc)}), 400
+        batch = training_uploads.open_batch(upload_id, kode_part, label, catatan, current_admin_identity())
+    except UploadNotFound:
+        return jsonify({'status': 'error', 'message': 'Upload tidak ditemukan atau sudah kedaluwarsa'}), 404
+    except ValueError as exc:
+        return jsonify({'status': 'error', 'message': str(exc)}), 409
 
-    return jsonify(payload), 201
+    counts = training_uploads.add_files(batch, uploads)
+    training_uploads.schedule(batch)
+
+    return jsonify({
+        'status': 'success',
+        'message': f"{counts['accepted']} gambar diterima, diproses di background",
+        'accepted': counts['accepted'],
+        'skipped': counts['skipped'],
+        'progress': training_uploads.progress(batch.upload_id),
+    }), 202
+
+
+@app.route('/api/upload-training-images/<upload_id>', methods=['GET'])
+def upload_training_images_progress(upload_id):
+    """Progres per file untuk batch upload training"""
+    if 'admin_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+
+    try:
+        progress = training_uploads.progress(upload_id)
+    except UploadNotFound:
+        return jsonify({'status': 'error', 'message': 'Upload tidak ditemukan atau sudah kedaluwarsa'}), 404
+
+    return jsonify({'status': 'success', 'progress': progress})
+
+
+@app.route('/api/upload-training-images/<upload_id>/resume', methods=['POST'])
+def upload_training_images_resume(upload_id):
+    """Kirim ulang file yang gagal pada batch upload training"""
+    if 'admin_id' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+
+    try:
+        batch = training_uploads.resume(upload_id)
+    except UploadNotFound:
+        return jsonify({'status': 'error', 'message': 'Upload tidak ditemukan atau sudah kedaluwarsa'}), 404
+
+    return jsonify({'status': 'success', 'progress': training_uploads.progress(batch.upload_id)}), 202
 
 
 # API Get Training Images
@@ -1084,8 +2562,156 @@ def delete_training_image(image_id):
         status_code = 404 if 'tidak ditemukan' in str(exc).lower() else 400
         return jsonify({'status': 'error', 'message': str(exc)}), status_code
 
+    training_feature_index.remove(image_id)
     return jsonify(payload)
 
+# ============= CLI =============
+
+@app.cli.command('maintain-logs')
+def maintain_logs_command():
+    """Jalankan rollover, rollup, dan retensi log verifikasi sekarang."""
+    ensure_verifikasi_log_metode_column()
+    summary = log_storage.run_maintenance()
+    for action, names in summary.items():
+        print(f'{action}: {", ".join(names) if names else "-"}')
+
+@app.cli.command('backfill-training-hashes')
+def backfill_training_hashes_command():
+    """Isi content_hash/perceptual_hash untuk baris training_images lama (MySQL)."""
+    conn = get_sparepart_connection()
+    updated = missing = duplicates = 0
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT id, filename FROM training_images WHERE content_hash IS NULL')
+            rows = cursor.fetchall()
+            for row in rows:
+                path = os.path.join(UPLOAD_FOLDER, row['filename'])
+                if not os.path.isfile(path):
+                    missing += 1
+                    continue
+                digest = hashlib.sha256()
+                with open(path, 'rb') as handle:
+                    for block in iter(lambda: handle.read(1024 * 1024), b''):
+                        digest.update(block)
+                perceptual = file_difference_hash(path)
+                try:
+                    cursor.execute(
+                        'UPDATE training_images SET content_hash = %s, perceptual_hash = %s WHERE id = %s',
+                        (digest.hexdigest(), perceptual, row['id']),
+                    )
+                except pymysql.err.IntegrityError:
+                    # Isi yang sama sudah tercatat untuk part ini (index UNIQUE): biarkan content_hash kosong.
+                    cursor.execute(
+                        'UPDATE training_images SET perceptual_hash = %s WHERE id = %s',
+                        (perceptual, row['id']),
+                    )
+                    duplicates += 1
+                    continue
+                updated += 1
+        conn.commit()
+    finally:
+        conn.close()
+    print(f'updated: {updated}, duplikat: {duplicates}, file hilang: {missing}')
+
+def fetch_all_training_images(page_size: int = 500):
+    """Daftar lengkap gambar training dari backend PHP (dipaging)."""
+    images, offset = [], 0
+    while True:
+        payload = php_api_request(
+            '/admin-api/training-images',
+            method='GET',
+            params={'limit': page_size, 'offset': offset},
+        )
+        page = payload.get('images', [])
+        images.extend(page)
+        if len(page) < page_size:
+            return images
+        offset += page_size
+
+
+@app.cli.command('index-training-features')
+def index_training_features_command():
+    """Sinkronkan feature index (mmap) dengan daftar gambar training."""
+    summary = training_feature_index.sync(fetch_all_training_images(), UPLOAD_FOLDER)
+    print(', '.join(f'{key}: {value}' for key, value in summary.items()))
+
+@app.cli.command('audit-training-ocr')
+@click.option('--batch-size', type=int, default=16, show_default=True, help='Jumlah gambar per batch OCR.')
+@click.option('--limit', type=int, default=0, help='Batasi jumlah gambar (0 = semua).')
+def audit_training_ocr_command(batch_size, limit):
+    """Baca ulang kode part semua gambar training dengan OCR batch dan laporkan yang tidak cocok."""
+    records = fetch_all_training_images()
+    if limit:
+        records = records[:limit]
+    counts = {'cocok': 0, 'beda': 0, 'tidak_terbaca': 0, 'file_hilang': 0}
+    mismatches = []
+    started = time.perf_counter()
+    for start in range(0, len(records), batch_size):
+        chunk = records[start:start + batch_size]
+        images = [cv2.imread(os.path.join(UPLOAD_FOLDER, record['filename']), cv2.IMREAD_COLOR) for record in chunk]
+        for record, image, codes in zip(chunk, images, ocr_engine.detect_part_codes_batch(images)):
+            expected = (record.get('kode_part') or '').upper()
+            if image is None:
+                counts['file_hilang'] += 1
+            elif expected and expected in codes:
+                counts['cocok'] += 1
+            elif codes:
+                counts['beda'] += 1
+                mismatches.append((record['id'], expected, codes))
+            else:
+                counts['tidak_terbaca'] += 1
+    elapsed = time.perf_counter() - started
+    print(', '.join(f'{key}: {value}' for key, value in counts.items()))
+    print(f'{len(records)} gambar dalam {elapsed:.1f} dtk ({len(records) / max(elapsed, 1e-9):.1f} gambar/dtk)')
+    for image_id, expected, codes in mismatches[:20]:
+        print(f'  #{image_id}: label {expected or "-"}, terbaca {", ".join(codes)}')
+
+@app.cli.command('calibrate-detector')
+@click.option('--criterion', type=click.Choice(CRITERIA), default='f1', show_default=True)
+@click.option('--target-precision', type=float, default=0.95, show_default=True)
+@click.option('--batch-size', type=int, default=64, show_default=True)
+@click.option('--sync/--no-sync', default=True, help='Sinkronkan feature index dulu.')
+@click.option('--output', default=CNN_CALIBRATION_PATH, show_default=True)
+def calibrate_detector_command(criterion, target_precision, batch_size, sync, output):
+    """Evaluasi detector atas gambar training berlabel lalu simpan threshold + temperature."""
+    if sync:
+        training_feature_index.sync(fetch_all_training_images(), UPLOAD_FOLDER)
+    try:
+        result = calibrate_detector(
+            detector,
+            training_feature_index,
+            criterion=criterion,
+            target_precision=target_precision,
+            batch_size=batch_size,
+        )
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    result.save(output)
+    metrics = result.metrics
+    at_threshold = metrics['at_threshold']
+    print(f"model: {result.model}, sampel: {metrics['samples']} (ASLI {metrics['positives']}, lain {metrics['negatives']})")
+    print(f"ROC AUC: {metrics['roc_auc']}, average precision: {metrics['average_precision']}")
+    print(f"temperature: {result.temperature} (NLL {metrics['nll_before']} -> {metrics['nll_after']}, "
+          f"ECE {metrics['ece_before']} -> {metrics['ece_after']})")
+    print(f"threshold ({criterion}): {result.threshold} -> precision {at_threshold['precision']}, "
+          f"recall {at_threshold['recall']}, FPR {at_threshold['fpr']}")
+    print(f'disimpan ke {output}; restart aplikasi untuk memakai kalibrasi baru')
+
+@app.cli.command('memory-report')
+@click.option('--master-pid', type=int, required=True, help='PID master gunicorn.')
+def memory_report_command(master_pid):
+    """Memori unik (USS) vs bersama per worker server pre-fork."""
+    report = memory_report(master_pid)
+    mib = 1024 * 1024
+    rows = ([('master', report['master'])] if report['master'] else []) + [('worker', item) for item in report['workers']]
+    for role, item in rows:
+        print(f"{role:<7} pid {item['pid']:>7}: RSS {item['rss'] / mib:8.1f} MiB, PSS {item['pss'] / mib:8.1f} MiB, "
+              f"unik {item['uss'] / mib:8.1f} MiB, bersama {item['shared'] / mib:8.1f} MiB")
+    totals = report.get('totals')
+    if totals:
+        print(f"{totals['workers']} worker: total PSS {totals['pss'] / mib:.1f} MiB, "
+              f"rata-rata unik per worker {totals['avg_worker_uss'] / mib:.1f} MiB")
+
 # ============= MAIN =============
 
 if __name__ == '__main__':
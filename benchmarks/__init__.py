@@ -0,0 +1 @@
+"""Benchmark lokal untuk aplikasi deteksi sparepart (dijalankan manual, bukan bagian test)."""
@@ -0,0 +1,78 @@
+"""Bandingkan dua hasil ``benchmarks.pipeline`` (mis. sebelum vs sesudah perubahan).
+
+    python -m benchmarks.compare bench-base.json bench-head.json --fail-threshold 10
+
+Keluar dengan kode 1 bila ada metrik yang memburuk lebih dari ambang (persen).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+
+def _load(path: str) -> Dict[str, object]:
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+def _change(before: float, after: float) -> float:
+    if not before:
+        return 0.0
+    return (after - before) / before * 100.0
+
+
+def compare(base: Dict[str, object], head: Dict[str, object]) -> List[Tuple[str, float, float, float, bool]]:
+    """Kembalikan baris ``(metrik, base, head, perubahan%, lebih_buruk_bila_naik)``."""
+    rows = []
+    for stage, stats in sorted(head.get('stages', {}).items()):
+        base_stats = base.get('stages', {}).get(stage)
+        if not base_stats:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            rows.append((f'stage.{stage}.{key}', base_stats[key], stats[key], _change(base_stats[key], stats[key]), True))
+
+    base_tp = {row['concurrency']: row for row in base.get('throughput', [])}
+    for row in head.get('throughput', []):
+        before = base_tp.get(row['concurrency'])
+        if not before:
+            continue
+        rows.append((
+            f'throughput.c{row["concurrency"]}.requests_per_sec',
+            before['requests_per_sec'],
+            row['requests_per_sec'],
+            _change(before['requests_per_sec'], row['requests_per_sec']),
+            False,
+        ))
+
+    for key in ('tracemalloc_peak_mb', 'max_rss_mb'):
+        before = base.get('memory', {}).get(key)
+        after = head.get('memory', {}).get(key)
+        if before is not None and after is not None:
+            rows.append((f'memory.{key}', before, after, _change(before, after), True))
+    return rows
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Bandingkan dua hasil benchmark pipeline')
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--fail-threshold', type=float, default=None, help='persen regresi maksimum')
+    args = parser.parse_args(argv)
+
+    base, head = _load(args.base), _load(args.head)
+    print(f"base: {base['meta'].get('git_revision', '?')[:10]}  head: {head['meta'].get('git_revision', '?')[:10]}")
+    regressions = 0
+    for name, before, after, change, higher_is_worse in compare(base, head):
+        worse = change > 0 if higher_is_worse else change < 0
+        flag = ''
+        if args.fail_threshold is not None and worse and abs(change) > args.fail_threshold:
+            flag = '  <-- REGRESI'
+            regressions += 1
+        print(f'{name:<48} {before:>10} -> {after:>10}  ({change:+.1f}%){flag}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
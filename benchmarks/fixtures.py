@@ -0,0 +1,108 @@
+"""Gambar uji untuk benchmark pipeline deteksi.
+
+Gambar sintetis dibuat deterministik (seed tetap) dalam beberapa resolusi,
+masing-masing dengan/ tanpa QR dan dengan/ tanpa kode part tercetak, ditambah
+foto nyata dari ``uploads/training`` sebagai fixture.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURE_DIR = ROOT / 'uploads' / 'training'
+
+DEFAULT_RESOLUTIONS: Tuple[Tuple[int, int], ...] = ((640, 480), (1280, 960), (2560, 1920))
+SAMPLE_PART_CODE = '06455-KVB-900'
+SAMPLE_QR_PAYLOAD = 'QR-BEAT-006'
+
+
+@dataclass
+class BenchImage:
+    name: str
+    image: np.ndarray
+    has_qr: bool
+    has_code: bool
+
+    @property
+    def resolution(self) -> str:
+        h, w = self.image.shape[:2]
+        return f'{w}x{h}'
+
+    def encode(self, ext: str = '.jpg') -> bytes:
+        ok, buffer = cv2.imencode(ext, self.image)
+        if not ok:
+            raise ValueError(f'Gagal encode {self.name}')
+        return buffer.tobytes()
+
+
+def _background(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    base = rng.integers(90, 200, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    image = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 12, size=image.shape)
+    return np.clip(image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+
+def _draw_qr(image: np.ndarray, payload: str) -> None:
+    qr = cv2.QRCodeEncoder.create().encode(payload)
+    h, w = image.shape[:2]
+    side = max(96, min(h, w) // 4)
+    qr = cv2.resize(qr, (side, side), interpolation=cv2.INTER_NEAREST)
+    qr_bgr = cv2.cvtColor(qr, cv2.COLOR_GRAY2BGR)
+    margin = side // 4
+    # Quiet zone putih supaya decoder bisa menemukan finder pattern.
+    cv2.rectangle(image, (w - side - 2 * margin, margin // 2), (w - margin // 2, side + 2 * margin), (255, 255, 255), -1)
+    image[margin:margin + side, w - side - margin:w - margin] = qr_bgr
+
+
+def _draw_code(image: np.ndarray, code: str) -> None:
+    h, w = image.shape[:2]
+    scale = max(0.8, w / 640.0)
+    thickness = max(2, int(scale * 2))
+    (text_w, text_h), _ = cv2.getTextSize(code, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+    x, y = max(10, (w - text_w) // 2), h - max(20, h // 6)
+    cv2.rectangle(image, (x - 10, y - text_h - 10), (x + text_w + 10, y + 10), (255, 255, 255), -1)
+    cv2.putText(image, code, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), thickness, cv2.LINE_AA)
+
+
+def synthetic_images(
+    resolutions: Sequence[Tuple[int, int]] = DEFAULT_RESOLUTIONS,
+    seed: int = 1234,
+) -> List[BenchImage]:
+    rng = np.random.default_rng(seed)
+    images: List[BenchImage] = []
+    for width, height in resolutions:
+        for has_qr in (False, True):
+            for has_code in (False, True):
+                image = _background(width, height, rng)
+                if has_qr:
+                    _draw_qr(image, SAMPLE_QR_PAYLOAD)
+                if has_code:
+                    _draw_code(image, SAMPLE_PART_CODE)
+                name = f'synthetic_{width}x{height}_{"qr" if has_qr else "noqr"}_{"code" if has_code else "nocode"}'
+                images.append(BenchImage(name=name, image=image, has_qr=has_qr, has_code=has_code))
+    return images
+
+
+def fixture_images(directory: Optional[Path] = None) -> List[BenchImage]:
+    directory = directory or FIXTURE_DIR
+    images: List[BenchImage] = []
+    for path in sorted(directory.glob('*')):
+        if path.suffix.lower() not in {'.jpg', '.jpeg', '.png'}:
+            continue
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        images.append(BenchImage(name=f'fixture_{path.stem}', image=image, has_qr=False, has_code=False))
+    return images
+
+
+def all_images(include_fixtures: bool = True) -> List[BenchImage]:
+    images = synthetic_images()
+    if include_fixtures:
+        images.extend(fixture_images())
+    return images
@@ -0,0 +1,242 @@
+"""Benchmark pipeline deteksi: latency per tahap, throughput, dan memori puncak.
+
+Jalankan dari root repo::
+
+    python -m benchmarks.pipeline --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.compare bench-old.json bench-new.json
+
+Database memakai salinan SQLite sementara dari ``schema.sql`` dan backend PHP
+diarahkan ke port tertutup, jadi benchmark berjalan sepenuhnya offline.
+Hasil berupa JSON yang bisa dibandingkan antar commit.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_CONCURRENCY = (1, 2, 4, 8)
+
+
+def _percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """Ringkasan latency dalam milidetik."""
+    return {
+        'count': len(values),
+        'mean_ms': round(statistics.fmean(values) * 1000, 3) if values else 0.0,
+        'p50_ms': round(_percentile(values, 50) * 1000, 3),
+        'p95_ms': round(_percentile(values, 95) * 1000, 3),
+        'p99_ms': round(_percentile(values, 99) * 1000, 3),
+    }
+
+
+def prepare_environment(workdir: str) -> str:
+    """Siapkan SQLite stand-in + env sebelum ``app`` diimport."""
+    db_path = os.path.join(workdir, 'bench.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript((ROOT / 'schema.sql').read_text(encoding='utf-8'))
+    conn.commit()
+    conn.close()
+
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = db_path
+    os.environ['METRICS_ENABLED'] = '1'
+    # Port 9 (discard) tertutup di hampir semua mesin: koneksi langsung ditolak.
+    os.environ['PHP_API_BASE_URL'] = 'http://127.0.0.1:9'
+    os.environ.setdefault('LOG_MAINTENANCE_INTERVAL', '0')
+    return db_path
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def bench_stages(app_module, images, repeat: int) -> Dict[str, object]:
+    from werkzeug.datastructures import FileStorage
+
+    stage_times: Dict[str, List[float]] = defaultdict(list)
+    per_image: Dict[str, Dict[str, float]] = {}
+    engine = app_module.detector_engine
+
+    def timed(stage: str, bucket: Dict[str, List[float]], func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        stage_times[stage].append(elapsed)
+        bucket[stage].append(elapsed)
+        return result
+
+    tracemalloc.start()
+    with app_module.app.test_request_context('/api/verify-image', method='POST'):
+        for bench_image in images:
+            encoded = bench_image.encode()
+            image_times: Dict[str, List[float]] = defaultdict(list)
+            for _ in range(repeat):
+                total_started = time.perf_counter()
+                upload = FileStorage(stream=io.BytesIO(encoded), filename=f'{bench_image.name}.jpg')
+                image = timed('image_decode', image_times, app_module.load_image_from_upload, upload)
+                timed('quality_gate', image_times, app_module.quality_gate.assess, image)
+                timed('cnn_detect', image_times, engine.detector.detect, image)
+                qr_codes = timed('qr_decode', image_times, engine.qr_decoder.decode, image)
+                ocr_codes = timed('ocr', image_times, app_module.ocr_engine.detect_part_codes, image)
+                matched_code, _ = timed(
+                    'resolve_sparepart', image_times, app_module._resolve_sparepart, None, ocr_codes, qr_codes
+                )
+                timed(
+                    'log_write',
+                    image_times,
+                    app_module.log_verification_event,
+                    matched_code,
+                    'TIDAK VALID',
+                    '127.0.0.1',
+                    'benchmark',
+                    method='FOTO',
+                )
+                elapsed = time.perf_counter() - total_started
+                stage_times['total'].append(elapsed)
+                image_times['total'].append(elapsed)
+            per_image[bench_image.name] = {
+                'resolution': bench_image.resolution,
+                'has_qr': bench_image.has_qr,
+                'has_code': bench_image.has_code,
+                **{f'{stage}_p50_ms': summarize(values)['p50_ms'] for stage, values in image_times.items()},
+            }
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'stages': {stage: summarize(values) for stage, values in stage_times.items()},
+        'images': per_image,
+        'tracemalloc_peak_mb': round(peak / (1024 * 1024), 2),
+    }
+
+
+def bench_throughput(app_module, images, levels: Sequence[int], requests_per_worker: int) -> List[Dict[str, object]]:
+    payloads = [(image.name, image.encode()) for image in images]
+    results = []
+    for concurrency in levels:
+        latencies: List[float] = []
+        statuses: Dict[int, int] = defaultdict(int)
+        lock = threading.Lock()
+
+        def worker(worker_id: int) -> None:
+            client = app_module.app.test_client()
+            local_latencies = []
+            local_statuses: Dict[int, int] = defaultdict(int)
+            for i in range(requests_per_worker):
+                name, data = payloads[(worker_id + i) % len(payloads)]
+                started = time.perf_counter()
+                response = client.post(
+                    '/api/verify-image',
+                    data={'image': (io.BytesIO(data), f'{name}.jpg')},
+                    content_type='multipart/form-data',
+                )
+                local_latencies.append(time.perf_counter() - started)
+                local_statuses[response.status_code] += 1
+            with lock:
+                latencies.extend(local_latencies)
+                for code, count in local_statuses.items():
+                    statuses[code] += count
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, range(concurrency)))
+        wall = time.perf_counter() - started
+
+        results.append({
+            'concurrency': concurrency,
+            'requests': len(latencies),
+            'wall_seconds': round(wall, 3),
+            'requests_per_sec': round(len(latencies) / wall, 2) if wall else 0.0,
+            'latency': summarize(latencies),
+            'status_codes': dict(statuses),
+        })
+    return results
+
+
+def main(argv: Sequence[str] | None = None) -> Dict[str, object]:
+    parser = argparse.ArgumentParser(description='Benchmark pipeline deteksi sparepart')
+    parser.add_argument('--repeat', type=int, default=3, help='ulangan per gambar untuk latency tahap')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument('--requests-per-worker', type=int, default=10)
+    parser.add_argument('--no-fixtures', action='store_true', help='hanya gambar sintetis')
+    parser.add_argument('--output', help='tulis JSON ke file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='bench_pipeline_')
+    prepare_environment(workdir)
+
+    sys.path.insert(0, str(ROOT))
+    import app as app_module  # noqa: E402  (env harus siap sebelum import)
+    from benchmarks.fixtures import all_images
+
+    images = all_images(include_fixtures=not args.no_fixtures)
+    throughput_images = [image for image in images if image.image.shape[1] <= 1280]
+
+    started = time.perf_counter()
+    stages = bench_stages(app_module, images, args.repeat)
+    throughput = bench_throughput(app_module, throughput_images, args.concurrency, args.requests_per_worker)
+
+    import cv2
+    import numpy as np
+
+    result = {
+        'meta': {
+            'git_revision': _git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'cpu_count': os.cpu_count(),
+            'args': vars(args),
+            'duration_seconds': round(time.perf_counter() - started, 2),
+        },
+        'stages': stages['stages'],
+        'images': stages['images'],
+        'throughput': throughput,
+        'memory': {
+            'tracemalloc_peak_mb': stages['tracemalloc_peak_mb'],
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+        },
+    }
+
+    payload = json.dumps(result, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(payload + '\n', encoding='utf-8')
+    else:
+        print(payload)
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Bandingkan throughput tulis log & baca riwayat SQLite: mode lama vs performance mode.
+
+Jalankan dari root repo::
+
+    python -m benchmarks.sqlite_throughput --writes 2000 --writers 4 --readers 4
+
+Database dibuat ulang dari ``schema.sql`` di direktori sementara untuk tiap mode
+sehingga hasilnya tidak menyentuh ``honda_spareparts.db``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from sqlite_store import SQLiteConnectionManager
+
+ROOT = Path(__file__).resolve().parent.parent
+
+INSERT_LOG_SQL = '''
+    INSERT INTO verifikasi_log (kode_part, status, ip_address, user_agent, metode)
+    VALUES (?, ?, ?, ?, ?)
+'''
+UPSERT_ROLLUP_SQL = '''
+    INSERT INTO verifikasi_log_harian (tanggal, total, total_asli, total_tidak_valid)
+    VALUES (DATE('now', 'localtime'), 1, ?, ?)
+    ON CONFLICT(tanggal) DO UPDATE SET
+        total = total + 1,
+        total_asli = total_asli + excluded.total_asli,
+        total_tidak_valid = total_tidak_valid + excluded.total_tidak_valid
+'''
+HISTORY_SQL = '''
+    SELECT id_log AS log_id, kode_part, status, waktu_cek AS waktu_cek, metode
+    FROM verifikasi_log
+    WHERE metode = ?
+    ORDER BY waktu_cek DESC, id_log DESC LIMIT ?
+'''
+
+
+def _create_database(path: str) -> None:
+    import sqlite3
+
+    conn = sqlite3.connect(path)
+    conn.executescript((ROOT / 'schema.sql').read_text(encoding='utf-8'))
+    conn.commit()
+    conn.close()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_mode(performance_mode: bool, writes: int, writers: int, readers: int) -> Dict[str, float]:
+    workdir = tempfile.mkdtemp(prefix='bench_sqlite_')
+    db_path = os.path.join(workdir, 'bench.db')
+    _create_database(db_path)
+    manager = SQLiteConnectionManager(db_path, performance_mode=performance_mode)
+
+    writes_per_thread = max(1, writes // writers)
+    stop_readers = threading.Event()
+    read_latencies: List[float] = []
+    read_lock = threading.Lock()
+
+    def writer(worker_id: int) -> None:
+        for i in range(writes_per_thread):
+            status = 'ASLI' if i % 3 else 'TIDAK VALID'
+            is_asli = 1 if status == 'ASLI' else 0
+            conn = manager.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    INSERT_LOG_SQL,
+                    (f'13101-KVB-{i % 1000:03d}', status, '127.0.0.1', 'bench', 'FOTO' if i % 2 else 'QR'),
+                )
+                cursor.execute(UPSERT_ROLLUP_SQL, (is_asli, 1 - is_asli))
+                conn.commit()
+            finally:
+                conn.close()
+
+    def reader() -> None:
+        local: List[float] = []
+        while not stop_readers.is_set():
+            started = time.perf_counter()
+            conn = manager.connect()
+            try:
+                conn.execute(HISTORY_SQL, ('QR', 11)).fetchall()
+            finally:
+                conn.close()
+            local.append(time.perf_counter() - started)
+        with read_lock:
+            read_latencies.extend(local)
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in reader_threads:
+        thread.start()
+    started = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop_readers.set()
+    for thread in reader_threads:
+        thread.join()
+    manager.close_all()
+
+    total_writes = writes_per_thread * writers
+    return {
+        'mode': 'performance' if performance_mode else 'legacy',
+        'writes': total_writes,
+        'write_seconds': round(elapsed, 4),
+        'writes_per_sec': round(total_writes / elapsed, 1),
+        'reads': len(read_latencies),
+        'reads_per_sec': round(len(read_latencies) / elapsed, 1),
+        'read_p50_ms': round(statistics.median(read_latencies) * 1000, 3) if read_latencies else 0.0,
+        'read_p95_ms': round(_percentile(read_latencies, 95) * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--json', action='store_true', help='cetak hasil sebagai JSON')
+    args = parser.parse_args()
+
+    results = [
+        run_mode(False, args.writes, args.writers, args.readers),
+        run_mode(True, args.writes, args.writers, args.readers),
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for row in results:
+        print(
+            f"{row['mode']:<12} writes/s={row['writes_per_sec']:>9}  reads/s={row['reads_per_sec']:>9}  "
+            f"read p50={row['read_p50_ms']}ms p95={row['read_p95_ms']}ms"
+        )
+
+
+if __name__ == '__main__':
+    main()
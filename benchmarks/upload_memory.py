@@ -0,0 +1,116 @@
+"""Ukur memori puncak per request untuk ingest upload gambar: alur lama vs ``image_ingest``.
+
+Jalankan dari root repo::
+
+    python -m benchmarks.upload_memory
+
+Setiap gambar diupload lewat parser multipart Werkzeug yang sama dengan Flask
+(upload kecil tetap di ``BytesIO``, yang besar di-spool ke disk), lalu puncak
+``tracemalloc`` selama decode dicatat. Juga diukur penolakan dini untuk file
+bukan gambar dan gambar yang header-nya melebihi batas piksel.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import struct
+import tracemalloc
+import zlib
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+from werkzeug.test import EnvironBuilder
+
+from benchmarks.fixtures import synthetic_images
+from image_ingest import decode_upload
+
+MAX_BYTES = 15 * 1024 * 1024
+MAX_PIXELS = 40_000_000
+
+
+def legacy_decode(stream) -> np.ndarray:
+    """Alur sebelum ``image_ingest``: read() -> frombuffer -> imdecode."""
+    stream.seek(0)
+    file_bytes = np.frombuffer(stream.read(), np.uint8)
+    image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError('Gagal membaca isi gambar')
+    return image
+
+
+def ingest_decode(stream) -> np.ndarray:
+    return decode_upload(stream, max_bytes=MAX_BYTES, max_pixels=MAX_PIXELS)
+
+
+def _parsed_upload(payload: bytes, filename: str):
+    builder = EnvironBuilder(method='POST', data={'image': (io.BytesIO(payload), filename)})
+    request = builder.get_request()
+    return request.files['image'].stream
+
+
+def _oversized_png(width: int, height: int) -> bytes:
+    """PNG valid secara header dengan dimensi besar tapi isi IDAT kecil."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr) + chunk(b'IDAT', zlib.compress(b'\x00' * 64)) + chunk(b'IEND', b'')
+
+
+def measure(decoder: Callable, payload: bytes, filename: str) -> Dict[str, object]:
+    stream = _parsed_upload(payload, filename)
+    in_memory = isinstance(getattr(stream, '_file', stream), io.BytesIO)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    outcome = 'ok'
+    try:
+        image = decoder(stream)
+        del image
+    except ValueError as exc:
+        outcome = f'rejected: {exc}'
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'peak_mb': round(peak / (1024 * 1024), 3),
+        'spooled_to_disk': not in_memory,
+        'outcome': outcome,
+    }
+
+
+def run() -> List[Dict[str, object]]:
+    cases = [(image.name, image.encode('.png')) for image in synthetic_images() if image.has_qr and image.has_code]
+    cases.append(('not_an_image', b'%PDF-1.7\n' + b'0' * 4 * 1024 * 1024))
+    cases.append(('png_header_30000x30000', _oversized_png(30000, 30000)))
+
+    rows = []
+    for name, payload in cases:
+        row: Dict[str, object] = {'case': name, 'upload_mb': round(len(payload) / (1024 * 1024), 3)}
+        for label, decoder in (('legacy', legacy_decode), ('ingest', ingest_decode)):
+            result = measure(decoder, payload, f'{name}.png')
+            row[f'{label}_peak_mb'] = result['peak_mb']
+            row[f'{label}_outcome'] = result['outcome']
+            row['spooled_to_disk'] = result['spooled_to_disk']
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--json', action='store_true', help='cetak hasil sebagai JSON')
+    args = parser.parse_args()
+
+    rows = run()
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    for row in rows:
+        print(
+            f"{row['case']:<36} upload={row['upload_mb']:>7}MB disk={str(row['spooled_to_disk']):<5} "
+            f"legacy={row['legacy_peak_mb']:>8}MB ingest={row['ingest_peak_mb']:>8}MB  {row['ingest_outcome']}"
+        )
+
+
+if __name__ == '__main__':
+    main()
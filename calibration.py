@@ -0,0 +1,320 @@
+"""Evaluasi dan kalibrasi confidence ``SparePartDetector``.
+
+``CNN_CONFIDENCE_THRESHOLD`` dan konstanta heuristik fallback sebelumnya
+ditebak tangan. Modul ini mengukurnya terhadap ``training_images`` berlabel:
+
+1. skor mentah detector dihitung per batch langsung dari tensor preprocess di
+   :mod:`feature_index` (memmap) - tidak ada gambar yang di-decode ulang dan
+   memori hanya sebesar satu batch + satu baris skor per gambar;
+2. temperature scaling di-fit dengan meminimalkan negative log-likelihood;
+3. kurva ROC/PR dan precision/recall per threshold dihitung secara vektor
+   (sort + cumsum) dari probabilitas ``ASLI`` terkalibrasi;
+4. threshold dipilih (F1 maksimum, Youden J, atau precision target) lalu
+   disimpan sebagai JSON yang dimuat ``SparePartDetector`` saat startup.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+POSITIVE_LABEL = "ASLI"
+CRITERIA = ("f1", "youden", "precision")
+_CURVE_POINTS = 200
+_EPS = 1e-7
+
+
+@dataclass
+class Calibration:
+    """Parameter hasil kalibrasi untuk satu model (``model`` = nama file atau ``fallback``)."""
+
+    model: str
+    temperature: float
+    threshold: float
+    positive_label: str = POSITIVE_LABEL
+    criterion: str = "f1"
+    created_at: str = ""
+    metrics: Dict[str, object] = field(default_factory=dict)
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(asdict(self), handle, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Calibration":
+        with open(path, encoding="utf-8") as handle:
+            payload = json.load(handle)
+        return cls(
+            model=str(payload["model"]),
+            temperature=float(payload["temperature"]),
+            threshold=float(payload["threshold"]),
+            positive_label=payload.get("positive_label", POSITIVE_LABEL),
+            criterion=payload.get("criterion", "f1"),
+            created_at=payload.get("created_at", ""),
+            metrics=payload.get("metrics", {}),
+        )
+
+
+# ----------------------------------------------------------------------
+# Temperature scaling
+# ----------------------------------------------------------------------
+def scores_to_logits(scores: np.ndarray) -> np.ndarray:
+    """Skor ``[n, k]`` ke logit: output yang sudah berupa probabilitas di-``log``, logit dibiarkan."""
+    scores = np.asarray(scores, dtype=np.float64)
+    if np.all(scores >= 0) and np.allclose(scores.sum(axis=1), 1.0, atol=1e-3):
+        return np.log(np.clip(scores, _EPS, 1.0))
+    return scores
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def apply_temperature(scores: np.ndarray, temperature: float) -> np.ndarray:
+    """Probabilitas terkalibrasi ``softmax(logit / T)``."""
+    return _softmax(scores_to_logits(scores) / temperature)
+
+
+def negative_log_likelihood(logits: np.ndarray, targets: np.ndarray, temperature: float) -> float:
+    probs = _softmax(logits / temperature)
+    return float(-np.mean(np.log(np.clip(probs[np.arange(len(targets)), targets], _EPS, 1.0))))
+
+
+def fit_temperature(
+    scores: np.ndarray,
+    targets: np.ndarray,
+    bounds: Tuple[float, float] = (0.05, 20.0),
+    iterations: int = 60,
+) -> float:
+    """Cari ``T`` yang meminimalkan NLL (golden-section search di ruang ``log T``)."""
+    logits = scores_to_logits(scores)
+    low, high = math.log(bounds[0]), math.log(bounds[1])
+    ratio = (math.sqrt(5) - 1) / 2
+    left, right = high - ratio * (high - low), low + ratio * (high - low)
+    f_left = negative_log_likelihood(logits, targets, math.exp(left))
+    f_right = negative_log_likelihood(logits, targets, math.exp(right))
+    for _ in range(iterations):
+        if f_left < f_right:
+            high, right, f_right = right, left, f_left
+            left = high - ratio * (high - low)
+            f_left = negative_log_likelihood(logits, targets, math.exp(left))
+        else:
+            low, left, f_left = left, right, f_right
+            right = low + ratio * (high - low)
+            f_right = negative_log_likelihood(logits, targets, math.exp(right))
+    return math.exp((low + high) / 2)
+
+
+def expected_calibration_error(probs: np.ndarray, targets: np.ndarray, bins: int = 10) -> float:
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == targets
+    edges = np.minimum((confidence * bins).astype(np.int64), bins - 1)
+    total = 0.0
+    for bucket in range(bins):
+        mask = edges == bucket
+        if mask.any():
+            total += mask.mean() * abs(correct[mask].mean() - confidence[mask].mean())
+    return float(total)
+
+
+# ----------------------------------------------------------------------
+# Kurva ROC / PR
+# ----------------------------------------------------------------------
+def threshold_curve(scores: np.ndarray, positives: np.ndarray) -> Dict[str, np.ndarray]:
+    """Precision/recall/FPR untuk setiap threshold unik (``skor >= threshold`` = positif)."""
+    order = np.argsort(-scores, kind="mergesort")
+    sorted_scores, sorted_positive = scores[order], positives[order].astype(np.float64)
+    last_of_value = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(sorted_scores) - 1]
+    tp = np.cumsum(sorted_positive)[last_of_value]
+    fp = (last_of_value + 1) - tp
+    total_pos, total_neg = max(positives.sum(), 1), max((~positives).sum(), 1)
+    precision = tp / np.maximum(tp + fp, 1)
+    recall = tp / total_pos
+    return {
+        "threshold": sorted_scores[last_of_value],
+        "tp": tp,
+        "fp": fp,
+        "precision": precision,
+        "recall": recall,
+        "tpr": recall,
+        "fpr": fp / total_neg,
+        "f1": 2 * precision * recall / np.maximum(precision + recall, _EPS),
+    }
+
+
+def roc_auc(curve: Dict[str, np.ndarray]) -> float:
+    fpr = np.r_[0.0, curve["fpr"]]
+    tpr = np.r_[0.0, curve["tpr"]]
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+
+def average_precision(curve: Dict[str, np.ndarray]) -> float:
+    recall = np.r_[0.0, curve["recall"]]
+    return float(np.sum(np.diff(recall) * curve["precision"]))
+
+
+def choose_threshold(
+    curve: Dict[str, np.ndarray],
+    criterion: str = "f1",
+    target_precision: float = 0.95,
+    minimum: float = 0.5,
+) -> int:
+    """Indeks titik kurva terpilih.
+
+    ``minimum`` 0.5 menjaga konsistensi dengan aturan engine (label argmax harus
+    ``ASLI`` dan confidence >= threshold) pada model dua kelas.
+    """
+    candidates = np.flatnonzero(curve["threshold"] >= minimum)
+    if not len(candidates):
+        candidates = np.array([0])
+    if criterion == "precision":
+        reaching = candidates[curve["precision"][candidates] >= target_precision]
+        if len(reaching):
+            return int(reaching[np.argmax(curve["recall"][reaching])])
+        logger.warning("Precision %.2f tidak tercapai, memakai F1 maksimum", target_precision)
+        criterion = "f1"
+    if criterion == "youden":
+        return int(candidates[np.argmax(curve["tpr"][candidates] - curve["fpr"][candidates])])
+    if criterion == "f1":
+        return int(candidates[np.argmax(curve["f1"][candidates])])
+    raise ValueError(f"Kriteria tidak dikenal: {criterion}")
+
+
+def _downsample(curve: Dict[str, np.ndarray], points: int = _CURVE_POINTS) -> List[Dict[str, float]]:
+    size = len(curve["threshold"])
+    picks = np.unique(np.linspace(0, size - 1, num=min(points, size)).astype(np.int64)) if size else []
+    return [
+        {
+            "threshold": round(float(curve["threshold"][i]), 5),
+            "precision": round(float(curve["precision"][i]), 5),
+            "recall": round(float(curve["recall"][i]), 5),
+            "fpr": round(float(curve["fpr"][i]), 5),
+        }
+        for i in picks
+    ]
+
+
+# ----------------------------------------------------------------------
+# Evaluasi
+# ----------------------------------------------------------------------
+def collect_scores(detector, feature_index, batch_size: int = 64) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """Skor mentah ``[n, k]`` + indeks kelas target untuk setiap gambar berlabel di feature index."""
+    class_of = {str(label).upper(): class_id for class_id, label in detector.label_map.items()}
+    scores: List[np.ndarray] = []
+    targets: List[int] = []
+    ids: List[int] = []
+    for batch_ids, metas, tensors in feature_index.iter_batches(batch_size=batch_size):
+        keep = [i for i, meta in enumerate(metas) if str(meta.get("label") or "").upper() in class_of]
+        if not keep:
+            continue
+        scores.append(np.asarray(detector.score_batch(tensors[keep]), dtype=np.float64))
+        targets.extend(class_of[str(metas[i]["label"]).upper()] for i in keep)
+        ids.extend(batch_ids[i] for i in keep)
+    if not scores:
+        return np.zeros((0, len(class_of))), np.zeros(0, dtype=np.int64), []
+    return np.concatenate(scores), np.asarray(targets, dtype=np.int64), ids
+
+
+def calibrate_detector(
+    detector,
+    feature_index,
+    *,
+    criterion: str = "f1",
+    target_precision: float = 0.95,
+    batch_size: int = 64,
+    positive_label: str = POSITIVE_LABEL,
+) -> Calibration:
+    """Jalankan detector atas seluruh gambar berlabel lalu hitung parameter kalibrasi."""
+    if criterion not in CRITERIA:
+        raise ValueError(f"Kriteria tidak dikenal: {criterion}")
+    positive_class = next(
+        (class_id for class_id, label in detector.label_map.items() if str(label).upper() == positive_label),
+        None,
+    )
+    if positive_class is None:
+        raise ValueError(f"Label {positive_label} tidak ada di label_map detector")
+
+    scores, targets, _ = collect_scores(detector, feature_index, batch_size=batch_size)
+    positives = targets == positive_class
+    if not positives.any() or positives.all():
+        raise ValueError("Butuh minimal satu gambar ASLI dan satu gambar non-ASLI untuk kalibrasi")
+
+    logits = scores_to_logits(scores)
+    temperature = fit_temperature(scores, targets)
+    raw_probs = _softmax(logits)
+    probs = _softmax(logits / temperature)
+
+    curve = threshold_curve(probs[:, positive_class], positives)
+    chosen = choose_threshold(curve, criterion=criterion, target_precision=target_precision)
+    threshold = float(curve["threshold"][chosen])
+
+    metrics = {
+        "samples": int(len(targets)),
+        "positives": int(positives.sum()),
+        "negatives": int((~positives).sum()),
+        "roc_auc": round(roc_auc(curve), 5),
+        "average_precision": round(average_precision(curve), 5),
+        "nll_before": round(negative_log_likelihood(logits, targets, 1.0), 5),
+        "nll_after": round(negative_log_likelihood(logits, targets, temperature), 5),
+        "ece_before": round(expected_calibration_error(raw_probs, targets), 5),
+        "ece_after": round(expected_calibration_error(probs, targets), 5),
+        "at_threshold": {
+            "precision": round(float(curve["precision"][chosen]), 5),
+            "recall": round(float(curve["recall"][chosen]), 5),
+            "fpr": round(float(curve["fpr"][chosen]), 5),
+            "f1": round(float(curve["f1"][chosen]), 5),
+        },
+        "curve": _downsample(curve),
+    }
+    return Calibration(
+        model=detector.model_identity,
+        temperature=round(temperature, 6),
+        threshold=round(threshold, 6),
+        positive_label=positive_label,
+        criterion=criterion,
+        created_at=datetime.now().isoformat(timespec="seconds"),
+        metrics=metrics,
+    )
+
+
+def load_calibration(path: Optional[str]) -> Optional[Calibration]:
+    """Muat file kalibrasi; ``None`` bila path kosong, tidak ada, atau rusak."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return Calibration.load(path)
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        logger.warning("File kalibrasi %s tidak valid: %s", path, exc)
+        return None
+
+
+__all__ = [
+    "CRITERIA",
+    "Calibration",
+    "apply_temperature",
+    "average_precision",
+    "calibrate_detector",
+    "choose_threshold",
+    "collect_scores",
+    "expected_calibration_error",
+    "fit_temperature",
+    "load_calibration",
+    "roc_auc",
+    "scores_to_logits",
+    "threshold_curve",
+]
@@ -8,6 +8,7 @@ bisa langsung terintegrasi dan kemudian tinggal mengganti modelnya saja.
 """
 from __future__ import annotations
 
+import logging
 import os
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Sequence, Tuple
@@ -16,6 +17,12 @@ import cv2
 import numpy as np
 from pyzbar import pyzbar
 
+from calibration import Calibration, apply_temperature, load_calibration
+from instrumentation import STAGE_LATENCY
+from object_detector import PartObjectDetector, crop_region
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class DetectionResult:
@@ -41,7 +48,17 @@ class ModelNotLoadedError(RuntimeError):
 
 
 class SparePartDetector:
-    """Wrapper sederhana untuk model CNN (format ONNX atau OpenCV DNN)."""
+    """Wrapper sederhana untuk model CNN (format ONNX atau OpenCV DNN).
+
+    Konstanta heuristik fallback disimpan sebagai atribut ``fallback_*`` dan
+    parameter hasil :mod:`calibration` (temperature + threshold) dimuat dari
+    ``calibration_path`` bila file-nya ada dan dibuat untuk model yang sama.
+    """
+
+    fallback_base_score = 0.4
+    fallback_sharpness_scale = 150.0
+    fallback_intensity_weight = 0.4
+    fallback_max_score = 0.99
 
     def __init__(
         self,
@@ -49,12 +66,18 @@ class SparePartDetector:
         label_map: Optional[Dict[int, str]] = None,
         confidence_threshold: float = 0.6,
         input_size: Tuple[int, int] = (224, 224),
+        embedding_layer: Optional[str] = None,
+        calibration_path: Optional[str] = None,
     ) -> None:
         self.model_path = model_path
         self.label_map = label_map or {0: "ASLI", 1: "PALSU"}
         self.confidence_threshold = confidence_threshold
         self.input_size = input_size
+        self.embedding_layer = embedding_layer
         self._net: Optional[cv2.dnn.Net] = None
+        self.calibration: Optional[Calibration] = None
+        if calibration_path:
+            self.load_calibration(calibration_path)
 
     # ------------------------------------------------------------------
     # Lifecycle helpers
@@ -76,6 +99,29 @@ class SparePartDetector:
     def is_loaded(self) -> bool:
         return self._net is not None or self.model_path is None
 
+    @property
+    def model_identity(self) -> str:
+        """Penanda model untuk mencocokkan file kalibrasi."""
+        return os.path.basename(self.model_path) if self.model_path else "fallback"
+
+    def load_calibration(self, path: str) -> bool:
+        """Pakai temperature + threshold dari file kalibrasi bila cocok dengan model ini."""
+        calibration = load_calibration(path)
+        if calibration is None:
+            return False
+        if calibration.model != self.model_identity:
+            logger.warning(
+                "Kalibrasi %s dibuat untuk model %s, bukan %s; diabaikan",
+                path, calibration.model, self.model_identity,
+            )
+            return False
+        self.calibration = calibration
+        self.confidence_threshold = calibration.threshold
+        logger.info(
+            "Kalibrasi dimuat: temperature %.3f, threshold %.3f", calibration.temperature, calibration.threshold
+        )
+        return True
+
     # ------------------------------------------------------------------
     # Pre/Post processing
     # ------------------------------------------------------------------
@@ -93,16 +139,101 @@ class SparePartDetector:
 
     def _fallback_inference(self, image: np.ndarray) -> np.ndarray:
         """Heuristik sederhana berbasis intensitas + tekstur untuk demo."""
+        return self._fallback_scores(self._preprocess(image))
+
+    def _fallback_scores(self, blobs: np.ndarray) -> np.ndarray:
+        """Skor heuristik ``[n, 2]`` dari batch blob ``_preprocess`` (BGR 0..1).
 
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        laplacian_var = cv2.Laplacian(blur, cv2.CV_64F).var()
-        mean_intensity = gray.mean() / 255.0
+        Ketajaman = varians Laplacian setelah Gaussian blur 5x5 pada grayscale
+        ukuran input model, dihitung vektor untuk seluruh batch.
+        """
+        blobs = np.asarray(blobs, dtype=np.float32)
+        n, _, height, width = blobs.shape
+        gray = np.tensordot(np.array([0.114, 0.587, 0.299], dtype=np.float32), blobs, axes=([0], [1])) * 255.0
+
+        kernel = cv2.getGaussianKernel(5, 0).ravel()
+        padded = np.pad(gray, ((0, 0), (2, 2), (2, 2)), mode="reflect")
+        blur = sum(kernel[i] * padded[:, i:i + height, :] for i in range(5))
+        blur = sum(kernel[i] * blur[:, :, i:i + width] for i in range(5))
+        padded = np.pad(blur, ((0, 0), (1, 1), (1, 1)), mode="reflect")
+        laplacian = (
+            padded[:, :-2, 1:-1] + padded[:, 2:, 1:-1] + padded[:, 1:-1, :-2] + padded[:, 1:-1, 2:] - 4 * blur
+        )
+        laplacian_var = laplacian.reshape(n, -1).var(axis=1)
+        mean_intensity = gray.reshape(n, -1).mean(axis=1) / 255.0
 
         # Mapping heuristik menjadi skor dua kelas (asli vs palsu)
-        asli_score = min(0.99, 0.4 + (laplacian_var / 150.0) + (mean_intensity * 0.4))
-        palsu_score = 1.0 - asli_score
-        return np.array([[asli_score, palsu_score]], dtype=np.float32)
+        asli_score = np.minimum(
+            self.fallback_max_score,
+            self.fallback_base_score
+            + laplacian_var / self.fallback_sharpness_scale
+            + mean_intensity * self.fallback_intensity_weight,
+        )
+        return np.stack([asli_score, 1.0 - asli_score], axis=1).astype(np.float32)
+
+    def score_batch(self, blobs: np.ndarray) -> np.ndarray:
+        """Skor mentah (belum dikalibrasi) ``[n, kelas]`` untuk batch blob ``_preprocess``."""
+        blobs = np.asarray(blobs, dtype=np.float32)
+        if self._net is None:
+            return self._fallback_scores(blobs)
+        try:
+            self._net.setInput(blobs)
+            output = self._net.forward()
+            if len(output) == len(blobs):
+                return output.reshape(len(blobs), -1)
+        except cv2.error:
+            pass  # model dengan batch statis 1
+        return np.concatenate([self._run_inference(blob[np.newaxis]).reshape(1, -1) for blob in blobs])
+
+    def calibrate(self, scores: np.ndarray) -> np.ndarray:
+        """Terapkan temperature scaling bila kalibrasi dimuat; tanpa kalibrasi skor dikembalikan apa adanya."""
+        if self.calibration is None:
+            return scores
+        return apply_temperature(scores, self.calibration.temperature).astype(np.float32)
+
+    def embed(self, blobs: np.ndarray) -> np.ndarray:
+        """Embedding ter-normalisasi L2 untuk batch blob ``_preprocess`` ``[n, 3, H, W]``.
+
+        Dengan model + ``embedding_layer`` dipakai keluaran layer tersebut
+        (mis. penultimate layer); tanpa model dipakai deskriptor warna + gradien.
+        """
+        blobs = np.asarray(blobs, dtype=np.float32)
+        if self._net is not None and self.embedding_layer:
+            features = []
+            for blob in blobs:
+                self._net.setInput(blob[np.newaxis])
+                features.append(self._net.forward(self.embedding_layer).reshape(-1))
+            vectors = np.stack(features)
+        else:
+            vectors = self._fallback_embedding(blobs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _fallback_embedding(self, blobs: np.ndarray, grid: int = 8, cells: int = 4, bins: int = 8) -> np.ndarray:
+        """Rata-rata warna per blok ``grid x grid`` + histogram orientasi gradien per sel."""
+        n, channels, height, width = blobs.shape
+        bh, bw = height // grid, width // grid
+        color = blobs[:, :, : bh * grid, : bw * grid].reshape(n, channels, grid, bh, grid, bw).mean(axis=(3, 5))
+        color = color.reshape(n, -1)
+        color -= color.mean(axis=1, keepdims=True)
+
+        gray = blobs.mean(axis=1)
+        gx = gray[:, 1:-1, 2:] - gray[:, 1:-1, :-2]
+        gy = gray[:, 2:, 1:-1] - gray[:, :-2, 1:-1]
+        ch, cw = gx.shape[1] // cells, gx.shape[2] // cells
+        gx, gy = gx[:, : ch * cells, : cw * cells], gy[:, : ch * cells, : cw * cells]
+        magnitude = np.hypot(gx, gy)
+        orientation = np.minimum((np.mod(np.arctan2(gy, gx), np.pi) / np.pi * bins).astype(np.int64), bins - 1)
+        cell_row = (np.arange(ch * cells) // ch)[:, None]
+        cell_col = (np.arange(cw * cells) // cw)[None, :]
+        cell = cell_row * cells + cell_col
+        index = (np.arange(n)[:, None, None] * cells * cells + cell[None]) * bins + orientation
+        gradient = np.bincount(index.ravel(), weights=magnitude.ravel(), minlength=n * cells * cells * bins)
+        gradient = gradient.reshape(n, -1)
+
+        color /= np.maximum(np.linalg.norm(color, axis=1, keepdims=True), 1e-12)
+        gradient /= np.maximum(np.linalg.norm(gradient, axis=1, keepdims=True), 1e-12)
+        return np.concatenate([color, gradient], axis=1).astype(np.float32)
 
     def detect(self, image: np.ndarray) -> DetectionResult:
         """Melakukan inference dan mengembalikan DetectionResult tunggal."""
@@ -110,26 +241,43 @@ class SparePartDetector:
         if self.model_path and not self.is_loaded:
             raise ModelNotLoadedError("Model belum dimuat. Pastikan load_model() berhasil.")
 
-        blob = self._preprocess(image)
-        if self._net is not None:
-            logits = self._run_inference(blob)
-        else:
-            logits = self._fallback_inference(image)
+        with STAGE_LATENCY.time(stage="cnn_detect"):
+            blob = self._preprocess(image)
+            if self._net is not None:
+                logits = self._run_inference(blob)
+            else:
+                logits = self._fallback_scores(blob)
 
-        scores = logits[0]
+        h, w = image.shape[:2]
+        return self._result_from_scores(logits[0], (0, 0, w, h))  # seluruh frame
+
+    def classify_regions(
+        self,
+        image: np.ndarray,
+        bboxes: Sequence[Tuple[int, int, int, int]],
+        padding: float = 0.05,
+    ) -> List[DetectionResult]:
+        """Klasifikasi ASLI/PALSU untuk beberapa region ``(x, y, w, h)`` dalam satu batch inference."""
+        if not bboxes:
+            return []
+        with STAGE_LATENCY.time(stage="cnn_detect"):
+            crops = [crop_region(image, bbox, padding) for bbox in bboxes]
+            blobs = np.concatenate([self._preprocess(crop if crop.size else image) for crop in crops])
+            scores = self.score_batch(blobs)
+        return [self._result_from_scores(row, tuple(bbox)) for row, bbox in zip(scores, bboxes)]
+
+    def _result_from_scores(self, raw_scores: np.ndarray, bbox: Tuple[int, int, int, int]) -> DetectionResult:
+        scores = self.calibrate(raw_scores[np.newaxis])[0]
         class_id = int(np.argmax(scores))
         confidence = float(scores[class_id])
         label = self.label_map.get(class_id, f"CLASS_{class_id}")
-
-        h, w = image.shape[:2]
-        bbox = (0, 0, w, h)  # Placeholder: full frame bounding box
-
         return DetectionResult(
             label=label,
             confidence=confidence,
             bbox=bbox,
             metadata={
-                "raw_scores": scores.tolist(),
+                "raw_scores": np.asarray(raw_scores).tolist(),
+                "calibrated": self.calibration is not None,
                 "predicted_category": self._infer_category(class_id, label),
             },
         )
@@ -148,7 +296,8 @@ class QRDecoder:
     """Helper untuk mendeteksi QR / barcode dari gambar."""
 
     def decode(self, image: np.ndarray) -> List[str]:
-        decoded = pyzbar.decode(image)
+        with STAGE_LATENCY.time(stage="qr_decode"):
+            decoded = pyzbar.decode(image)
         return [obj.data.decode("utf-8", errors="ignore") for obj in decoded if obj.data]
 
 
@@ -160,13 +309,23 @@ class HybridDetectionEngine:
         detector: Optional[SparePartDetector] = None,
         qr_decoder: Optional[QRDecoder] = None,
         qr_required: bool = False,
+        reference_matcher=None,
+        reference_top_k: int = 3,
+        reference_threshold: float = 0.85,
+        object_detector: Optional[PartObjectDetector] = None,
     ) -> None:
         self.detector = detector or SparePartDetector()
+        self.object_detector = object_detector or PartObjectDetector()
         self.qr_decoder = qr_decoder or QRDecoder()
         self.qr_required = qr_required
+        self.reference_matcher = reference_matcher
+        self.reference_top_k = reference_top_k
+        self.reference_threshold = reference_threshold
 
         if not self.detector.is_loaded:
             self.detector.load_model()
+        if not self.object_detector.is_loaded:
+            self.object_detector.load_model()
 
     def analyze(
         self,
@@ -192,15 +351,80 @@ class HybridDetectionEngine:
             overall_confidence = detections.confidence
             authenticity = detections.label.upper() == "ASLI" and overall_confidence >= self.detector.confidence_threshold
 
+        reference = self.match_references(image, kode_part)
+        notes = self._build_notes(detections, qr_values, authenticity)
+        reference_note = self.reference_note(reference)
+        if reference_note:
+            notes.insert(-1, reference_note)
+
         return {
             "kode_part": kode_part,
             "authentic": authenticity,
             "confidence": round(overall_confidence, 3),
             "cnn": detections.to_dict(),
             "qr_codes": qr_values,
-            "notes": self._build_notes(detections, qr_values, authenticity),
+            "reference": reference,
+            "notes": notes,
+        }
+
+    def analyze_objects(self, image_source: str | np.ndarray) -> List[Dict[str, object]]:
+        """Analisa multi-objek: lokalisasi part, klasifikasi tiap box (satu batch), QR di dalam box.
+
+        Setiap elemen berisi ``bbox``, ``detection`` (skor lokalisasi), ``cnn``,
+        ``qr_codes``, ``authentic``, dan ``confidence`` seperti :meth:`analyze`.
+        """
+        image = self._load_image(image_source)
+        boxes = self.object_detector.detect(image)
+        detections = self.detector.classify_regions(image, [box.bbox for box in boxes])
+
+        objects = []
+        for box, detection in zip(boxes, detections):
+            qr_values = self.qr_decoder.decode(crop_region(image, box.bbox))
+            if self.qr_required and not qr_values:
+                confidence, authenticity = 0.0, False
+            else:
+                confidence = detection.confidence
+                authenticity = detection.label.upper() == "ASLI" and confidence >= self.detector.confidence_threshold
+            objects.append({
+                "bbox": list(box.bbox),
+                "detection": box.to_dict(),
+                "authentic": authenticity,
+                "confidence": round(confidence, 3),
+                "cnn": detection.to_dict(),
+                "qr_codes": qr_values,
+                "notes": self._build_notes(detection, qr_values, authenticity),
+            })
+        return objects
+
+    def match_references(self, image: np.ndarray, kode_part: Optional[str]) -> Optional[Dict[str, object]]:
+        """Bandingkan gambar dengan foto referensi ASLI milik ``kode_part``.
+
+        Mengembalikan ``None`` bila matcher tidak aktif atau kode part kosong.
+        """
+        if self.reference_matcher is None or not kode_part:
+            return None
+        with STAGE_LATENCY.time(stage="reference_match"):
+            query = self.detector.embed(self.detector._preprocess(image))[0]
+            matches = self.reference_matcher.match(kode_part, query, k=self.reference_top_k)
+        best = matches[0].similarity if matches else None
+        return {
+            "kode_part": kode_part,
+            "references": self.reference_matcher.reference_count(kode_part),
+            "matches": [match.to_dict() for match in matches],
+            "best_similarity": round(best, 4) if best is not None else None,
+            "supports_authentic": None if best is None else best >= self.reference_threshold,
         }
 
+    @staticmethod
+    def reference_note(reference: Optional[Dict[str, object]]) -> Optional[str]:
+        if not reference:
+            return None
+        if reference["best_similarity"] is None:
+            return f"Belum ada foto referensi ASLI untuk {reference['kode_part']}."
+        if reference["supports_authentic"]:
+            return f"Mirip foto referensi ASLI (similarity {reference['best_similarity']:.2f})."
+        return f"Kurang mirip foto referensi ASLI (similarity {reference['best_similarity']:.2f})."
+
     # ------------------------------------------------------------------
     # Internal helpers
     # ------------------------------------------------------------------
@@ -209,7 +433,8 @@ class HybridDetectionEngine:
             return image_source
         if not os.path.exists(image_source):
             raise FileNotFoundError(f"File gambar tidak ditemukan: {image_source}")
-        image = cv2.imread(image_source)
+        with STAGE_LATENCY.time(stage="image_decode"):
+            image = cv2.imread(image_source)
         if image is None:
             raise ValueError("Gagal membaca file gambar")
         return image
@@ -0,0 +1,298 @@
+"""Indeks tensor fitur gambar training dalam array memory-mapped.
+
+Evaluasi dan kalibrasi detector sebelumnya men-decode dan mem-preprocess ulang
+setiap file di ``uploads/training``. Indeks ini menyimpan keluaran
+``SparePartDetector._preprocess`` (atau fungsi ekstraksi lain berbentuk tetap)
+satu baris per gambar training:
+
+* ``features.bin`` - ``np.memmap`` berukuran ``(kapasitas, *shape)``; tumbuh
+  dua kali lipat saat penuh, baris gambar yang dihapus dipakai ulang.
+* ``index.json``  - sidecar ``image_id -> {row, kode_part, label, filename}``
+  plus ``shape``/``dtype``/``signature`` agar indeks otomatis dibangun ulang
+  bila preprocessing berubah.
+
+Penulisan dilindungi ``flock`` sehingga aman dipakai beberapa worker; pembaca
+memuat ulang sidecar bila file-nya berubah.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DATA_FILE = "features.bin"
+_INDEX_FILE = "index.json"
+_LOCK_FILE = ".lock"
+_INITIAL_CAPACITY = 64
+
+
+class FeatureIndex:
+    """Penyimpanan tensor fitur per ``image_id`` di atas ``np.memmap``.
+
+    Args:
+        directory: folder indeks.
+        extract: ``fungsi(gambar_bgr) -> ndarray`` dengan bentuk tetap.
+        shape: bentuk satu tensor (tanpa dimensi batch).
+        signature: penanda konfigurasi ekstraksi; beda signature = indeks direset.
+        dtype: tipe penyimpanan. ``float16`` memangkas ukuran separuh; nilai
+            hasil ``_preprocess`` (0..1) tetap presisi ~1e-3.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        extract: Callable[[np.ndarray], np.ndarray],
+        shape: Sequence[int],
+        signature: str,
+        dtype: str = "float16",
+    ) -> None:
+        self.directory = directory
+        self.extract = extract
+        self.shape = tuple(int(dim) for dim in shape)
+        self.signature = signature
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._meta: Optional[Dict[str, object]] = None
+        self._meta_mtime: Optional[float] = None
+        self._array: Optional[np.memmap] = None
+
+    # ------------------------------------------------------------------
+    # Baca
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._load_meta()["entries"])
+
+    def __contains__(self, image_id: int) -> bool:
+        return str(image_id) in self._load_meta()["entries"]
+
+    def entries(
+        self,
+        kode_part: Optional[str] = None,
+        label: Optional[str] = None,
+    ) -> List[Tuple[int, Dict[str, object]]]:
+        """``(image_id, metadata)`` terurut id, bisa difilter per part/label."""
+        items = []
+        for key, entry in self._load_meta()["entries"].items():
+            if kode_part is not None and entry.get("kode_part") != kode_part:
+                continue
+            if label is not None and entry.get("label") != label:
+                continue
+            items.append((int(key), entry))
+        items.sort(key=lambda item: item[0])
+        return items
+
+    def get(self, image_id: int) -> Optional[np.ndarray]:
+        entry = self._load_meta()["entries"].get(str(image_id))
+        if entry is None:
+            return None
+        with self._lock:
+            return np.asarray(self._open_array()[entry["row"]], dtype=np.float32)
+
+    def iter_batches(
+        self,
+        batch_size: int = 64,
+        kode_part: Optional[str] = None,
+        label: Optional[str] = None,
+    ) -> Iterator[Tuple[List[int], List[Dict[str, object]], np.ndarray]]:
+        """Yield ``(ids, metadata, tensor float32 [n, *shape])`` per batch, langsung dari mmap."""
+        selected = self.entries(kode_part=kode_part, label=label)
+        for start in range(0, len(selected), batch_size):
+            chunk = selected[start:start + batch_size]
+            rows = np.array([entry["row"] for _, entry in chunk], dtype=np.int64)
+            with self._lock:
+                tensors = np.asarray(self._open_array()[rows], dtype=np.float32)
+            yield [image_id for image_id, _ in chunk], [entry for _, entry in chunk], tensors
+
+    # ------------------------------------------------------------------
+    # Tulis
+    # ------------------------------------------------------------------
+    def add_image(self, image_id: int, image: np.ndarray, **metadata: object) -> None:
+        tensor = np.asarray(self.extract(image)).reshape(self.shape)
+        self.add_tensor(image_id, tensor, **metadata)
+
+    def add_file(self, image_id: int, path: str, **metadata: object) -> bool:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            logger.warning("Feature index: gagal membaca %s", path)
+            return False
+        self.add_image(image_id, image, **metadata)
+        return True
+
+    def add_tensor(self, image_id: int, tensor: np.ndarray, **metadata: object) -> None:
+        self.add_tensors([(image_id, tensor, metadata)])
+
+    def add_tensors(self, items: Sequence[Tuple[int, np.ndarray, Dict[str, object]]]) -> None:
+        """Tulis beberapa tensor sekaligus dengan satu kali update sidecar."""
+        if not items:
+            return
+        with self._write() as meta:
+            entries = meta["entries"]
+            placed = []
+            for image_id, tensor, metadata in items:
+                existing = entries.get(str(image_id))
+                if existing is not None:
+                    row = existing["row"]
+                elif meta["free"]:
+                    row = meta["free"].pop()
+                else:
+                    row = meta["next_row"]
+                    meta["next_row"] = row + 1
+                entries[str(image_id)] = {"row": row, **metadata}
+                placed.append((row, tensor))
+            array = self._ensure_capacity(meta, meta["next_row"])
+            for row, tensor in placed:
+                array[row] = np.asarray(tensor).reshape(self.shape).astype(self.dtype, copy=False)
+            array.flush()
+
+    def remove(self, image_id: int) -> bool:
+        return self.remove_many([image_id]) == 1
+
+    def remove_many(self, image_ids: Iterable[int]) -> int:
+        """Hapus entri; baris mmap-nya masuk daftar bebas untuk dipakai ulang."""
+        removed = 0
+        with self._write() as meta:
+            for image_id in image_ids:
+                entry = meta["entries"].pop(str(image_id), None)
+                if entry is not None:
+                    meta["free"].append(entry["row"])
+                    removed += 1
+        return removed
+
+    def sync(self, records: Iterable[Dict[str, object]], image_dir: str, batch_size: int = 32) -> Dict[str, int]:
+        """Samakan indeks dengan daftar gambar training (``id``, ``filename``, ``kode_part``, ``label``).
+
+        Hanya gambar baru yang di-decode; gambar yang sudah tidak ada dihapus dari indeks.
+        """
+        records = list(records)
+        wanted = {int(record["id"]): record for record in records}
+        present = {image_id for image_id, _ in self.entries()}
+        added = failed = 0
+        removed = self.remove_many(sorted(present - set(wanted)))
+        pending: List[Tuple[int, np.ndarray, Dict[str, object]]] = []
+        for image_id in sorted(set(wanted) - present):
+            record = wanted[image_id]
+            image = cv2.imread(os.path.join(image_dir, str(record["filename"])), cv2.IMREAD_COLOR)
+            if image is None:
+                logger.warning("Feature index: gagal membaca %s", record["filename"])
+                failed += 1
+                continue
+            metadata = {"kode_part": record.get("kode_part"), "label": record.get("label"), "filename": record.get("filename")}
+            pending.append((image_id, self.extract(image), metadata))
+            if len(pending) >= batch_size:
+                self.add_tensors(pending)
+                added += len(pending)
+                pending = []
+        self.add_tensors(pending)
+        added += len(pending)
+        return {"added": added, "removed": removed, "failed": failed, "total": len(self)}
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _empty_meta(self) -> Dict[str, object]:
+        return {
+            "version": 1,
+            "signature": self.signature,
+            "shape": list(self.shape),
+            "dtype": self.dtype.str,
+            "capacity": 0,
+            "next_row": 0,
+            "free": [],
+            "entries": {},
+        }
+
+    def _load_meta(self, force: bool = False) -> Dict[str, object]:
+        with self._lock:
+            path = self._path(_INDEX_FILE)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if not force and self._meta is not None and mtime == self._meta_mtime:
+                return self._meta
+
+            meta = None
+            if mtime is not None:
+                try:
+                    with open(path, encoding="utf-8") as handle:
+                        meta = json.load(handle)
+                except (OSError, ValueError) as exc:
+                    logger.warning("Feature index rusak, dibangun ulang: %s", exc)
+            if meta is not None and (
+                meta.get("signature") != self.signature
+                or tuple(meta.get("shape", ())) != self.shape
+                or meta.get("dtype") != self.dtype.str
+            ):
+                logger.info("Konfigurasi preprocessing berubah, feature index direset")
+                meta = None
+            if meta is None:
+                meta = self._empty_meta()
+            if self._meta is None or meta.get("capacity") != self._meta.get("capacity"):
+                self._array = None  # kapasitas berubah di proses lain: buka ulang memmap
+            self._meta, self._meta_mtime = meta, mtime
+            return meta
+
+    def _open_array(self) -> np.memmap:
+        meta = self._meta if self._meta is not None else self._load_meta()
+        if self._array is None or self._array.shape[0] != meta["capacity"]:
+            if not meta["capacity"]:
+                return np.zeros((0, *self.shape), dtype=self.dtype)  # type: ignore[return-value]
+            self._array = np.memmap(
+                self._path(_DATA_FILE), dtype=self.dtype, mode="r+", shape=(meta["capacity"], *self.shape)
+            )
+        return self._array
+
+    def _ensure_capacity(self, meta: Dict[str, object], rows: int) -> np.memmap:
+        capacity = int(meta["capacity"])
+        if rows > capacity:
+            new_capacity = max(_INITIAL_CAPACITY, capacity * 2, rows)
+            row_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+            self._array = None
+            with open(self._path(_DATA_FILE), "ab") as handle:
+                handle.truncate(new_capacity * row_bytes)
+            meta["capacity"] = new_capacity
+        return self._open_array()
+
+    @contextmanager
+    def _write(self) -> Iterator[Dict[str, object]]:
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self._path(_LOCK_FILE), "a") as lock_handle:
+            fcntl.flock(lock_handle, fcntl.LOCK_EX)
+            try:
+                meta = self._load_meta(force=True)
+                if not meta["entries"] and not meta["capacity"] and os.path.exists(self._path(_DATA_FILE)):
+                    os.remove(self._path(_DATA_FILE))  # sisa indeks dengan signature lama
+                yield meta
+                tmp_path = self._path(_INDEX_FILE + ".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as handle:
+                    json.dump(meta, handle)
+                os.replace(tmp_path, self._path(_INDEX_FILE))
+                self._meta_mtime = os.stat(self._path(_INDEX_FILE)).st_mtime_ns
+            finally:
+                fcntl.flock(lock_handle, fcntl.LOCK_UN)
+
+
+def detector_feature_index(detector, directory: str) -> FeatureIndex:
+    """Indeks tensor ``detector._preprocess`` (blob NCHW, tanpa dimensi batch)."""
+    width, height = detector.input_size
+    return FeatureIndex(
+        directory,
+        extract=lambda image: detector._preprocess(image)[0],
+        shape=(3, height, width),
+        signature=f"preprocess:blob/255:{width}x{height}",
+    )
+
+
+__all__ = ["FeatureIndex", "detector_feature_index"]
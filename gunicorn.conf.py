@@ -0,0 +1,55 @@
+"""Konfigurasi gunicorn pre-fork.
+
+``preload_app`` membuat master meng-import ``wsgi`` (dan memuat bobot CNN/ONNX +
+EasyOCR) sekali sebelum fork; worker berbagi page bobot itu copy-on-write.
+State mutable per worker disiapkan oleh hook ``prefork.after_fork`` di ``app``.
+Cek hasilnya dengan ``flask memory-report --master-pid <pid master>``.
+
+Request berikutnya dari klien yang sama bisa mendarat di worker lain, jadi
+state yang dipakai lintas request dibagi lewat disk, bukan memori proses:
+
+* batch upload training - SQLite ``<TRAINING_SPOOL_FOLDER>/uploads.db``;
+* sesi verifikasi stream per frame - SQLite ``STREAM_SESSION_STORE_PATH``;
+* job verifikasi async - SQLite ``VERIFY_JOB_STORE_PATH``;
+* maintenance log - ``GET_LOCK`` (MySQL) / baris lease (SQLite);
+* ``/metrics`` - snapshot per worker di ``METRICS_MULTIPROC_DIR`` yang
+  dijumlahkan saat scrape (diaktifkan otomatis di bawah bila worker > 1).
+
+Yang sengaja tetap per worker: batas admission control (kapasitas total =
+batas x ``workers``) dan ring buffer profiler di dashboard (hanya memuat
+tangkapan worker yang melayani request dashboard).
+"""
+import glob
+import os
+
+from prefork import freeze_heap
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", 4))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+preload_app = True
+
+if workers > 1:
+    # Diset sebelum preload meng-import ``instrumentation`` agar REGISTRY membaca nilainya.
+    os.environ.setdefault("METRICS_MULTIPROC_DIR", "uploads/metrics")
+
+
+def on_starting(server):
+    # Snapshot metrik milik run sebelumnya (pid lama) tidak boleh ikut dijumlahkan.
+    directory = os.getenv("METRICS_MULTIPROC_DIR")
+    if directory:
+        for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+            os.remove(path)
+
+
+def pre_fork(server, worker):
+    # Objek milik master dibekukan agar siklus GC di worker tidak menyalin page-nya.
+    freeze_heap()
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s siap (model dibagi copy-on-write dari master)", worker.pid)
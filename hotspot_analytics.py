@@ -0,0 +1,494 @@
+"""Analitik hotspot pemalsuan real-time dengan sketch bermemori tetap.
+
+``GROUP BY`` atas seluruh tabel log terlalu mahal untuk dashboard yang
+di-refresh terus. Setiap hasil verifikasi dari ``log_verification_event``
+diumpankan ke :class:`HotspotTracker`, yang per jendela waktu
+(``window_seconds``, default 1 jam) menyimpan:
+
+* :class:`CountMinSketch` per ``kode_part`` dan per IP untuk hasil mencurigakan
+  (PALSU / TIDAK VALID / TIDAK DITEMUKAN) - estimasi frekuensi kunci apa pun;
+* :class:`SpaceSaving` top-K heavy hitter untuk kedua dimensi tersebut;
+* :class:`HyperLogLog` jumlah IP berbeda yang menghasilkan hasil mencurigakan.
+
+Hanya ``windows`` jendela terakhir yang disimpan di memori, jadi pemakaian
+memori tetap berapapun volume lognya. Semua struktur *mergeable*: tiap worker
+menulis snapshot jendelanya (terkompresi) ke SQLite lokal secara berkala, dan
+:meth:`HotspotTracker.summary` menggabungkan snapshot seluruh worker untuk
+rentang waktu yang diminta.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from sqlite_store import SQLiteConnectionManager
+
+logger = logging.getLogger(__name__)
+
+SUSPICIOUS_STATUSES: Tuple[str, ...] = ("PALSU", "TIDAK VALID", "TIDAK DITEMUKAN")
+_IGNORED_IPS = {"", "UNKNOWN"}
+_IGNORED_PARTS = {"", "UNKNOWN"}
+_SNAPSHOT_VERSION = 1
+
+SQLITE_HOTSPOT_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS hotspot_windows (
+        window_start INTEGER NOT NULL,
+        worker       TEXT NOT NULL,
+        updated_at   REAL NOT NULL,
+        state        BLOB NOT NULL,
+        PRIMARY KEY (window_start, worker)
+    )
+    """,
+)
+
+
+def _hash64(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8", errors="ignore"), digest_size=8).digest(), "little")
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+class CountMinSketch:
+    """Estimasi frekuensi (selalu >= nilai sebenarnya) dalam ``depth x width`` counter."""
+
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        # double hashing (Kirsch-Mitzenmacher): depth indeks dari satu hash 64-bit
+        value = _hash64(key)
+        low, high = value & 0xFFFFFFFF, (value >> 32) | 1
+        return np.array([(low + row * high) % self.width for row in range(self.depth)])
+
+    def add(self, key: str, count: int = 1) -> None:
+        self.table[self._rows, self._columns(key)] += count
+
+    def estimate(self, key: str) -> int:
+        return int(self.table[self._rows, self._columns(key)].min())
+
+    def merge(self, other: "CountMinSketch") -> None:
+        self.table += other.table
+
+    def to_state(self) -> Dict[str, object]:
+        return {"width": self.width, "depth": self.depth, "table": _b64(self.table.tobytes())}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, object]) -> "CountMinSketch":
+        sketch = cls(int(state["width"]), int(state["depth"]))
+        raw = np.frombuffer(base64.b64decode(state["table"]), dtype=np.uint32)
+        sketch.table = raw.reshape(sketch.depth, sketch.width).copy()
+        return sketch
+
+
+class SpaceSaving:
+    """Top-K heavy hitter (Metwally dkk.): maksimal ``capacity`` counter.
+
+    ``count`` tiap kunci adalah batas atas; ``error`` adalah kelebihan maksimumnya.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = capacity
+        self.counters: Dict[str, List[int]] = {}  # kunci -> [count, error]
+
+    def add(self, key: str, count: int = 1) -> None:
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+            return
+        victim = min(self.counters, key=lambda item: self.counters[item][0])
+        floor = self.counters.pop(victim)[0]
+        self.counters[key] = [floor + count, floor]
+
+    def merge(self, other: "SpaceSaving") -> None:
+        for key, (count, error) in other.counters.items():
+            counter = self.counters.setdefault(key, [0, 0])
+            counter[0] += count
+            counter[1] += error
+        if len(self.counters) > self.capacity:
+            kept = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)[: self.capacity]
+            self.counters = dict(kept)
+
+    def top(self, limit: int) -> List[Tuple[str, int, int]]:
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(key, count, error) for key, (count, error) in ranked[:limit]]
+
+    def to_state(self) -> List[List[object]]:
+        return [[key, count, error] for key, (count, error) in self.counters.items()]
+
+    @classmethod
+    def from_state(cls, state: Iterable[List[object]], capacity: int) -> "SpaceSaving":
+        summary = cls(capacity)
+        summary.counters = {str(key): [int(count), int(error)] for key, count, error in state}
+        return summary
+
+
+class HyperLogLog:
+    """Estimasi jumlah elemen berbeda dengan ``2**precision`` register (galat ~1.04/sqrt(m))."""
+
+    def __init__(self, precision: int = 12) -> None:
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key: str) -> None:
+        value = _hash64(key)
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        registers = np.frombuffer(bytes(self.registers), dtype=np.uint8)
+        estimate = alpha * m * m / float(np.sum(np.exp2(-registers.astype(np.float64))))
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting untuk kardinalitas kecil
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError(f"Presisi HyperLogLog berbeda: {self.precision} vs {other.precision}")
+        merged = np.maximum(
+            np.frombuffer(bytes(self.registers), dtype=np.uint8),
+            np.frombuffer(bytes(other.registers), dtype=np.uint8),
+        )
+        self.registers = bytearray(merged.tobytes())
+
+    def to_state(self) -> Dict[str, object]:
+        return {"precision": self.precision, "registers": _b64(bytes(self.registers))}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, object]) -> "HyperLogLog":
+        sketch = cls(int(state["precision"]))
+        sketch.registers = bytearray(base64.b64decode(state["registers"]))
+        return sketch
+
+
+class HotspotWindow:
+    """Seluruh sketch untuk satu jendela waktu."""
+
+    def __init__(self, start: int, *, width: int, depth: int, top_k: int, precision: int) -> None:
+        self.start = start
+        self.top_k = top_k
+        self.events = 0
+        self.by_status: Dict[str, int] = {}
+        self.parts = CountMinSketch(width, depth)
+        self.ips = CountMinSketch(width, depth)
+        self.top_parts = SpaceSaving(top_k)
+        self.top_ips = SpaceSaving(top_k)
+        self.distinct_ips = HyperLogLog(precision)
+
+    @property
+    def suspicious(self) -> int:
+        return sum(self.by_status.get(status, 0) for status in SUSPICIOUS_STATUSES)
+
+    def record(self, kode_part: str, status: str, ip_address: Optional[str]) -> None:
+        self.events += 1
+        self.by_status[status] = self.by_status.get(status, 0) + 1
+        if status not in SUSPICIOUS_STATUSES:
+            return
+        part = (kode_part or "").strip().upper()
+        if part not in _IGNORED_PARTS:
+            self.parts.add(part)
+            self.top_parts.add(part)
+        ip = (ip_address or "").strip()
+        if ip.upper() not in _IGNORED_IPS:
+            self.ips.add(ip)
+            self.top_ips.add(ip)
+            self.distinct_ips.add(ip)
+
+    def merge(self, other: "HotspotWindow") -> None:
+        self.events += other.events
+        for status, count in other.by_status.items():
+            self.by_status[status] = self.by_status.get(status, 0) + count
+        self.parts.merge(other.parts)
+        self.ips.merge(other.ips)
+        self.top_parts.merge(other.top_parts)
+        self.top_ips.merge(other.top_ips)
+        self.distinct_ips.merge(other.distinct_ips)
+
+    def ranked(self, limit: int) -> Dict[str, List[Dict[str, object]]]:
+        """Top-K dengan count = min(SpaceSaving, Count-Min); keduanya batas atas."""
+        return {
+            "top_parts": [
+                {"kode_part": key, "count": min(count, self.parts.estimate(key)), "error": error}
+                for key, count, error in self.top_parts.top(limit)
+            ],
+            "top_ips": [
+                {"ip_address": key, "count": min(count, self.ips.estimate(key)), "error": error}
+                for key, count, error in self.top_ips.top(limit)
+            ],
+        }
+
+    def to_blob(self) -> bytes:
+        state = {
+            "v": _SNAPSHOT_VERSION,
+            "start": self.start,
+            "events": self.events,
+            "by_status": self.by_status,
+            "parts": self.parts.to_state(),
+            "ips": self.ips.to_state(),
+            "top_parts": self.top_parts.to_state(),
+            "top_ips": self.top_ips.to_state(),
+            "distinct_ips": self.distinct_ips.to_state(),
+        }
+        return zlib.compress(json.dumps(state).encode("utf-8"))
+
+    @classmethod
+    def from_blob(cls, blob: bytes, *, top_k: int) -> "HotspotWindow":
+        state = json.loads(zlib.decompress(blob))
+        if state.get("v") != _SNAPSHOT_VERSION:
+            raise ValueError(f"Versi snapshot hotspot tidak dikenal: {state.get('v')}")
+        window = cls.__new__(cls)
+        window.start = int(state["start"])
+        window.top_k = top_k
+        window.events = int(state["events"])
+        window.by_status = {str(key): int(value) for key, value in state["by_status"].items()}
+        window.parts = CountMinSketch.from_state(state["parts"])
+        window.ips = CountMinSketch.from_state(state["ips"])
+        window.top_parts = SpaceSaving.from_state(state["top_parts"], top_k)
+        window.top_ips = SpaceSaving.from_state(state["top_ips"], top_k)
+        window.distinct_ips = HyperLogLog.from_state(state["distinct_ips"])
+        return window
+
+
+class HotspotTracker:
+    """Jendela sketch bergulir + snapshot berkala ke SQLite (dibagi antar worker).
+
+    Args:
+        store_path: file SQLite snapshot; ``None`` = hanya di memori proses ini.
+        window_seconds: lebar satu jendela waktu.
+        windows: jumlah jendela yang disimpan (memori & snapshot lebih tua dibuang).
+        snapshot_interval: jeda minimum (detik) antar penulisan snapshot.
+        width, depth: dimensi Count-Min sketch.
+        top_k: kapasitas SpaceSaving per dimensi.
+        precision: presisi HyperLogLog (``2**precision`` register).
+        enabled: ``False`` membuat :meth:`record` tidak melakukan apa-apa.
+    """
+
+    def __init__(
+        self,
+        store_path: Optional[str] = None,
+        *,
+        window_seconds: int = 3600,
+        windows: int = 24,
+        snapshot_interval: float = 30.0,
+        width: int = 2048,
+        depth: int = 4,
+        top_k: int = 64,
+        precision: int = 12,
+        enabled: bool = True,
+    ) -> None:
+        self.store = SQLiteConnectionManager(store_path, mmap_size=0) if store_path else None
+        self.window_seconds = max(1, int(window_seconds))
+        self.windows = max(1, windows)
+        self.snapshot_interval = snapshot_interval
+        self.enabled = enabled
+        self._sketch_options = {"width": width, "depth": depth, "top_k": top_k, "precision": precision}
+        self._schema_ready = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._worker = uuid.uuid4().hex[:12]  # bukan pid: pid bisa dipakai ulang setelah restart worker
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self._windows: Dict[int, HotspotWindow] = {}
+        self._dirty: set = set()
+        self._last_persist = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def record(self, kode_part: str, status: str, ip_address: Optional[str], now: Optional[float] = None) -> None:
+        """Umpankan satu hasil verifikasi; O(depth) + O(top_k) saat eviction."""
+        if not self.enabled:
+            return
+        if self._pid != os.getpid():
+            self._reset()  # setelah fork: jendela milik induk bukan milik worker ini
+        now = time.time() if now is None else now
+        with self._lock:
+            window = self._window_for(now)
+            if window is None:
+                return
+            window.record(kode_part or "", (status or "").upper(), ip_address)
+            self._dirty.add(window.start)
+        if self.store is not None and time.monotonic() - self._last_persist >= self.snapshot_interval:
+            self.persist()
+
+    def persist(self) -> int:
+        """Tulis snapshot jendela yang berubah sejak snapshot terakhir; mengembalikan jumlahnya."""
+        if self.store is None or not self._persist_lock.acquire(blocking=False):
+            return 0
+        dirty: List[Tuple[int, bytes]] = []
+        try:
+            self._last_persist = time.monotonic()
+            with self._lock:
+                dirty = [(start, self._windows[start].to_blob()) for start in self._dirty if start in self._windows]
+                self._dirty.clear()
+            if not dirty:
+                return 0
+            now = time.time()
+            conn = self._connect()
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO hotspot_windows (window_start, worker, updated_at, state) VALUES (?, ?, ?, ?)",
+                    [(start, self._worker, now, blob) for start, blob in dirty],
+                )
+                conn.execute(
+                    "DELETE FROM hotspot_windows WHERE window_start < ?",
+                    (self._window_start(now) - (self.windows - 1) * self.window_seconds,),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            return len(dirty)
+        except Exception as exc:  # noqa: BLE001 - snapshot berikutnya akan mencoba lagi
+            logger.warning("Gagal menyimpan snapshot hotspot: %s", exc)
+            with self._lock:
+                self._dirty.update(start for start, _ in dirty)
+            return 0
+        finally:
+            self._persist_lock.release()
+
+    def summary(self, hours: float = 24.0, limit: int = 10, now: Optional[float] = None) -> Dict[str, object]:
+        """Gabungan seluruh worker untuk ``hours`` jam terakhir: top part/IP, IP unik, dan deret per jendela."""
+        now = time.time() if now is None else now
+        since = self._window_start(now - hours * 3600) if hours > 0 else 0
+        windows = self._collect(since)
+
+        merged = HotspotWindow(since, **self._sketch_options)
+        timeline = []
+        for start in sorted(windows):
+            window = windows[start]
+            merged.merge(window)
+            timeline.append(
+                {
+                    "window_start": start,
+                    "events": window.events,
+                    "suspicious": window.suspicious,
+                    "distinct_ips": window.distinct_ips.count(),
+                }
+            )
+        return {
+            "window_seconds": self.window_seconds,
+            "since": since,
+            "events": merged.events,
+            "suspicious": merged.suspicious,
+            "by_status": merged.by_status,
+            "distinct_ips": merged.distinct_ips.count(),
+            **merged.ranked(limit),
+            "timeline": timeline,
+        }
+
+    def estimate(self, kode_part: Optional[str] = None, ip_address: Optional[str] = None, hours: float = 24.0) -> int:
+        """Estimasi (batas atas) jumlah hasil mencurigakan untuk satu kode part atau IP."""
+        since = self._window_start(time.time() - hours * 3600) if hours > 0 else 0
+        total = 0
+        for window in self._collect(since).values():
+            if kode_part:
+                total += window.parts.estimate(kode_part.upper())
+            elif ip_address:
+                total += window.ips.estimate(ip_address)
+        return total
+
+    # ------------------------------------------------------------------
+    # Internal
+    # ------------------------------------------------------------------
+    def _window_start(self, timestamp: float) -> int:
+        return int(timestamp // self.window_seconds * self.window_seconds)
+
+    def _window_for(self, now: float) -> Optional[HotspotWindow]:
+        start = self._window_start(now)
+        window = self._windows.get(start)
+        if window is not None:
+            return window
+        if len(self._windows) >= self.windows:
+            oldest = min(self._windows)
+            if start < oldest:
+                return None  # event terlambat untuk jendela yang sudah dibuang
+            del self._windows[oldest]
+            self._dirty.discard(oldest)
+        window = self._windows[start] = HotspotWindow(start, **self._sketch_options)
+        return window
+
+    def _collect(self, since: int) -> Dict[int, HotspotWindow]:
+        """Jendela >= ``since``: milik proses ini dari memori, worker lain dari snapshot."""
+        if self._pid != os.getpid():
+            self._reset()
+        top_k = self._sketch_options["top_k"]
+        windows: Dict[int, HotspotWindow] = {}
+        with self._lock:
+            for window in self._windows.values():
+                if window.start >= since:
+                    clone = HotspotWindow(window.start, **self._sketch_options)
+                    clone.merge(window)  # salinan, supaya penggabungan tidak mengubah jendela hidup
+                    windows[window.start] = clone
+        if self.store is None:
+            return windows
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT window_start, state FROM hotspot_windows WHERE window_start >= ? AND worker != ?",
+                (since, self._worker),
+            ).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            try:
+                snapshot = HotspotWindow.from_blob(row["state"], top_k=top_k)
+            except (ValueError, KeyError, zlib.error) as exc:
+                logger.warning("Snapshot hotspot %s dilewati: %s", row["window_start"], exc)
+                continue
+            current = windows.get(snapshot.start)
+            if current is None:
+                windows[snapshot.start] = snapshot
+            else:
+                try:
+                    current.merge(snapshot)
+                except ValueError as exc:  # dimensi sketch berbeda (konfigurasi berubah)
+                    logger.warning("Snapshot hotspot %s tidak bisa digabung: %s", snapshot.start, exc)
+        return windows
+
+    def _connect(self):
+        conn = self.store.connect()
+        if not self._schema_ready:
+            for statement in SQLITE_HOTSPOT_DDL:
+                conn.execute(statement)
+            conn.commit()
+            self._schema_ready = True
+        return conn
+
+
+__all__ = [
+    "CountMinSketch",
+    "HotspotTracker",
+    "HotspotWindow",
+    "HyperLogLog",
+    "SUSPICIOUS_STATUSES",
+    "SpaceSaving",
+    "SQLITE_HOTSPOT_DDL",
+]
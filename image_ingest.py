@@ -0,0 +1,233 @@
+"""Ingest gambar upload tanpa salinan penuh di memori.
+
+Alur lama (``read()`` -> ``np.frombuffer`` -> ``cv2.imdecode``) menyimpan isi
+file terenkode minimal dua kali dan baru tahu ukuran piksel setelah decode.
+Di sini buffer upload dipetakan langsung (``BytesIO.getbuffer()`` untuk upload
+kecil, ``mmap`` untuk upload yang sudah di-spool Werkzeug ke disk), magic byte
+dan dimensi dibaca dari header, lalu gambar yang terlalu besar atau bukan
+gambar ditolak sebelum ``cv2.imdecode`` mengalokasikan piksel apa pun.
+"""
+from __future__ import annotations
+
+import io
+import mmap
+import struct
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+_READ_CHUNK = 64 * 1024
+# Marker SOF JPEG (baseline, progressive, lossless, arithmetic) tanpa DHT/JPG/DAC.
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xD8)) | {0x01}  # RSTn + TEM
+
+
+class ImageRejected(ValueError):
+    """Upload ditolak sebelum decode; ``status_code`` dipakai sebagai status HTTP."""
+
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """Tebak format dari magic byte; ``None`` bila bukan gambar yang dikenal."""
+    if header[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if header[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[:2] == b"BM":
+        return "bmp"
+    return None
+
+
+def _jpeg_dimensions(data) -> Optional[Tuple[int, int]]:
+    offset, size = 2, len(data)
+    while offset + 4 <= size:
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # byte pengisi
+            offset += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            offset += 2
+            continue
+        if marker in (0xD9, 0xDA):  # EOI / SOS: tidak ada SOF sebelum data scan
+            return None
+        (length,) = struct.unpack_from(">H", data, offset + 2)
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > size:
+                return None
+            height, width = struct.unpack_from(">HH", data, offset + 5)
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def probe_dimensions(data, image_format: str) -> Optional[Tuple[int, int]]:
+    """``(lebar, tinggi)`` dari header saja, tanpa decode piksel."""
+    try:
+        if image_format == "jpeg":
+            return _jpeg_dimensions(data)
+        if image_format == "png":
+            return struct.unpack_from(">II", data, 16)
+        if image_format == "gif":
+            return struct.unpack_from("<HH", data, 6)
+        if image_format == "bmp":
+            width, height = struct.unpack_from("<ii", data, 18)
+            return width, abs(height)
+        if image_format == "webp":
+            chunk = bytes(data[12:16])
+            if chunk == b"VP8 ":
+                width, height = struct.unpack_from("<HH", data, 26)
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                (bits,) = struct.unpack_from("<I", data, 21)
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                raw = bytes(data[24:30])
+                return int.from_bytes(raw[:3], "little") + 1, int.from_bytes(raw[3:], "little") + 1
+    except struct.error:
+        return None
+    return None
+
+
+@contextmanager
+def _upload_buffer(stream, max_bytes: int) -> Iterator[memoryview]:
+    """Memoryview atas isi upload, sebisa mungkin tanpa menyalin."""
+    raw = getattr(stream, "_file", stream)  # SpooledTemporaryFile -> BytesIO / file sungguhan
+    if isinstance(raw, io.BytesIO):
+        view = raw.getbuffer()
+        try:
+            yield view
+        finally:
+            view.release()
+        return
+
+    fileno = None
+    try:
+        fileno = raw.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        pass
+    if fileno is not None:
+        raw.flush()
+        try:
+            mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except ValueError:  # file kosong tidak bisa di-mmap
+            mapped = None
+        if mapped is not None:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+                mapped.close()
+            return
+
+    # Stream generik: baca ke satu bytearray yang tumbuh per chunk, dibatasi max_bytes.
+    if stream.seekable():
+        stream.seek(0)
+    buffer = bytearray()
+    while len(buffer) <= max_bytes:
+        chunk = stream.read(_READ_CHUNK)
+        if not chunk:
+            break
+        buffer += chunk
+    view = memoryview(buffer)
+    try:
+        yield view
+    finally:
+        view.release()
+
+
+def decode_upload(
+    stream,
+    *,
+    max_bytes: int,
+    max_pixels: int,
+    allowed_formats=("jpeg", "png", "gif", "webp", "bmp"),
+    flags: int = cv2.IMREAD_COLOR,
+) -> np.ndarray:
+    """Validasi header lalu decode upload menjadi ndarray BGR.
+
+    Raises:
+        ImageRejected: file kosong, terlalu besar (413), bukan gambar (415),
+            dimensi melebihi ``max_pixels`` (413), atau gagal di-decode.
+    """
+    with _upload_buffer(stream, max_bytes) as view:
+        size = view.nbytes
+        if size == 0:
+            raise ImageRejected("File kosong atau rusak")
+        if size > max_bytes:
+            raise ImageRejected(
+                f"Ukuran file melebihi batas {max_bytes / (1024 * 1024):.1f} MB", status_code=413
+            )
+
+        image_format = sniff_image_format(bytes(view[:16]))
+        if image_format is None or image_format not in allowed_formats:
+            raise ImageRejected("File bukan gambar yang didukung", status_code=415)
+
+        dimensions = probe_dimensions(view, image_format)
+        if dimensions is not None:
+            width, height = dimensions
+            if width <= 0 or height <= 0:
+                raise ImageRejected("Header gambar tidak valid")
+            if width * height > max_pixels:
+                raise ImageRejected(
+                    f"Resolusi gambar {width}x{height} melebihi batas {max_pixels} piksel",
+                    status_code=413,
+                )
+
+        encoded = np.frombuffer(view, dtype=np.uint8)
+        try:
+            image = cv2.imdecode(encoded, flags)
+        finally:
+            del encoded  # lepaskan ekspor buffer sebelum memoryview/mmap ditutup
+    if image is None:
+        raise ImageRejected("Gagal membaca isi gambar, pastikan format valid")
+    return image
+
+
+def difference_hash(image: np.ndarray) -> int:
+    """dHash 64-bit: bandingkan piksel bertetangga pada versi grayscale 9x8.
+
+    Foto yang sama setelah resize/kompresi ulang menghasilkan hash dengan jarak
+    Hamming kecil (umumnya <= 5 dari 64 bit).
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def file_difference_hash(path: str) -> Optional[int]:
+    """dHash sebuah file gambar; decode memakai skala 1/8 karena hanya butuh 9x8 piksel."""
+    image = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+    return difference_hash(image)
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return bin(left ^ right).count("1")
+
+
+__all__ = [
+    "ImageRejected",
+    "decode_upload",
+    "difference_hash",
+    "file_difference_hash",
+    "hamming_distance",
+    "probe_dimensions",
+    "sniff_image_format",
+]
@@ -0,0 +1,210 @@
+"""Gerbang kualitas foto sebelum pipeline berat (CNN, pyzbar, EasyOCR).
+
+Foto buram, gelap, terlalu kecil, atau tertutup pantulan cahaya tetap
+menghabiskan beberapa detik di pipeline hanya untuk menghasilkan jawaban
+berkeyakinan rendah. :class:`ImageQualityGate` menilai salinan kecil foto
+(sisi terpanjang ``analysis_side`` piksel, beberapa milidetik) dan menolak
+foto yang tidak mungkin terbaca dengan umpan balik yang bisa ditindaklanjuti:
+
+* resolusi - sisi pendek foto asli di bawah ``min_side``;
+* ketajaman - variansi Laplacian di bawah ``min_sharpness``;
+* eksposur - rata-rata kecerahan di luar ``[min_brightness, max_brightness]``
+  atau kontras (simpangan baku) di bawah ``min_contrast``;
+* silau - area jenuh (>= 250) yang *tidak* menyentuh tepi foto melebihi
+  ``max_glare``; latar putih produk menyentuh tepi sehingga tidak dihitung.
+
+Setiap keputusan dicatat di metrik beserta perkiraan waktu pipeline yang
+dihemat (rata-rata bergerak durasi pipeline untuk foto yang lolos).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from instrumentation import REGISTRY, STAGE_LATENCY
+
+QUALITY_DECISIONS = REGISTRY.counter(
+    "image_quality_decisions_total",
+    "Keputusan gerbang kualitas foto per endpoint (pass / reject) dan alasan utama.",
+    labels=("endpoint", "decision", "reason"),
+)
+QUALITY_SAVED_SECONDS = REGISTRY.counter(
+    "image_quality_saved_seconds_total",
+    "Perkiraan detik pipeline yang dihemat karena foto ditolak lebih awal.",
+    labels=("endpoint",),
+)
+
+_SATURATED = 250
+
+
+@dataclass(frozen=True)
+class QualityIssue:
+    code: str
+    message: str
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"code": self.code, "message": self.message}
+
+
+@dataclass
+class QualityReport:
+    passed: bool
+    metrics: Dict[str, float]
+    issues: List[QualityIssue] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def message(self) -> str:
+        return " ".join(issue.message for issue in self.issues)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "passed": self.passed,
+            "metrics": self.metrics,
+            "issues": [issue.to_dict() for issue in self.issues],
+            "elapsed_ms": round(self.elapsed_ms, 2),
+        }
+
+
+def downscale(image: np.ndarray, side: int) -> np.ndarray:
+    """Salinan kecil (sisi terpanjang ``side``); foto besar di-decimate dulu dengan stride agar murah."""
+    longest = max(image.shape[:2])
+    if longest <= side:
+        return image
+    step = longest // (side * 2)
+    if step > 1:
+        image = image[::step, ::step]  # view tanpa salinan; INTER_AREA berikutnya tetap dari >= 2x target
+    scale = side / max(image.shape[:2])
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def interior_glare_fraction(gray: np.ndarray) -> float:
+    """Porsi piksel jenuh pada komponen yang tidak menyentuh tepi gambar."""
+    mask = (gray >= _SATURATED).astype(np.uint8)
+    if not mask.any():
+        return 0.0
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    height, width = gray.shape
+    interior = 0
+    for x, y, w, h, area in stats[1:count]:
+        if x > 0 and y > 0 and x + w < width and y + h < height:
+            interior += int(area)
+    return interior / gray.size
+
+
+class ImageQualityGate:
+    """Penilaian kualitas cepat + pencatatan keputusan.
+
+    Ambang ketajaman berlaku pada skala ``analysis_side``; ubah keduanya bersamaan.
+    ``enabled=False`` membuat :meth:`check` selalu lolos tanpa menganalisis.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        analysis_side: int = 320,
+        min_side: int = 240,
+        min_sharpness: float = 15.0,
+        min_brightness: float = 35.0,
+        max_brightness: float = 235.0,
+        min_contrast: float = 8.0,
+        max_glare: float = 0.2,
+    ) -> None:
+        self.enabled = enabled
+        self.analysis_side = analysis_side
+        self.min_side = min_side
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.min_contrast = min_contrast
+        self.max_glare = max_glare
+        self._lock = threading.Lock()
+        self._pipeline_seconds: Optional[float] = None  # EWMA durasi pipeline foto yang lolos
+
+    def assess(self, image: np.ndarray) -> QualityReport:
+        started = time.perf_counter()
+        height, width = image.shape[:2]
+        with STAGE_LATENCY.time(stage="quality_gate"):
+            small = downscale(image, self.analysis_side)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+            mean, stddev = cv2.meanStdDev(gray)
+            metrics = {
+                "width": width,
+                "height": height,
+                "sharpness": round(float(cv2.Laplacian(gray, cv2.CV_64F).var()), 2),
+                "brightness": round(float(mean[0][0]), 2),
+                "contrast": round(float(stddev[0][0]), 2),
+                "glare": round(interior_glare_fraction(gray), 4),
+            }
+
+        issues: List[QualityIssue] = []
+        if min(height, width) < self.min_side:
+            issues.append(QualityIssue(
+                "resolution",
+                f"Resolusi foto terlalu kecil ({width}x{height}). Ambil foto lebih dekat atau gunakan "
+                f"resolusi kamera minimal {self.min_side} piksel pada sisi terpendek.",
+            ))
+        exposure_ok = False
+        if metrics["brightness"] < self.min_brightness:
+            issues.append(QualityIssue(
+                "dark", "Foto terlalu gelap. Tambah pencahayaan atau nyalakan flash kamera."
+            ))
+        elif metrics["brightness"] > self.max_brightness:
+            issues.append(QualityIssue(
+                "overexposed", "Foto terlalu terang. Hindari cahaya langsung atau matikan flash."
+            ))
+        elif metrics["contrast"] < self.min_contrast:
+            issues.append(QualityIssue(
+                "low_contrast", "Kontras foto terlalu rendah. Pastikan label part terlihat jelas dan tidak tertutup."
+            ))
+        else:
+            exposure_ok = True
+        if metrics["sharpness"] < self.min_sharpness and exposure_ok:
+            # foto gelap/terang/datar otomatis bernilai ketajaman rendah; cukup laporkan masalah cahayanya
+            issues.append(QualityIssue(
+                "blurry", "Foto buram. Tahan kamera tetap stabil dan ketuk layar untuk fokus pada label part."
+            ))
+        if metrics["glare"] > self.max_glare:
+            issues.append(QualityIssue(
+                "glare", "Pantulan cahaya menutupi label. Ubah sudut kamera agar label tidak silau."
+            ))
+        return QualityReport(not issues, metrics, issues, (time.perf_counter() - started) * 1000)
+
+    def check(self, image: np.ndarray, endpoint: str) -> QualityReport:
+        """:meth:`assess` + catat keputusan dan waktu yang dihemat di metrik."""
+        if not self.enabled:
+            return QualityReport(True, {})
+        report = self.assess(image)
+        if report.passed:
+            QUALITY_DECISIONS.inc(endpoint=endpoint, decision="pass", reason="ok")
+            return report
+        QUALITY_DECISIONS.inc(endpoint=endpoint, decision="reject", reason=report.issues[0].code)
+        saved = (self._pipeline_seconds or 0.0) - report.elapsed_ms / 1000
+        if saved > 0:
+            QUALITY_SAVED_SECONDS.inc(saved, endpoint=endpoint)
+        return report
+
+    def observe_pipeline(self, seconds: float) -> None:
+        """Catat durasi pipeline penuh untuk foto yang lolos (dasar perkiraan waktu yang dihemat)."""
+        with self._lock:
+            if self._pipeline_seconds is None:
+                self._pipeline_seconds = seconds
+            else:
+                self._pipeline_seconds = 0.9 * self._pipeline_seconds + 0.1 * seconds
+
+
+__all__ = [
+    "ImageQualityGate",
+    "QUALITY_DECISIONS",
+    "QUALITY_SAVED_SECONDS",
+    "QualityIssue",
+    "QualityReport",
+    "downscale",
+    "interior_glare_fraction",
+]
@@ -0,0 +1,443 @@
+"""Instrumentasi ringan (counter, gauge, histogram) dengan eksposisi format Prometheus.
+
+Seluruh metrik terdaftar di ``REGISTRY``. Saat ``METRICS_ENABLED`` tidak aktif
+(default), setiap ``inc``/``observe``/``time`` langsung kembali tanpa mengunci
+apa pun sehingga overhead di jalur request praktis nol.
+
+Di server pre-fork tiap worker punya angkanya sendiri. Dengan
+``METRICS_MULTIPROC_DIR`` setiap worker menulis snapshot ke
+``<dir>/metrics_<pid>.json`` (berkala dan saat keluar), dan ``render()`` di
+worker mana pun menjumlahkan semua snapshot: counter/histogram worker yang
+sudah mati tetap dihitung, gauge hanya dari worker yang masih hidup.
+Direktori itu harus dikosongkan saat server start (lihat ``gunicorn.conf.py``).
+
+Contoh::
+
+    from instrumentation import STAGE_LATENCY
+
+    with STAGE_LATENCY.time(stage="ocr"):
+        codes = reader.readtext(...)
+"""
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_NULL_CONTEXT = nullcontext()
+_local = threading.local()
+_SNAPSHOT_PREFIX = "metrics_"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """Kumpulan metrik + saklar global aktif/nonaktif.
+
+    Args:
+        enabled: saklar pencatatan.
+        multiprocess_dir: folder snapshot per proses; ``None`` = angka proses ini saja.
+        flush_interval: detik antar penulisan snapshot oleh thread latar.
+    """
+
+    def __init__(self, enabled: bool = False, multiprocess_dir: Optional[str] = None, flush_interval: float = 5.0) -> None:
+        self.enabled = enabled
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None
+
+    def _register(self, metric: "_Metric") -> "_Metric":
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> "Counter":
+        return self._register(Counter(self, name, documentation, labels))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> "Gauge":
+        return self._register(Gauge(self, name, documentation, labels))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> "Histogram":
+        return self._register(Histogram(self, name, documentation, labels, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """Teks eksposisi Prometheus (``text/plain; version=0.0.4``)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        if self.multiprocess_dir:
+            metrics = self._merged(metrics)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    # ------------------------------------------------------------------
+    # Mode multiproses
+    # ------------------------------------------------------------------
+    def start_flusher(self) -> None:
+        """Mulai thread penulis snapshot di proses ini (panggil di setiap worker setelah fork)."""
+        if not (self.enabled and self.multiprocess_dir) or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        atexit.register(self.flush)
+        threading.Thread(target=self._flush_loop, args=(os.getpid(),), name="metrics-flush", daemon=True).start()
+
+    def _flush_loop(self, pid: int) -> None:
+        while self._flusher_pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """Tulis snapshot proses ini secara atomik."""
+        if not self.multiprocess_dir:
+            return
+        with self._lock:
+            metrics = list(self._metrics.values())
+        data = {metric.name: metric.export() for metric in metrics}
+        path = os.path.join(self.multiprocess_dir, f"{_SNAPSHOT_PREFIX}{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(data, handle)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # snapshot berikutnya mencoba lagi
+
+    def _merged(self, metrics: List["_Metric"]) -> List["_Metric"]:
+        self.flush()
+        merged = [metric.empty_copy() for metric in metrics]
+        try:
+            names = os.listdir(self.multiprocess_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if not (name.startswith(_SNAPSHOT_PREFIX) and name.endswith(".json")):
+                continue
+            try:
+                pid = int(name[len(_SNAPSHOT_PREFIX):-len(".json")])
+                with open(os.path.join(self.multiprocess_dir, name), encoding="utf-8") as handle:
+                    data = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            alive = pid == os.getpid() or _pid_alive(pid)
+            for metric in merged:
+                if metric.name in data and (alive or metric.kind != "gauge"):
+                    metric.absorb(data[metric.name])
+        return merged
+
+    def reset(self) -> None:
+        """Kosongkan seluruh nilai (dipakai setelah fork agar worker tidak mewarisi angka induk)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str, labels: Sequence[str]) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def empty_copy(self) -> "_Metric":
+        """Metrik kosong sejenis (di luar registry) untuk menampung hasil penjumlahan."""
+        return type(self)(MetricsRegistry(enabled=True), self.name, self.documentation, self.label_names)
+
+    def render(self) -> List[str]:  # pragma: no cover - diimplementasikan subclass
+        raise NotImplementedError
+
+    def reset(self) -> None:  # pragma: no cover - diimplementasikan subclass
+        raise NotImplementedError
+
+    def export(self) -> List[object]:  # pragma: no cover - diimplementasikan subclass
+        raise NotImplementedError
+
+    def absorb(self, exported: List[object]) -> None:  # pragma: no cover - diimplementasikan subclass
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def export(self) -> List[object]:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def absorb(self, exported: List[object]) -> None:
+        with self._lock:
+            for key, value in exported:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def track_inprogress(self, **labels: str):
+        if not self.registry.enabled:
+            return _NULL_CONTEXT
+        return self._track(labels)
+
+    @contextmanager
+    def _track(self, labels: Dict[str, str]) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labels, buckets: Sequence[float]) -> None:
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] += value
+
+    def time(self, **labels: str):
+        """Context manager yang mencatat durasi blok.
+
+        No-op bila metrik nonaktif dan tidak ada ``record_stages()`` aktif di thread ini.
+        """
+        if not self.registry.enabled and getattr(_local, "stages", None) is None:
+            return _NULL_CONTEXT
+        return self._time(labels)
+
+    @contextmanager
+    def _time(self, labels: Dict[str, str]) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(elapsed, **labels)
+            stages = getattr(_local, "stages", None)
+            if stages is not None:
+                key = labels.get("stage") or self.name
+                stages[key] = stages.get(key, 0.0) + elapsed
+
+    def snapshot(self, **labels: str) -> Tuple[int, float]:
+        """``(count, sum)`` untuk kombinasi label tertentu."""
+        key = self._key(labels)
+        with self._lock:
+            return sum(self._counts.get(key, ())), self._sums.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = self._header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+
+    def empty_copy(self) -> "Histogram":
+        return Histogram(MetricsRegistry(enabled=True), self.name, self.documentation, self.label_names, self.buckets)
+
+    def export(self) -> List[object]:
+        with self._lock:
+            return [[list(key), list(counts), self._sums[key]] for key, counts in self._counts.items()]
+
+    def absorb(self, exported: List[object]) -> None:
+        with self._lock:
+            for key, counts, total in exported:
+                key = tuple(key)
+                current = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+                if len(current) != len(counts):
+                    continue  # snapshot dari konfigurasi bucket lama
+                self._counts[key] = [a + b for a, b in zip(current, counts)]
+                self._sums[key] = self._sums.get(key, 0.0) + total
+
+
+REGISTRY = MetricsRegistry(
+    enabled=os.getenv("METRICS_ENABLED", "0") == "1",
+    multiprocess_dir=os.getenv("METRICS_MULTIPROC_DIR") or None,
+    flush_interval=float(os.getenv("METRICS_FLUSH_INTERVAL", 5)),
+)
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "verification_stage_seconds",
+    "Durasi tiap tahap pipeline verifikasi gambar.",
+    labels=("stage",),
+)
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Durasi total request per endpoint.",
+    labels=("endpoint",),
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight",
+    "Jumlah request yang sedang diproses per endpoint.",
+    labels=("endpoint",),
+)
+VERIFICATION_OUTCOMES = REGISTRY.counter(
+    "verification_outcomes_total",
+    "Jumlah hasil verifikasi per endpoint dan status (ASLI / TIDAK VALID / ...).",
+    labels=("endpoint", "status"),
+)
+
+
+@contextmanager
+def record_stages() -> Iterator[Dict[str, float]]:
+    """Kumpulkan durasi per tahap (detik) untuk thread ini, terlepas dari ``METRICS_ENABLED``."""
+    previous = getattr(_local, "stages", None)
+    stages: Dict[str, float] = {}
+    _local.stages = stages
+    try:
+        yield stages
+    finally:
+        _local.stages = previous
+
+
+def instrument_endpoint(endpoint: str) -> Callable:
+    """Decorator view Flask: gauge in-flight + histogram durasi request."""
+
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return view(*args, **kwargs)
+            with IN_FLIGHT.track_inprogress(endpoint=endpoint), REQUEST_LATENCY.time(endpoint=endpoint):
+                return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "REGISTRY",
+    "STAGE_LATENCY",
+    "REQUEST_LATENCY",
+    "IN_FLIGHT",
+    "VERIFICATION_OUTCOMES",
+    "instrument_endpoint",
+    "record_stages",
+]
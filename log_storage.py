@@ -0,0 +1,594 @@
+"""Penyimpanan log verifikasi yang dipartisi per bulan dan dibatasi retensinya.
+
+Tabel log (``verifikasi_log`` di SQLite, ``verification_logs`` di MySQL) tidak
+lagi tumbuh tanpa batas:
+
+* **User agent di-dictionary-encode** ke tabel terpisah; baris log hanya
+  menyimpan ``user_agent_id`` (string penuh disimpan sekali saja).
+* **SQLite**: baris yang lebih tua dari ``hot_months`` dipindah ke tabel
+  rollover bulanan ``verifikasi_log_pYYYYMM`` sehingga tabel panas tetap kecil.
+* **MySQL**: bila tabel sudah dipartisi (lihat
+  ``admin_backend/migrations/verification_logs_partitioning.sql``), partisi
+  bulan depan dibuat otomatis dan partisi kedaluwarsa di-drop. Tanpa partisi,
+  baris kedaluwarsa dihapus bertahap per bulan.
+* Sebelum dibuang, data di luar ``retention_months`` di-rollup ke tabel agregat
+  bulanan (per kode part, metode, status) sehingga tren jangka panjang tetap ada.
+
+Pemeliharaan berjalan otomatis di thread latar (dipicu penulis log paling
+sering sekali per ``interval`` detik) atau manual via ``flask maintain-logs``.
+Antar proses (worker gunicorn) hanya satu yang menjalankannya sekaligus:
+``GET_LOCK`` di MySQL, baris lease ``log_maintenance_lease`` di SQLite.
+
+:meth:`VerificationLogStorage.iter_logs` membaca rentang waktu panjang secara
+streaming (server-side cursor MySQL / cursor SQLite per tabel arsip), dan
+:func:`encode_csv` / :func:`encode_ndjson` mengubahnya menjadi potongan teks
+untuk respons HTTP dengan memori konstan.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import re
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SQLITE_ARCHIVE_PREFIX = "verifikasi_log_p"
+MAINTENANCE_LOCK_NAME = "verification_log_maintenance"
+MAINTENANCE_LEASE_SECONDS = 600
+_ARCHIVE_NAME = re.compile(r"^(?:verifikasi_log_)?p(\d{4})(\d{2})$")
+
+EXPORT_COLUMNS: Tuple[str, ...] = (
+    "log_id",
+    "waktu_cek",
+    "kode_part",
+    "status",
+    "metode",
+    "ip_address",
+    "user_agent",
+)
+
+SQLITE_STORAGE_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS user_agent_dict (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ua_hash TEXT NOT NULL UNIQUE,
+        user_agent TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS verifikasi_log_bulanan (
+        bulan TEXT NOT NULL,
+        kode_part TEXT NOT NULL,
+        metode TEXT NOT NULL,
+        status TEXT NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bulan, kode_part, metode, status)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS log_maintenance_lease (
+        name TEXT PRIMARY KEY,
+        holder TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """,
+)
+
+
+def _shift_month(year: int, month: int, delta: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def _month_start(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}-01 00:00:00"
+
+
+def _export_row(row) -> Dict[str, object]:
+    item = {column: row[column] for column in EXPORT_COLUMNS}
+    if isinstance(item["waktu_cek"], datetime):
+        item["waktu_cek"] = item["waktu_cek"].strftime("%Y-%m-%d %H:%M:%S")
+    return item
+
+
+def encode_csv(rows: Iterable[Dict[str, object]], chunk_rows: int = 500) -> Iterator[str]:
+    """Potongan CSV (header dulu) berisi paling banyak ``chunk_rows`` baris."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def encode_ndjson(rows: Iterable[Dict[str, object]], chunk_rows: int = 500) -> Iterator[str]:
+    """Potongan NDJSON (satu objek JSON per baris) berisi paling banyak ``chunk_rows`` baris."""
+    lines: List[str] = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+class VerificationLogStorage:
+    """Encoding user agent + partisi/retensi untuk tabel log verifikasi.
+
+    Args:
+        backend: ``"mysql"`` atau ``"sqlite"``.
+        connect: factory koneksi (``get_db_connection`` milik app).
+        hot_months: jumlah bulan terakhir (termasuk bulan berjalan) yang tetap di tabel panas.
+        retention_months: umur maksimum data mentah; lebih tua dari ini hanya tersisa agregat.
+        interval: jeda minimum antar pemeliharaan otomatis (detik).
+        ua_cache_size: jumlah user agent yang id-nya di-cache di memori.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        connect: Callable[[], object],
+        *,
+        hot_months: int = 3,
+        retention_months: int = 24,
+        interval: float = 3600.0,
+        ua_cache_size: int = 1024,
+    ) -> None:
+        self.backend = backend
+        self.connect = connect
+        self.hot_months = max(1, hot_months)
+        self.retention_months = max(self.hot_months, retention_months)
+        self.interval = interval
+        self.ua_cache_size = ua_cache_size
+        self._ua_cache: "OrderedDict[str, int]" = OrderedDict()
+        self._ua_lock = threading.Lock()
+        self._maintenance_lock = threading.Lock()
+        self._last_run: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Dictionary encoding user agent
+    # ------------------------------------------------------------------
+    def user_agent_id(self, cursor, user_agent: Optional[str]) -> Optional[int]:
+        """Kembalikan id dictionary untuk user agent (dibuat bila belum ada).
+
+        Dipanggil dengan cursor transaksi insert log agar satu commit saja.
+        """
+        if not user_agent:
+            return None
+        ua_hash = hashlib.sha1(user_agent.encode("utf-8", errors="ignore")).hexdigest()
+        with self._ua_lock:
+            cached = self._ua_cache.get(ua_hash)
+            if cached is not None:
+                self._ua_cache.move_to_end(ua_hash)
+                return cached
+
+        if self.backend == "mysql":
+            cursor.execute(
+                "INSERT IGNORE INTO verification_user_agents (ua_hash, user_agent) VALUES (%s, %s)",
+                (ua_hash, user_agent[:512]),
+            )
+            cursor.execute("SELECT id FROM verification_user_agents WHERE ua_hash = %s", (ua_hash,))
+        else:
+            cursor.execute(
+                "INSERT OR IGNORE INTO user_agent_dict (ua_hash, user_agent) VALUES (?, ?)",
+                (ua_hash, user_agent),
+            )
+            cursor.execute("SELECT id FROM user_agent_dict WHERE ua_hash = ?", (ua_hash,))
+        row = cursor.fetchone()
+        ua_id = int(row["id"])
+
+        with self._ua_lock:
+            self._ua_cache[ua_hash] = ua_id
+            if len(self._ua_cache) > self.ua_cache_size:
+                self._ua_cache.popitem(last=False)
+        return ua_id
+
+    # ------------------------------------------------------------------
+    # Pemeliharaan partisi & retensi
+    # ------------------------------------------------------------------
+    def maybe_run_maintenance(self) -> None:
+        """Jadwalkan pemeliharaan di thread latar bila interval sudah lewat."""
+        if self.interval <= 0:
+            return
+        if self._last_run is not None and time.monotonic() - self._last_run < self.interval:
+            return
+        if not self._maintenance_lock.acquire(blocking=False):
+            return
+        self._last_run = time.monotonic()
+        thread = threading.Thread(target=self._run_locked, name="log-maintenance", daemon=True)
+        thread.start()
+
+    def _run_locked(self) -> None:
+        try:
+            self.run_maintenance()
+        except Exception:  # pragma: no cover - hanya dicatat, jangan ganggu request
+            logger.exception("Pemeliharaan log verifikasi gagal")
+        finally:
+            self._maintenance_lock.release()
+
+    def run_maintenance(self, today: Optional[date] = None) -> Dict[str, List[str]]:
+        """Jalankan rollover/rollup/retensi sekarang. Mengembalikan ringkasan aksi."""
+        today = today or date.today()
+        if self.backend == "mysql":
+            return self._maintain_mysql(today)
+        return self._maintain_sqlite(today)
+
+    def _cutoffs(self, today: date) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        hot = _shift_month(today.year, today.month, -(self.hot_months - 1))
+        retention = _shift_month(today.year, today.month, -(self.retention_months - 1))
+        return hot, retention
+
+    # -- SQLite ---------------------------------------------------------
+    def ensure_sqlite_tables(self, cursor) -> None:
+        for statement in SQLITE_STORAGE_DDL:
+            cursor.execute(statement)
+
+    def sqlite_archive_tables(self, cursor) -> List[Tuple[str, int, int]]:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?",
+            (SQLITE_ARCHIVE_PREFIX + "%",),
+        )
+        tables = []
+        for row in cursor.fetchall():
+            match = _ARCHIVE_NAME.match(row["name"])
+            if match:
+                tables.append((row["name"], int(match.group(1)), int(match.group(2))))
+        return sorted(tables, key=lambda item: (item[1], item[2]))
+
+    def sqlite_log_tables(
+        self,
+        cursor,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        *,
+        newest_first: bool = False,
+    ) -> List[str]:
+        """Tabel arsip bulanan yang beririsan dengan ``[start, end)`` lalu tabel panas ``verifikasi_log``.
+
+        Bulan antar tabel tidak tumpang tindih dan tabel panas selalu berisi data
+        terbaru, jadi menggabungkan hasil per tabel menurut urutan ini menjaga urutan waktu.
+        """
+        tables = [
+            table
+            for table, year, month in self.sqlite_archive_tables(cursor)
+            if (not end or _month_start(year, month) < end)
+            and (not start or _month_start(*_shift_month(year, month, 1)) > start)
+        ]
+        tables.append("verifikasi_log")
+        return tables[::-1] if newest_first else tables
+
+    def _maintain_sqlite(self, today: date) -> Dict[str, List[str]]:
+        (hot_y, hot_m), (ret_y, ret_m) = self._cutoffs(today)
+        hot_cutoff = _month_start(hot_y, hot_m)
+        summary: Dict[str, List[str]] = {"archived": [], "rolled_up": []}
+
+        conn = self.connect()
+        holder = None
+        try:
+            cursor = conn.cursor()
+            self.ensure_sqlite_tables(cursor)
+            holder = self._acquire_sqlite_lease(conn)
+            if holder is None:
+                logger.info("Pemeliharaan log dilewati: sedang dijalankan proses lain")
+                return summary
+            cursor.execute(
+                "SELECT DISTINCT substr(waktu_cek, 1, 7) AS bulan FROM verifikasi_log WHERE waktu_cek < ?",
+                (hot_cutoff,),
+            )
+            months = [row["bulan"] for row in cursor.fetchall() if row["bulan"]]
+            for bulan in months:
+                year, month = int(bulan[:4]), int(bulan[5:7])
+                table = f"{SQLITE_ARCHIVE_PREFIX}{year:04d}{month:02d}"
+                start = _month_start(year, month)
+                end = _month_start(*_shift_month(year, month, 1))
+                cursor.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        id_log INTEGER PRIMARY KEY,
+                        kode_part TEXT NOT NULL,
+                        status TEXT,
+                        ip_address TEXT,
+                        user_agent TEXT,
+                        user_agent_id INTEGER,
+                        metode TEXT,
+                        waktu_cek TIMESTAMP
+                    )
+                    """
+                )
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_waktu ON {table} (waktu_cek, id_log)")
+                cursor.execute(
+                    f"""
+                    INSERT OR IGNORE INTO {table}
+                        (id_log, kode_part, status, ip_address, user_agent, user_agent_id, metode, waktu_cek)
+                    SELECT id_log, kode_part, status, ip_address, user_agent, user_agent_id, metode, waktu_cek
+                    FROM verifikasi_log WHERE waktu_cek >= ? AND waktu_cek < ?
+                    """,
+                    (start, end),
+                )
+                cursor.execute(
+                    "DELETE FROM verifikasi_log WHERE waktu_cek >= ? AND waktu_cek < ?",
+                    (start, end),
+                )
+                conn.commit()
+                summary["archived"].append(table)
+
+            for table, year, month in self.sqlite_archive_tables(cursor):
+                if (year, month) >= (ret_y, ret_m):
+                    continue
+                cursor.execute(
+                    f"""
+                    INSERT INTO verifikasi_log_bulanan (bulan, kode_part, metode, status, total)
+                    SELECT ?, kode_part, COALESCE(metode, 'QR'), COALESCE(status, ''), COUNT(*)
+                    FROM {table}
+                    WHERE true
+                    GROUP BY kode_part, COALESCE(metode, 'QR'), COALESCE(status, '')
+                    ON CONFLICT(bulan, kode_part, metode, status) DO UPDATE SET
+                        total = total + excluded.total
+                    """,
+                    (f"{year:04d}-{month:02d}",),
+                )
+                cursor.execute(f"DROP TABLE {table}")
+                conn.commit()
+                summary["rolled_up"].append(table)
+        finally:
+            if holder is not None:
+                conn.rollback()
+                conn.execute(
+                    "DELETE FROM log_maintenance_lease WHERE name = ? AND holder = ?",
+                    (MAINTENANCE_LOCK_NAME, holder),
+                )
+                conn.commit()
+            conn.close()
+        return summary
+
+    @staticmethod
+    def _acquire_sqlite_lease(conn) -> Optional[str]:
+        """Ambil lease pemeliharaan lintas proses; ``None`` bila masih dipegang proses lain."""
+        holder = f"{os.getpid()}:{uuid.uuid4().hex}"
+        now = time.time()
+        cursor = conn.execute(
+            """
+            INSERT INTO log_maintenance_lease (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE log_maintenance_lease.expires_at < ?
+            """,
+            (MAINTENANCE_LOCK_NAME, holder, now + MAINTENANCE_LEASE_SECONDS, now),
+        )
+        acquired = cursor.rowcount == 1
+        conn.commit()
+        return holder if acquired else None
+
+    # -- MySQL ----------------------------------------------------------
+    def _maintain_mysql(self, today: date) -> Dict[str, List[str]]:
+        _, (ret_y, ret_m) = self._cutoffs(today)
+        summary: Dict[str, List[str]] = {"created": [], "rolled_up": []}
+
+        conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, 0) AS acquired", (MAINTENANCE_LOCK_NAME,))
+                if not (cursor.fetchone() or {}).get("acquired"):
+                    logger.info("Pemeliharaan log dilewati: sedang dijalankan proses lain")
+                    return summary
+            try:
+                return self._maintain_mysql_locked(conn, today, ret_y, ret_m, summary)
+            finally:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (MAINTENANCE_LOCK_NAME,))
+        finally:
+            conn.close()
+
+    def _maintain_mysql_locked(
+        self, conn, today: date, ret_y: int, ret_m: int, summary: Dict[str, List[str]]
+    ) -> Dict[str, List[str]]:
+        """Isi :meth:`_maintain_mysql` setelah ``GET_LOCK`` didapat (satu proses sekaligus)."""
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'verification_logs'
+                  AND PARTITION_NAME IS NOT NULL
+                """
+            )
+            partitions = [row["PARTITION_NAME"] for row in cursor.fetchall()]
+
+        if not partitions:
+            summary["rolled_up"] = self._purge_mysql_unpartitioned(conn, ret_y, ret_m)
+            return summary
+
+        existing = set(partitions)
+        with conn.cursor() as cursor:
+            for delta in range(0, 3):
+                year, month = _shift_month(today.year, today.month, delta)
+                name = f"p{year:04d}{month:02d}"
+                if name in existing or "pmax" not in existing:
+                    continue
+                boundary = _month_start(*_shift_month(year, month, 1))
+                cursor.execute(
+                    f"""
+                    ALTER TABLE verification_logs REORGANIZE PARTITION pmax INTO (
+                        PARTITION {name} VALUES LESS THAN (UNIX_TIMESTAMP('{boundary}')),
+                        PARTITION pmax VALUES LESS THAN MAXVALUE
+                    )
+                    """
+                )
+                existing.add(name)
+                summary["created"].append(name)
+
+            for name in partitions:
+                match = _ARCHIVE_NAME.match(name)
+                if not match or (int(match.group(1)), int(match.group(2))) >= (ret_y, ret_m):
+                    continue
+                bulan = f"{match.group(1)}-{match.group(2)}"
+                cursor.execute(
+                    f"""
+                    INSERT INTO verification_log_monthly (bulan, kode_part, metode, status, total)
+                    SELECT %s, kode_part, metode, status, COUNT(*)
+                    FROM verification_logs PARTITION ({name})
+                    GROUP BY kode_part, metode, status
+                    ON DUPLICATE KEY UPDATE total = VALUES(total)
+                    """,
+                    (bulan,),
+                )
+                # Partisi = satu bulan penuh, jadi rollup-nya menimpa (bukan menambah): bila DROP gagal
+                # atau proses mati sebelum DROP, pengulangan menghasilkan angka yang sama.
+                conn.commit()
+                cursor.execute(f"ALTER TABLE verification_logs DROP PARTITION {name}")
+                summary["rolled_up"].append(name)
+        conn.commit()
+        return summary
+
+    def _purge_mysql_unpartitioned(self, conn, ret_y: int, ret_m: int) -> List[str]:
+        cutoff = _month_start(ret_y, ret_m)
+        purged = []
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT DATE_FORMAT(created_at, '%%Y-%%m') AS bulan FROM verification_logs WHERE created_at < %s",
+                (cutoff,),
+            )
+            months = [row["bulan"] for row in cursor.fetchall() if row["bulan"]]
+            for bulan in months:
+                year, month = int(bulan[:4]), int(bulan[5:7])
+                start = _month_start(year, month)
+                end = _month_start(*_shift_month(year, month, 1))
+                cursor.execute(
+                    """
+                    INSERT INTO verification_log_monthly (bulan, kode_part, metode, status, total)
+                    SELECT %s, kode_part, metode, status, COUNT(*)
+                    FROM verification_logs
+                    WHERE created_at >= %s AND created_at < %s
+                    GROUP BY kode_part, metode, status
+                    ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+                    """,
+                    (bulan, start, end),
+                )
+                # Rollup dan hapus dalam satu transaksi supaya pengulangan tidak menghitung ganda.
+                cursor.execute(
+                    "DELETE FROM verification_logs WHERE created_at >= %s AND created_at < %s",
+                    (start, end),
+                )
+                conn.commit()
+                purged.append(f"p{year:04d}{month:02d}")
+        return purged
+
+    # ------------------------------------------------------------------
+    # Ekspor streaming
+    # ------------------------------------------------------------------
+    def iter_logs(
+        self,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        *,
+        methods: Optional[Sequence[str]] = None,
+        statuses: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict[str, object]]:
+        """Baris log pada ``[start, end)`` (``'YYYY-MM-DD HH:MM:SS'``) urut waktu naik.
+
+        Hasil tidak pernah ditampung utuh: MySQL memakai ``SSDictCursor``
+        (unbuffered) dan dibaca per ``batch_size`` baris, SQLite mengiterasi
+        cursor tabel arsip bulanan yang beririsan dengan rentang lalu tabel panas.
+        User agent di-decode dari tabel dictionary.
+        """
+        if self.backend == "mysql":
+            yield from self._iter_logs_mysql(start, end, methods, statuses, batch_size)
+        else:
+            yield from self._iter_logs_sqlite(start, end, methods, statuses)
+
+    @staticmethod
+    def _export_filters(placeholder, time_col, start, end, methods, statuses) -> Tuple[str, List[object]]:
+        conditions: List[str] = []
+        params: List[object] = []
+        if start:
+            conditions.append(f"l.{time_col} >= {placeholder}")
+            params.append(start)
+        if end:
+            conditions.append(f"l.{time_col} < {placeholder}")
+            params.append(end)
+        if methods:
+            conditions.append(f"COALESCE(l.metode, 'QR') IN ({', '.join(placeholder for _ in methods)})")
+            params.extend(methods)
+        if statuses:
+            conditions.append(f"l.status IN ({', '.join(placeholder for _ in statuses)})")
+            params.extend(statuses)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def _iter_logs_mysql(self, start, end, methods, statuses, batch_size) -> Iterator[Dict[str, object]]:
+        from pymysql.cursors import SSDictCursor
+
+        where, params = self._export_filters("%s", "created_at", start, end, methods, statuses)
+        conn = self.connect()
+        try:
+            cursor = conn.cursor(SSDictCursor)
+            cursor.execute(
+                f"""
+                SELECT l.id AS log_id, l.created_at AS waktu_cek, l.kode_part, l.status,
+                       COALESCE(l.metode, 'QR') AS metode, l.ip_address,
+                       COALESCE(ua.user_agent, l.user_agent) AS user_agent
+                FROM verification_logs l
+                LEFT JOIN verification_user_agents ua ON ua.id = l.user_agent_id
+                {where}
+                ORDER BY l.created_at, l.id
+                """,
+                tuple(params),
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _export_row(row)
+        finally:
+            # Tanpa cursor.close(): pada SSCursor itu akan membaca sisa hasil bila klien berhenti di tengah.
+            conn.close()
+
+    def _iter_logs_sqlite(self, start, end, methods, statuses) -> Iterator[Dict[str, object]]:
+        where, params = self._export_filters("?", "waktu_cek", start, end, methods, statuses)
+        conn = self.connect()
+        try:
+            tables = self.sqlite_log_tables(conn.cursor(), start, end)
+            for table in tables:
+                cursor = conn.execute(
+                    f"""
+                    SELECT l.id_log AS log_id, l.waktu_cek, l.kode_part, l.status,
+                           COALESCE(l.metode, 'QR') AS metode, l.ip_address,
+                           COALESCE(ua.user_agent, l.user_agent) AS user_agent
+                    FROM {table} l
+                    LEFT JOIN user_agent_dict ua ON ua.id = l.user_agent_id
+                    {where}
+                    ORDER BY l.waktu_cek, l.id_log
+                    """,
+                    tuple(params),
+                )
+                for row in cursor:
+                    yield _export_row(row)
+        finally:
+            conn.close()
+
+
+__all__ = [
+    "EXPORT_COLUMNS",
+    "SQLITE_ARCHIVE_PREFIX",
+    "SQLITE_STORAGE_DDL",
+    "VerificationLogStorage",
+    "encode_csv",
+    "encode_ndjson",
+]
@@ -0,0 +1,281 @@
+"""Deteksi banyak sparepart dalam satu foto (bounding box sungguhan).
+
+``SparePartDetector.detect`` mengklasifikasi seluruh frame sehingga foto berisi
+beberapa part harus di-crop manual. Modul ini menyediakan tahap lokalisasi:
+
+* model ONNX bergaya YOLO (``[1, N, 5+C]`` v5 atau ``[1, 4+C, N]`` v8) atau
+  SSD (``DetectionOutput`` ``[1, 1, N, 7]``) dijalankan lewat OpenCV DNN;
+* keluaran di-decode ke koordinat gambar asli, disaring skor, lalu NMS
+  per kelas secara vektor (NumPy);
+* tanpa model, proposal region diambil dari kontur tepi (fallback heuristik,
+  sejalan dengan fallback CNN) agar endpoint tetap bisa dipakai.
+
+Klasifikasi ASLI/PALSU per box tetap dilakukan ``SparePartDetector``.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from instrumentation import STAGE_LATENCY
+
+OUTPUT_FORMATS = ("yolo", "ssd")
+_PRE_NMS_TOP_K = 300
+
+
+@dataclass
+class ObjectBox:
+    """Satu region hasil lokalisasi, ``bbox`` = ``(x, y, w, h)`` piksel gambar asli."""
+
+    bbox: Tuple[int, int, int, int]
+    score: float
+    class_id: int
+    class_name: str
+
+    def to_dict(self) -> dict:
+        return {
+            "bbox": [int(value) for value in self.bbox],
+            "score": round(float(self.score), 4),
+            "class_id": int(self.class_id),
+            "class_name": self.class_name,
+        }
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """IoU satu box ``[x1, y1, x2, y2]`` terhadap ``[n, 4]`` box sekaligus."""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def non_max_suppression(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    iou_threshold: float = 0.45,
+    class_ids: Optional[np.ndarray] = None,
+    max_detections: int = 100,
+) -> np.ndarray:
+    """Greedy NMS; mengembalikan indeks box yang dipertahankan (urut skor turun).
+
+    Bila ``class_ids`` diberikan, box digeser per kelas sehingga box beda kelas
+    tidak saling menekan (satu pass untuk semua kelas).
+    """
+    if not len(boxes):
+        return np.zeros(0, dtype=np.int64)
+    boxes = np.asarray(boxes, dtype=np.float32)
+    if class_ids is not None:
+        offset = (boxes.max() + 1.0) * np.asarray(class_ids, dtype=np.float32)[:, None]
+        boxes = boxes + offset
+    order = np.argsort(-np.asarray(scores), kind="stable")
+    keep: List[int] = []
+    while len(order) and len(keep) < max_detections:
+        current = order[0]
+        keep.append(int(current))
+        if len(order) == 1:
+            break
+        rest = order[1:]
+        order = rest[box_iou(boxes[current], boxes[rest]) <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def letterbox(image: np.ndarray, size: Tuple[int, int]) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize dengan rasio tetap + padding abu-abu; kembalikan ``(gambar, skala, (pad_x, pad_y))``."""
+    width, height = size
+    h, w = image.shape[:2]
+    scale = min(width / w, height / h)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (width - new_w) // 2, (height - new_h) // 2
+    canvas = np.full((height, width, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+    return canvas, scale, (pad_x, pad_y)
+
+
+def decode_yolo(
+    output: np.ndarray,
+    num_classes: Optional[int] = None,
+    score_threshold: float = 0.35,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Decode keluaran YOLO ke ``(box xyxy ruang input, skor, kelas)``.
+
+    Layout v8 (``[1, 4+C, N]``) otomatis di-transpose dan tidak pernah punya
+    kolom objectness. Layout v5 (``[1, N, 5+C]``) memakai objectness bila jumlah
+    kolom = ``5 + num_classes`` atau ``num_classes`` tidak diketahui.
+    """
+    predictions = np.squeeze(np.asarray(output, dtype=np.float32), axis=0)
+    transposed = predictions.shape[0] < predictions.shape[1]
+    if transposed:
+        predictions = predictions.T
+    columns = predictions.shape[1]
+    has_objectness = not transposed and (num_classes is None or columns == 5 + num_classes)
+    class_scores = predictions[:, 5:] if has_objectness else predictions[:, 4:]
+    if has_objectness:
+        class_scores = class_scores * predictions[:, 4:5]
+    if class_scores.shape[1] == 0:  # model satu kelas tanpa kolom kelas
+        class_scores = predictions[:, 4:5]
+    class_ids = np.argmax(class_scores, axis=1)
+    scores = class_scores[np.arange(len(class_ids)), class_ids]
+    mask = scores >= score_threshold
+    cx, cy, w, h = (predictions[mask, i] for i in range(4))
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return boxes, scores[mask], class_ids[mask]
+
+
+def decode_ssd(
+    output: np.ndarray,
+    image_size: Tuple[int, int],
+    score_threshold: float = 0.35,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Decode ``DetectionOutput`` SSD ``[1, 1, N, 7]`` (koordinat ternormalisasi) ke piksel gambar."""
+    detections = np.asarray(output, dtype=np.float32).reshape(-1, 7)
+    detections = detections[detections[:, 2] >= score_threshold]
+    width, height = image_size
+    boxes = detections[:, 3:7] * np.array([width, height, width, height], dtype=np.float32)
+    return boxes, detections[:, 2], detections[:, 1].astype(np.int64)
+
+
+def crop_region(image: np.ndarray, bbox: Sequence[int], padding: float = 0.05) -> np.ndarray:
+    """Potong ``bbox`` (x, y, w, h) dengan sedikit margin, dibatasi tepi gambar."""
+    x, y, w, h = bbox
+    pad_x, pad_y = int(w * padding), int(h * padding)
+    height, width = image.shape[:2]
+    x1, y1 = max(0, x - pad_x), max(0, y - pad_y)
+    x2, y2 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+    return image[y1:y2, x1:x2]
+
+
+class PartObjectDetector:
+    """Lokalisasi part dalam foto; model ONNX opsional, fallback kontur tepi."""
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        output_format: str = "yolo",
+        input_size: Tuple[int, int] = (640, 640),
+        class_names: Optional[Sequence[str]] = None,
+        score_threshold: float = 0.35,
+        iou_threshold: float = 0.45,
+        max_detections: int = 10,
+        min_area_ratio: float = 0.01,
+    ) -> None:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Format output tidak dikenal: {output_format}")
+        self.model_path = model_path
+        self.output_format = output_format
+        self.input_size = input_size
+        self.class_names = list(class_names) if class_names else []
+        self.score_threshold = score_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+        self.min_area_ratio = min_area_ratio
+        self._net: Optional[cv2.dnn.Net] = None
+
+    def load_model(self) -> None:
+        if not self.model_path:
+            self._net = None
+            return
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Model deteksi objek tidak ditemukan: {self.model_path}")
+        self._net = cv2.dnn.readNetFromONNX(self.model_path)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._net is not None or self.model_path is None
+
+    def detect(self, image: np.ndarray) -> List[ObjectBox]:
+        """Box part terurut skor; bila tidak ada yang lolos, satu box seluruh frame."""
+        height, width = image.shape[:2]
+        with STAGE_LATENCY.time(stage="object_detect"):
+            if self._net is not None:
+                boxes, scores, class_ids = self._run_model(image)
+            else:
+                boxes, scores, class_ids = self._propose_regions(image)
+
+            boxes = np.clip(boxes, 0, [width, height, width, height])
+            valid = (boxes[:, 2] - boxes[:, 0] >= 2) & (boxes[:, 3] - boxes[:, 1] >= 2)
+            boxes, scores, class_ids = boxes[valid], scores[valid], class_ids[valid]
+            if len(scores) > _PRE_NMS_TOP_K:  # batasi kandidat agar loop NMS tetap pendek
+                top = np.argpartition(-scores, _PRE_NMS_TOP_K)[:_PRE_NMS_TOP_K]
+                boxes, scores, class_ids = boxes[top], scores[top], class_ids[top]
+            keep = non_max_suppression(boxes, scores, self.iou_threshold, class_ids, self.max_detections)
+
+        if not len(keep):
+            return [ObjectBox((0, 0, width, height), 0.0, 0, self._class_name(0))]
+        return [
+            ObjectBox(
+                (
+                    int(boxes[i, 0]),
+                    int(boxes[i, 1]),
+                    int(round(boxes[i, 2] - boxes[i, 0])),
+                    int(round(boxes[i, 3] - boxes[i, 1])),
+                ),
+                float(scores[i]),
+                int(class_ids[i]),
+                self._class_name(int(class_ids[i])),
+            )
+            for i in keep
+        ]
+
+    def _class_name(self, class_id: int) -> str:
+        if class_id < len(self.class_names):
+            return self.class_names[class_id]
+        return "sparepart" if not self.class_names else f"CLASS_{class_id}"
+
+    def _run_model(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        height, width = image.shape[:2]
+        if self.output_format == "ssd":
+            blob = cv2.dnn.blobFromImage(image, 1.0 / 255.0, self.input_size, swapRB=True)
+            self._net.setInput(blob)
+            return decode_ssd(self._net.forward(), (width, height), self.score_threshold)
+
+        padded, scale, (pad_x, pad_y) = letterbox(image, self.input_size)
+        blob = cv2.dnn.blobFromImage(padded, 1.0 / 255.0, swapRB=True)
+        self._net.setInput(blob)
+        boxes, scores, class_ids = decode_yolo(
+            self._net.forward(), len(self.class_names) or None, self.score_threshold
+        )
+        boxes = (boxes - np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)) / scale
+        return boxes, scores, class_ids
+
+    def _propose_regions(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Region dari kontur tepi; skor = kerapatan tepi dalam box (heuristik demo)."""
+        height, width = image.shape[:2]
+        scale = min(1.0, 640.0 / max(height, width))
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else image
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+        closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((9, 9), np.uint8), iterations=2)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(closed)
+        if count <= 1:
+            return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+
+        stats = stats[1:]
+        area_ratio = stats[:, 2] * stats[:, 3] / float(small.shape[0] * small.shape[1])
+        mask = (area_ratio >= self.min_area_ratio) & (area_ratio <= 0.95)
+        stats = stats[mask]
+        boxes = np.stack(
+            [stats[:, 0], stats[:, 1], stats[:, 0] + stats[:, 2], stats[:, 1] + stats[:, 3]], axis=1
+        ).astype(np.float32)
+        scores = (stats[:, 4] / np.maximum(stats[:, 2] * stats[:, 3], 1)).astype(np.float32)
+        return boxes / scale, scores, np.zeros(len(boxes), dtype=np.int64)
+
+
+__all__ = [
+    "ObjectBox",
+    "PartObjectDetector",
+    "box_iou",
+    "crop_region",
+    "decode_ssd",
+    "decode_yolo",
+    "letterbox",
+    "non_max_suppression",
+]
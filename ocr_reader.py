@@ -1,21 +1,84 @@
+"""Pembacaan kode part dengan EasyOCR, tunggal maupun batch.
+
+``detect_part_codes`` memanggil ``readtext`` per gambar sehingga detector
+CRAFT dan recognizer selalu jalan dengan batch berisi satu gambar. Untuk
+banyak gambar / crop sekaligus tersedia:
+
+* :meth:`PartCodeOCR.detect_part_codes_batch` - gambar dikelompokkan per
+  ukuran (dibulatkan ke ``size_bucket`` piksel) lalu tiap kelompok diproses
+  satu panggilan ``readtext_batched`` (satu forward detector per kelompok);
+* :class:`OCRBatcher` - menggabungkan panggilan dari banyak request yang
+  datang bersamaan menjadi satu batch.
+
+Semua jalur memakai ``allowlist`` karakter kode part dan ``batch_size``
+recognizer yang bisa diatur (recognizer EasyOCR hanya benar-benar mem-batch di GPU).
+"""
 from __future__ import annotations
 
+import os
 import re
-from typing import List, Sequence
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+import cv2
 import easyocr
 import numpy as np
 
+from instrumentation import STAGE_LATENCY
+
 
 PART_CODE_PATTERN = re.compile(r"\b[0-9A-Z]{3,5}-[A-Z]{3}-[0-9A-Z]{3}\b")
+# Pola longgar untuk kandidat yang mungkin salah baca (0/O, pemisah hilang, akhiran 2-5 karakter);
+# kandidat ini dicocokkan ke katalog oleh ``part_code_index``. Awalan kode part selalu angka,
+# yang bisa terbaca sebagai huruf confusable-nya (O/I/L/Z/S/G/B).
+PART_CODE_CANDIDATE_PATTERN = re.compile(r"\b[0-9OIDLZSGB][0-9A-Z]{2,4}[.-]?[0-9A-Z]{3}[.-]?[0-9A-Z]{2,5}\b")
+PART_CODE_ALLOWLIST = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ-"
+
+
+def extract_part_codes(texts: Iterable[str]) -> List[str]:
+    """Ambil kandidat kode part (upper-case) dari setiap baris hasil OCR.
+
+    Kode yang cocok pola baku diambil apa adanya; bila tidak ada, token yang
+    mirip kode (mengandung angka) tetap dikembalikan untuk dicocokkan ke katalog.
+    """
+    normalized = []
+    for raw in texts:
+        cleaned = raw.strip().upper()
+        if not cleaned:
+            continue
+        strict = PART_CODE_PATTERN.findall(cleaned)
+        if strict:
+            normalized.extend(strict)
+            continue
+        normalized.extend(
+            match.group(0)
+            for match in PART_CODE_CANDIDATE_PATTERN.finditer(cleaned)
+            if any(char.isdigit() for char in match.group(0))
+        )
+    return normalized
 
 
 class PartCodeOCR:
     """Wrapper EasyOCR untuk membaca kode part dari gambar."""
 
-    def __init__(self, languages: Sequence[str] | None = None, *, gpu: bool = False) -> None:
+    def __init__(
+        self,
+        languages: Sequence[str] | None = None,
+        *,
+        gpu: bool = False,
+        batch_size: int = 16,
+        allowlist: Optional[str] = PART_CODE_ALLOWLIST,
+        size_bucket: int = 64,
+        max_side: int = 2560,
+    ) -> None:
         langs = list(languages) if languages else ["en"]
         self.reader = easyocr.Reader(langs, gpu=gpu)
+        self.batch_size = batch_size
+        self.allowlist = allowlist
+        self.size_bucket = size_bucket
+        self.max_side = max_side
 
     def detect_part_codes(self, image_bgr: np.ndarray) -> List[str]:
         """Mengembalikan daftar kode part (upper-case) yang terdeteksi."""
@@ -24,11 +87,141 @@ class PartCodeOCR:
 
         # EasyOCR bekerja lebih optimal dengan format RGB
         image_rgb = image_bgr[:, :, ::-1]
-        texts = self.reader.readtext(image_rgb, detail=0)
-
-        normalized = []
-        for raw in texts:
-            cleaned = raw.strip().upper()
-            if cleaned and PART_CODE_PATTERN.search(cleaned):
-                normalized.append(cleaned)
-        return normalized
+        with STAGE_LATENCY.time(stage="ocr"):
+            texts = self.reader.readtext(
+                image_rgb, detail=0, batch_size=self.batch_size, allowlist=self.allowlist
+            )
+        return extract_part_codes(texts)
+
+    def detect_part_codes_batch(self, images: Sequence[np.ndarray]) -> List[List[str]]:
+        """Kode part per gambar untuk banyak gambar/crop; urutan hasil = urutan input."""
+        results: List[List[str]] = [[] for _ in images]
+        groups: Dict[Tuple[int, int], List[Tuple[int, np.ndarray]]] = {}
+        for index, image in enumerate(images):
+            if image is None or image.size == 0:
+                continue
+            image = self._limit_size(image)
+            height, width = image.shape[:2]
+            key = (self._bucket(height), self._bucket(width))
+            groups.setdefault(key, []).append((index, image[:, :, ::-1] if image.ndim == 3 else image))
+
+        with STAGE_LATENCY.time(stage="ocr"):
+            for (height, width), members in groups.items():
+                batch = [image for _, image in members]
+                if len(batch) == 1:
+                    texts_per_image = [
+                        self.reader.readtext(batch[0], detail=0, batch_size=self.batch_size, allowlist=self.allowlist)
+                    ]
+                else:
+                    texts_per_image = self.reader.readtext_batched(
+                        batch,
+                        n_width=width,
+                        n_height=height,
+                        detail=0,
+                        batch_size=self.batch_size,
+                        allowlist=self.allowlist,
+                    )
+                for (index, _), texts in zip(members, texts_per_image):
+                    results[index] = extract_part_codes(texts)
+        return results
+
+    def _bucket(self, value: int) -> int:
+        return max(self.size_bucket, -(-value // self.size_bucket) * self.size_bucket)
+
+    def _limit_size(self, image: np.ndarray) -> np.ndarray:
+        longest = max(image.shape[:2])
+        if longest <= self.max_side:
+            return image
+        scale = self.max_side / longest
+        return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+@dataclass
+class _PendingOCR:
+    image: np.ndarray
+    done: threading.Event = field(default_factory=threading.Event)
+    codes: List[str] = field(default_factory=list)
+    error: Optional[BaseException] = None
+
+
+class OCRBatcher:
+    """Gabungkan OCR dari request yang berjalan bersamaan menjadi satu batch.
+
+    Request pertama memulai thread worker yang menunggu paling lama
+    ``max_wait`` detik (atau sampai ``max_batch`` gambar terkumpul), lalu
+    memanggil :meth:`PartCodeOCR.detect_part_codes_batch` sekali. Worker
+    berhenti sendiri saat antrean kosong. ``enabled=False`` memanggil OCR langsung.
+    """
+
+    def __init__(self, ocr: PartCodeOCR, *, enabled: bool = True, max_batch: int = 8, max_wait: float = 0.01) -> None:
+        self.ocr = ocr
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._condition = threading.Condition()
+        self._queue: List[_PendingOCR] = []
+        self._worker: Optional[threading.Thread] = None
+
+    def detect_part_codes(self, image_bgr: np.ndarray) -> List[str]:
+        if not self.enabled:
+            return self.ocr.detect_part_codes(image_bgr)
+        if image_bgr is None or image_bgr.size == 0:
+            return []
+        if self._pid != os.getpid():
+            self._reset()  # setelah fork: thread worker induk tidak ikut
+
+        pending = _PendingOCR(image_bgr)
+        with self._condition:
+            self._queue.append(pending)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="ocr-batcher", daemon=True)
+                self._worker.start()
+            elif len(self._queue) >= self.max_batch:
+                self._condition.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.codes
+
+    def detect_part_codes_batch(self, images: Sequence[np.ndarray]) -> List[List[str]]:
+        return self.ocr.detect_part_codes_batch(images)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.max_wait
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+                if not batch:
+                    self._worker = None
+                    return
+
+            try:
+                results = self.ocr.detect_part_codes_batch([item.image for item in batch])
+            except BaseException as exc:  # noqa: BLE001 - diteruskan ke thread pemanggil
+                for item in batch:
+                    item.error = exc
+            else:
+                for item, codes in zip(batch, results):
+                    item.codes = codes
+            finally:
+                for item in batch:
+                    item.done.set()
+
+
+__all__ = [
+    "OCRBatcher",
+    "PART_CODE_ALLOWLIST",
+    "PART_CODE_CANDIDATE_PATTERN",
+    "PART_CODE_PATTERN",
+    "PartCodeOCR",
+    "extract_part_codes",
+]
@@ -0,0 +1,329 @@
+"""Indeks in-memory ``kode_part`` katalog yang toleran terhadap salah baca OCR.
+
+OCR sering tertukar 0/O, 1/I, 5/S, 8/B sehingga regex kode part menolak hasil
+yang sebenarnya benar, atau kandidat salah tetap dikirim ke database/PHP satu
+per satu. Indeks ini memetakan string OCR ke kode katalog terdekat:
+
+* lookup exact pada bentuk kompak (tanpa ``-``/spasi) - O(1);
+* lookup "folded": setiap karakter dipetakan ke wakil kelompok
+  confusable-nya, jadi kesalahan yang murni tertukar huruf/angka juga O(1);
+* selain itu indeks deletion-neighbourhood (gaya SymSpell) atas bentuk
+  folded: semua varian hasil hapus <= ``max_edits`` karakter disimpan di
+  dict, sehingga sisip/hapus/ganti karakter lain ditemukan dengan
+  ``O(panjang kode)`` lookup hash, bukan perbandingan ke seluruh katalog.
+
+Kandidat diurutkan dengan jarak edit berbobot (tertukar confusable = 0.5,
+edit lain = 1). ``CodeMatch.edits`` mencatat jumlah edit di luar tertukar
+confusable: hanya hasil dengan ``edits == 0`` yang boleh dianggap kode yang
+sama, sisanya sekadar saran. Kode ketikan pengguna dicocokkan dengan
+:meth:`PartCodeIndex.lookup` (bentuk kompak persis), bukan :meth:`~PartCodeIndex.match`.
+
+:class:`SecurityCodeIndex` memakai mekanisme muat ulang yang sama untuk
+pemetaan balik payload QR / kode hologram -> ``kode_part`` (hash map, exact).
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONFUSABLE_GROUPS: Tuple[str, ...] = ("0ODQ", "1IL", "2Z", "5S", "6G", "8B")
+_SEPARATORS = re.compile(r"[\s\-._/]+")
+_FOLD: Dict[str, str] = {char: group[0] for group in CONFUSABLE_GROUPS for char in group}
+# Biaya dalam setengah satuan: tertukar (confusable) 1, substitusi lain 2, sisip/hapus 2.
+_CONFUSABLE_COST = 1
+_EDIT_COST = 2
+
+
+def compact_code(text: str) -> str:
+    """Upper-case tanpa pemisah: ``'17210-kzl a01'`` -> ``'17210KZLA01'``."""
+    return _SEPARATORS.sub("", (text or "").upper())
+
+
+def fold_code(text: str) -> str:
+    """Petakan karakter confusable ke wakil kelompoknya (``O``/``D``/``Q`` -> ``0``, dst.)."""
+    return "".join(_FOLD.get(char, char) for char in text)
+
+
+def confusion_distance(left: str, right: str) -> int:
+    """Levenshtein berbobot (setengah satuan) dengan substitusi confusable lebih murah."""
+    if left == right:
+        return 0
+    if len(left) < len(right):
+        left, right = right, left
+    previous = list(range(0, (len(right) + 1) * _EDIT_COST, _EDIT_COST))
+    for i, char_left in enumerate(left, 1):
+        current = [i * _EDIT_COST]
+        fold_left = _FOLD.get(char_left, char_left)
+        for j, char_right in enumerate(right, 1):
+            if char_left == char_right:
+                substitution = 0
+            elif fold_left == _FOLD.get(char_right, char_right):
+                substitution = _CONFUSABLE_COST
+            else:
+                substitution = _EDIT_COST
+            current.append(min(previous[j] + _EDIT_COST, current[j - 1] + _EDIT_COST, previous[j - 1] + substitution))
+        previous = current
+    return previous[-1]
+
+
+def deletion_variants(key: str, depth: int) -> set:
+    """``key`` beserta semua string hasil menghapus hingga ``depth`` karakter."""
+    variants = {key}
+    frontier = {key}
+    for _ in range(depth):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def _edit_distance(left: str, right: str) -> int:
+    """Levenshtein biasa (tanpa bobot) untuk memverifikasi kandidat indeks hapus."""
+    previous = list(range(len(right) + 1))
+    for i, char_left in enumerate(left, 1):
+        current = [i]
+        for j, char_right in enumerate(right, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_left != char_right)))
+        previous = current
+    return previous[-1]
+
+
+@dataclass(frozen=True)
+class CodeMatch:
+    kode_part: str
+    distance: float
+    query: str
+    edits: int = 0  # sisip/hapus/ganti di luar tertukar confusable
+
+    @property
+    def confusable_only(self) -> bool:
+        """``True`` bila ``query`` hanya berbeda karena tertukar confusable (atau identik)."""
+        return self.edits == 0
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"kode_part": self.kode_part, "distance": self.distance, "query": self.query, "edits": self.edits}
+
+
+class _Snapshot:
+    """Struktur indeks immutable; diganti utuh saat katalog berubah."""
+
+    def __init__(self, codes: Iterable[str], max_edits: int) -> None:
+        self.max_edits = max_edits
+        self.exact: Dict[str, str] = {}
+        self.folded: Dict[str, List[str]] = {}
+        self.deletes: Dict[str, List[str]] = {}
+        for code in codes:
+            key = compact_code(code)
+            if not key or key in self.exact:
+                continue
+            self.exact[key] = code.strip().upper()
+            folded = fold_code(key)
+            if folded not in self.folded:
+                for variant in deletion_variants(folded, max_edits):
+                    self.deletes.setdefault(variant, []).append(folded)
+            self.folded.setdefault(folded, []).append(key)
+
+    def near(self, key: str) -> List[Tuple[str, int]]:
+        """``(kode kompak, edit)`` yang berjarak <= ``max_edits`` edit (di luar tertukar confusable) dari ``key``."""
+        folded = fold_code(key)
+        candidates = set()
+        for variant in deletion_variants(folded, self.max_edits):
+            candidates.update(self.deletes.get(variant, ()))
+        found = []
+        for candidate in candidates:
+            edits = _edit_distance(folded, candidate)
+            if edits <= self.max_edits:
+                found.extend((code, edits) for code in self.folded[candidate])
+        return found
+
+
+class _ReloadingIndex:
+    """Snapshot immutable yang dibangun dari ``loader`` dan dimuat ulang berkala.
+
+    Subclass mengisi :meth:`_make_snapshot` dan :meth:`_source_of` (sidik
+    frozenset isi katalog); snapshot hanya dibangun ulang bila sidiknya berubah.
+    """
+
+    description = "indeks katalog"
+
+    def __init__(self, loader: Optional[Callable[[], Iterable]] = None, *, refresh_interval: float = 60.0) -> None:
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+
+    def __len__(self) -> int:
+        snapshot = self._current()
+        return len(snapshot.source) if snapshot else 0
+
+    @property
+    def ready(self) -> bool:
+        """``True`` bila katalog sudah termuat dan tidak kosong."""
+        return len(self) > 0
+
+    def build(self, items: Iterable) -> int:
+        items = list(items)
+        snapshot = self._make_snapshot(items)
+        snapshot.source = self._source_of(items)
+        self._snapshot, self._loaded_at = snapshot, time.monotonic()
+        return len(snapshot.source)
+
+    def invalidate(self) -> None:
+        """Tandai katalog berubah; dimuat ulang pada pemakaian berikutnya."""
+        self._loaded_at = 0.0
+
+    def _make_snapshot(self, items: List):
+        raise NotImplementedError
+
+    def _source_of(self, items: List) -> frozenset:
+        return frozenset(items)
+
+    def _current(self):
+        stale = time.monotonic() - self._loaded_at >= self.refresh_interval
+        if self.loader is None or not stale:
+            return self._snapshot
+        if not self._lock.acquire(blocking=self._snapshot is None):
+            return self._snapshot  # thread lain sedang memuat; pakai snapshot lama
+        try:
+            if time.monotonic() - self._loaded_at >= self.refresh_interval:
+                items = list(self.loader())
+                if self._snapshot is None or self._source_of(items) != self._snapshot.source:
+                    self.build(items)
+                    logger.info("%s dimuat ulang: %d entri", self.description, len(self._snapshot.source))
+                self._loaded_at = time.monotonic()
+        except Exception as exc:  # noqa: BLE001 - pakai snapshot lama, fallback ke database bila kosong
+            logger.warning("Gagal memuat %s: %s", self.description, exc)
+            self._loaded_at = time.monotonic()
+        finally:
+            self._lock.release()
+        return self._snapshot
+
+
+class PartCodeIndex(_ReloadingIndex):
+    """Pencocokan string OCR ke ``kode_part`` katalog.
+
+    Args:
+        loader: ``fungsi() -> iterable kode_part``; dipanggil ulang paling
+            sering tiap ``refresh_interval`` detik atau setelah :meth:`invalidate`.
+        max_edits: jumlah sisip/hapus/ganti (selain tertukar confusable) yang
+            masih dicocokkan. Tertukar confusable tidak dibatasi.
+    """
+
+    description = "Indeks kode part"
+
+    def __init__(
+        self,
+        loader: Optional[Callable[[], Iterable[str]]] = None,
+        *,
+        refresh_interval: float = 60.0,
+        max_edits: int = 1,
+    ) -> None:
+        super().__init__(loader, refresh_interval=refresh_interval)
+        self.max_edits = max_edits
+
+    def __contains__(self, code: str) -> bool:
+        snapshot = self._current()
+        return bool(snapshot) and compact_code(code) in snapshot.exact
+
+    def lookup(self, text: Optional[str]) -> Optional[str]:
+        """Kode katalog yang bentuk kompaknya persis sama dengan ``text`` (tanpa koreksi)."""
+        snapshot = self._current()
+        return snapshot.exact.get(compact_code(text or "")) if snapshot else None
+
+    def match(self, text: Optional[str], limit: int = 3) -> List[CodeMatch]:
+        """Kode katalog terdekat untuk satu string OCR/QR, terurut (edit, jarak)."""
+        snapshot = self._current()
+        key = compact_code(text or "")
+        if not snapshot or not key:
+            return []
+        exact = snapshot.exact.get(key)
+        if exact is not None:
+            return [CodeMatch(exact, 0.0, text)]
+
+        folded = snapshot.folded.get(fold_code(key))
+        candidates = [(code, 0) for code in folded] if folded else snapshot.near(key)
+        hits = sorted((edits, confusion_distance(key, candidate), candidate) for candidate, edits in candidates)
+        return [
+            CodeMatch(snapshot.exact[candidate], distance / 2, text, edits)
+            for edits, distance, candidate in hits[:limit]
+        ]
+
+    def match_many(self, texts: Sequence[Optional[str]], limit: int = 3) -> List[CodeMatch]:
+        """Gabungan :meth:`match` beberapa string, unik per kode, jarak terkecil dulu."""
+        best: Dict[str, CodeMatch] = {}
+        for text in texts:
+            for match in self.match(text, limit=limit):
+                current = best.get(match.kode_part)
+                if current is None or (match.edits, match.distance) < (current.edits, current.distance):
+                    best[match.kode_part] = match
+        return sorted(best.values(), key=lambda match: (match.edits, match.distance))
+
+    def _make_snapshot(self, codes: List[str]) -> _Snapshot:
+        return _Snapshot(codes, self.max_edits)
+
+    def _source_of(self, codes: List[str]) -> frozenset:
+        return frozenset(code.strip().upper() for code in codes if code)
+
+
+def normalize_payload(text: Optional[str]) -> str:
+    """Payload QR/hologram dibandingkan upper-case tanpa spasi di tepi.
+
+    Sama persis dengan ``UPPER(TRIM(...))`` di SQL (kolom ``*_norm`` MySQL dan
+    index ekspresi SQLite): hanya spasi di tepi yang dibuang, isi tidak diubah.
+    """
+    return (text or "").strip(" ").upper()
+
+
+class _PayloadSnapshot:
+    def __init__(self, rows: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        self.parts: Dict[str, str] = {}
+        for kode_part, *payloads in rows:
+            for payload in payloads:
+                key = normalize_payload(payload)
+                if key and kode_part:
+                    self.parts.setdefault(key, kode_part.strip().upper())
+
+
+class SecurityCodeIndex(_ReloadingIndex):
+    """Pemetaan balik payload QR / kode hologram -> ``kode_part`` (O(1)).
+
+    Args:
+        loader: ``fungsi() -> iterable (kode_part, qr_code, hologram_code)``.
+    """
+
+    description = "Indeks QR/hologram"
+
+    def lookup(self, payload: Optional[str]) -> Optional[str]:
+        """``kode_part`` pemilik payload, atau ``None`` bila tidak terdaftar."""
+        snapshot = self._current()
+        if not snapshot:
+            return None
+        return snapshot.parts.get(normalize_payload(payload))
+
+    def __contains__(self, payload: str) -> bool:
+        return self.lookup(payload) is not None
+
+    def _make_snapshot(self, rows: List[Tuple[str, Optional[str], Optional[str]]]) -> _PayloadSnapshot:
+        return _PayloadSnapshot(rows)
+
+    def _source_of(self, rows: List[Tuple[str, Optional[str], Optional[str]]]) -> frozenset:
+        return frozenset(tuple(row) for row in rows)
+
+
+__all__ = [
+    "CONFUSABLE_GROUPS",
+    "CodeMatch",
+    "PartCodeIndex",
+    "SecurityCodeIndex",
+    "compact_code",
+    "confusion_distance",
+    "deletion_variants",
+    "fold_code",
+    "normalize_payload",
+]
@@ -0,0 +1,147 @@
+"""Dukungan server pre-fork (gunicorn ``--preload``): model dimuat sekali di master.
+
+Bobot EasyOCR/torch dan ONNX (cv2.dnn) dimuat saat ``import app`` di proses
+master; setelah ``fork()`` worker berbagi page memori tersebut secara
+copy-on-write selama tidak ada yang menulisinya. Modul ini menyediakan:
+
+* :func:`freeze_heap` - ``gc.collect()`` + ``gc.freeze()`` tepat sebelum fork,
+  supaya siklus GC di worker tidak menyentuh (dan menyalin) page objek milik master;
+* :func:`after_fork` - daftar callback yang dijalankan di proses anak
+  (``os.register_at_fork``) untuk menyiapkan state mutable per worker;
+* :func:`memory_report` - pemakaian memori unik (USS) vs bersama per worker
+  dari ``/proc/<pid>/smaps_rollup``.
+"""
+from __future__ import annotations
+
+import gc
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_SMAPS_FIELDS = (
+    "Rss",
+    "Pss",
+    "Shared_Clean",
+    "Shared_Dirty",
+    "Private_Clean",
+    "Private_Dirty",
+    "Swap",
+)
+
+_after_fork_callbacks: List[Callable[[], None]] = []
+
+
+def after_fork(callback: Callable[[], None]) -> Callable[[], None]:
+    """Daftarkan ``callback`` untuk dijalankan di setiap proses anak setelah fork (bisa dipakai sebagai decorator)."""
+    if not _after_fork_callbacks and hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_run_after_fork)
+    _after_fork_callbacks.append(callback)
+    return callback
+
+
+def _run_after_fork() -> None:
+    for callback in _after_fork_callbacks:
+        try:
+            callback()
+        except Exception:  # noqa: BLE001 - satu hook gagal tidak boleh mematikan worker
+            logger.exception("Hook after-fork %r gagal", callback)
+
+
+def freeze_heap() -> bool:
+    """Pindahkan seluruh objek hidup ke generasi permanen GC (Python 3.7+)."""
+    if not hasattr(gc, "freeze"):
+        return False
+    gc.collect()
+    gc.freeze()
+    return True
+
+
+def read_smaps_rollup(pid: Union[int, str] = "self") -> Optional[Dict[str, int]]:
+    """Ringkasan ``smaps_rollup`` (byte) satu proses; ``None`` bila tidak tersedia (non-Linux / proses hilang)."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r", encoding="ascii") as handle:
+            lines = handle.readlines()
+    except OSError:
+        return None
+    values: Dict[str, int] = {}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in _SMAPS_FIELDS:
+            values[name] = int(rest.split()[0]) * 1024
+    return values
+
+
+def _summarize(pid: int, smaps: Dict[str, int]) -> Dict[str, int]:
+    unique = smaps.get("Private_Clean", 0) + smaps.get("Private_Dirty", 0)
+    return {
+        "pid": pid,
+        "rss": smaps.get("Rss", 0),
+        "pss": smaps.get("Pss", 0),
+        "uss": unique,
+        "shared": smaps.get("Shared_Clean", 0) + smaps.get("Shared_Dirty", 0),
+        "swap": smaps.get("Swap", 0),
+    }
+
+
+def child_pids(parent: int) -> List[int]:
+    """PID proses anak langsung dari ``parent`` (dibaca dari ``/proc/*/stat``)."""
+    children = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="ascii", errors="replace") as handle:
+                stat = handle.read()
+        except OSError:
+            continue
+        # field ke-4 (ppid) setelah nama proses dalam kurung, yang bisa berisi spasi
+        fields = stat.rsplit(")", 1)[-1].split()
+        if len(fields) > 1 and int(fields[1]) == parent:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def memory_report(master_pid: Optional[int] = None) -> Dict[str, object]:
+    """Memori master + seluruh worker-nya.
+
+    ``uss`` = page privat (yang benar-benar ditambah tiap worker), ``shared`` =
+    page yang masih dibagi copy-on-write, ``pss`` = porsi proporsional. Tanpa
+    ``master_pid`` dipakai parent proses ini (worker gunicorn -> arbiter).
+    """
+    master_pid = master_pid or os.getppid()
+    master = read_smaps_rollup(master_pid)
+    workers = []
+    for pid in child_pids(master_pid):
+        smaps = read_smaps_rollup(pid)
+        if smaps:
+            workers.append(_summarize(pid, smaps))
+    report: Dict[str, object] = {
+        "master": _summarize(master_pid, master) if master else None,
+        "workers": workers,
+        "current_pid": os.getpid(),
+        "gc_frozen": gc.get_freeze_count() if hasattr(gc, "get_freeze_count") else None,
+    }
+    if workers:
+        report["totals"] = {
+            "workers": len(workers),
+            "uss": sum(item["uss"] for item in workers),
+            "pss": sum(item["pss"] for item in workers) + (report["master"] or {}).get("pss", 0),
+            "rss": sum(item["rss"] for item in workers) + (report["master"] or {}).get("rss", 0),
+            "avg_worker_uss": sum(item["uss"] for item in workers) // len(workers),
+        }
+    return report
+
+
+__all__ = [
+    "after_fork",
+    "child_pids",
+    "freeze_heap",
+    "memory_report",
+    "read_smaps_rollup",
+]
@@ -0,0 +1,192 @@
+"""Pencocokan nearest-neighbour terhadap foto referensi ASLI per ``kode_part``.
+
+Embedding foto training berlabel ASLI dihitung dari tensor di
+:mod:`feature_index` (tanpa decode ulang file), dikelompokkan per
+``kode_part``, lalu dicari dengan cosine similarity:
+
+* flat  - satu perkalian matriks ``(n, d) @ (d,)`` untuk part dengan sedikit referensi;
+* IVF   - untuk part dengan banyak referensi, centroid k-means (NumPy) dipakai
+  sebagai coarse quantizer dan hanya ``nprobe`` list terdekat yang dipindai.
+
+Saat verifikasi cukup satu embedding untuk gambar query; tidak ada inference
+tambahan per referensi. Embedding referensi di-cache per ``image_id`` sehingga
+rebuild setelah upload/hapus hanya menghitung gambar baru.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReferenceMatch:
+    image_id: int
+    similarity: float
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"image_id": self.image_id, "similarity": round(self.similarity, 4)}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def kmeans(vectors: np.ndarray, clusters: int, iterations: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """K-means spherical sederhana (cosine). Mengembalikan ``(centroid, assignment)``."""
+    rng = np.random.default_rng(seed)
+    clusters = min(clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=clusters, replace=False)].copy()
+    assignment = np.zeros(len(vectors), dtype=np.int64)
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids, assignment
+
+
+class PartReferenceIndex:
+    """Indeks embedding satu ``kode_part`` (flat atau IVF)."""
+
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, ivf_min_size: int = 256, nprobe: int = 4) -> None:
+        self.ids = ids
+        self.vectors = _normalize(vectors.astype(np.float32, copy=False))
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+        if len(ids) >= ivf_min_size:
+            clusters = max(2, int(np.sqrt(len(ids))))
+            self.centroids, assignment = kmeans(self.vectors, clusters)
+            self.lists = [np.flatnonzero(assignment == cluster) for cluster in range(len(self.centroids))]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: np.ndarray, k: int) -> List[ReferenceMatch]:
+        query = _normalize(query.astype(np.float32, copy=False).reshape(-1))
+        if self.centroids is not None:
+            probes = np.argsort(self.centroids @ query)[::-1][: self.nprobe]
+            candidates = np.concatenate([self.lists[probe] for probe in probes])
+        else:
+            candidates = np.arange(len(self.ids))
+        if not len(candidates):
+            return []
+        scores = self.vectors[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [ReferenceMatch(int(self.ids[candidates[i]]), float(scores[i])) for i in top]
+
+
+class ReferenceMatcher:
+    """Kelola :class:`PartReferenceIndex` per ``kode_part`` dari sebuah ``FeatureIndex``.
+
+    Args:
+        feature_index: sumber tensor preprocess gambar training.
+        embed: ``fungsi(batch_tensor [n, *shape]) -> ndarray [n, d]``.
+        label: label referensi yang dipakai (default ``ASLI``).
+        refresh_interval: detik minimum antar pengecekan perubahan feature index.
+        ivf_min_size / nprobe: ambang pemakaian IVF dan jumlah list yang dipindai.
+    """
+
+    def __init__(
+        self,
+        feature_index,
+        embed: Callable[[np.ndarray], np.ndarray],
+        *,
+        label: str = "ASLI",
+        refresh_interval: float = 30.0,
+        ivf_min_size: int = 256,
+        nprobe: int = 4,
+    ) -> None:
+        self.feature_index = feature_index
+        self.embed = embed
+        self.label = label
+        self.refresh_interval = refresh_interval
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._parts: Dict[str, PartReferenceIndex] = {}
+        self._embeddings: Dict[int, np.ndarray] = {}
+        self._signature: Optional[Tuple[int, ...]] = None
+        self._checked_at = 0.0
+
+    def match(self, kode_part: Optional[str], query_embedding: np.ndarray, k: int = 3) -> List[ReferenceMatch]:
+        if not kode_part:
+            return []
+        self._maybe_refresh()
+        index = self._parts.get(kode_part)
+        if index is None:
+            return []
+        return index.search(query_embedding, k)
+
+    def reference_count(self, kode_part: str) -> int:
+        self._maybe_refresh()
+        index = self._parts.get(kode_part)
+        return len(index) if index is not None else 0
+
+    def rebuild(self) -> Dict[str, int]:
+        """Bangun ulang indeks per part; hanya gambar yang belum punya embedding yang dihitung."""
+        with self._lock:
+            return self._rebuild_locked()
+
+    def _maybe_refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval and self._signature is not None:
+            return
+        if not self._lock.acquire(blocking=self._signature is None):
+            return  # thread lain sedang rebuild; pakai indeks lama
+        try:
+            self._checked_at = now
+            entries = self.feature_index.entries(label=self.label)
+            signature = tuple(image_id for image_id, _ in entries)
+            if signature != self._signature:
+                self._rebuild_locked()
+        except Exception as exc:  # noqa: BLE001 - pencocokan referensi hanya bukti tambahan
+            logger.warning("Gagal memperbarui indeks referensi: %s", exc)
+        finally:
+            self._lock.release()
+
+    def _rebuild_locked(self) -> Dict[str, int]:
+        entries = self.feature_index.entries(label=self.label)
+        wanted = {image_id for image_id, _ in entries}
+        self._embeddings = {image_id: vec for image_id, vec in self._embeddings.items() if image_id in wanted}
+        missing = [image_id for image_id in sorted(wanted) if image_id not in self._embeddings]
+        if missing:
+            missing_set = set(missing)
+            for ids, _, tensors in self.feature_index.iter_batches(label=self.label):
+                keep = [i for i, image_id in enumerate(ids) if image_id in missing_set]
+                if not keep:
+                    continue
+                vectors = np.asarray(self.embed(tensors[keep]), dtype=np.float32)
+                for offset, i in enumerate(keep):
+                    self._embeddings[ids[i]] = vectors[offset]
+
+        grouped: Dict[str, List[int]] = {}
+        for image_id, entry in entries:
+            if image_id in self._embeddings and entry.get("kode_part"):
+                grouped.setdefault(str(entry["kode_part"]), []).append(image_id)
+        self._parts = {
+            kode_part: PartReferenceIndex(
+                np.array(ids, dtype=np.int64),
+                np.stack([self._embeddings[image_id] for image_id in ids]),
+                ivf_min_size=self.ivf_min_size,
+                nprobe=self.nprobe,
+            )
+            for kode_part, ids in grouped.items()
+        }
+        self._signature = tuple(image_id for image_id, _ in entries)
+        return {kode_part: len(index) for kode_part, index in self._parts.items()}
+
+
+__all__ = ["PartReferenceIndex", "ReferenceMatch", "ReferenceMatcher", "kmeans"]
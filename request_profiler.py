@@ -0,0 +1,271 @@
+"""Profiling opt-in untuk request verifikasi yang lambat.
+
+Sebuah request ditangkap bila:
+
+* latensinya melewati ``threshold_ms`` (jejak diambil oleh stack sampler ringan
+  yang hanya mengamati thread request yang sedang berjalan);
+* terpilih oleh ``sample_rate`` (diprofil penuh dengan ``cProfile``);
+* membawa header ``X-Debug-Profile: 1`` dari sesi admin (``cProfile``).
+
+Setiap tangkapan menyimpan breakdown per tahap (dari ``instrumentation``) dan
+jejaknya di ring buffer berukuran tetap, lalu bisa dilihat/diunduh dari dashboard
+admin: ``.prof`` (pstats/snakeviz) untuk cProfile atau folded stacks
+(flamegraph.pl / speedscope) untuk sampler.
+"""
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from instrumentation import record_stages
+
+DEBUG_HEADER = "X-Debug-Profile"
+
+
+@dataclass
+class ProfileRecord:
+    """Satu request yang tertangkap profiler."""
+
+    id: int
+    endpoint: str
+    path: str
+    trigger: str
+    started_at: str
+    duration_ms: float
+    stages_ms: Dict[str, float]
+    summary: str
+    artifact: bytes = field(repr=False)
+    artifact_kind: str = "folded"
+
+    def to_dict(self, include_summary: bool = False) -> Dict[str, object]:
+        data: Dict[str, object] = {
+            "id": self.id,
+            "endpoint": self.endpoint,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "stages_ms": self.stages_ms,
+            "artifact_kind": self.artifact_kind,
+        }
+        if include_summary:
+            data["summary"] = self.summary
+        return data
+
+    @property
+    def download_name(self) -> str:
+        ext = "prof" if self.artifact_kind == "pstats" else "folded.txt"
+        return f"profile_{self.id}_{self.endpoint}.{ext}"
+
+
+class StackSampler:
+    """Sampler stack per-thread berbasis ``sys._current_frames()``.
+
+    Thread sampler hanya hidup selama ada thread yang terdaftar, sehingga saat
+    tidak ada request yang diawasi biayanya nol.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._targets: Dict[int, Counter] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: int) -> None:
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                targets = list(self._targets)
+            frames = sys._current_frames()
+            for thread_id in targets:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                folded = ";".join(reversed(stack))
+                with self._lock:
+                    counter = self._targets.get(thread_id)
+                    if counter is not None:
+                        counter[folded] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+class RequestProfiler:
+    """Menentukan request mana yang diprofil dan menyimpan hasilnya di ring buffer.
+
+    Args:
+        enabled: saklar utama; ``False`` membuat decorator langsung memanggil view.
+        threshold_ms: request lebih lambat dari ini disimpan (0 menonaktifkan sampler).
+        sample_rate: fraksi request yang diprofil penuh dengan cProfile.
+        capacity: jumlah tangkapan yang disimpan.
+        sampling_interval_ms: jeda antar sampel stack.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        threshold_ms: float = 0.0,
+        sample_rate: float = 0.0,
+        capacity: int = 20,
+        sampling_interval_ms: float = 5.0,
+    ) -> None:
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self._records: Deque[ProfileRecord] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._sampler = StackSampler(interval=sampling_interval_ms / 1000.0)
+        # cProfile/sys.setprofile tidak boleh tumpang tindih antar thread di Python 3.12+.
+        self._cprofile_slot = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Ring buffer
+    # ------------------------------------------------------------------
+    def records(self) -> List[ProfileRecord]:
+        with self._lock:
+            return list(reversed(self._records))
+
+    def get(self, record_id: int) -> Optional[ProfileRecord]:
+        with self._lock:
+            for record in self._records:
+                if record.id == record_id:
+                    return record
+        return None
+
+    def _store(self, record: ProfileRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    # ------------------------------------------------------------------
+    # Decorator view
+    # ------------------------------------------------------------------
+    def profile_endpoint(
+        self,
+        endpoint: str,
+        *,
+        path_getter: Callable[[], str],
+        debug_requested: Callable[[], bool],
+    ) -> Callable:
+        """Decorator view Flask. ``debug_requested`` harus sudah memeriksa sesi admin."""
+
+        def decorator(view: Callable) -> Callable:
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                trigger = None
+                if debug_requested():
+                    trigger = "debug"
+                elif self.sample_rate > 0 and random.random() < self.sample_rate:
+                    trigger = "sample"
+                return self._run(view, args, kwargs, endpoint, path_getter(), trigger)
+
+            return wrapper
+
+        return decorator
+
+    def _run(self, view, args, kwargs, endpoint: str, path: str, trigger: Optional[str]):
+        profiler: Optional[cProfile.Profile] = None
+        if trigger is not None and self._cprofile_slot.acquire(blocking=False):
+            profiler = cProfile.Profile()
+        sampling = profiler is None and (self.threshold_ms > 0 or trigger is not None)
+        thread_id = threading.get_ident()
+
+        started_at = datetime.now().isoformat(timespec="seconds")
+        started = time.perf_counter()
+        if sampling:
+            self._sampler.start(thread_id)
+        try:
+            with record_stages() as stages:
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000.0
+            samples = self._sampler.stop(thread_id) if sampling else None
+            if profiler is not None:
+                self._cprofile_slot.release()
+            slow = self.threshold_ms > 0 and duration_ms >= self.threshold_ms
+            if trigger is not None or slow:
+                self._store(
+                    self._build_record(
+                        endpoint, path, trigger or "threshold", started_at, duration_ms, stages, profiler, samples
+                    )
+                )
+
+    def _build_record(self, endpoint, path, trigger, started_at, duration_ms, stages, profiler, samples) -> ProfileRecord:
+        stages_ms = {stage: round(seconds * 1000.0, 3) for stage, seconds in stages.items()}
+        if profiler is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats("cumulative").print_stats(40)
+            profiler.create_stats()
+            return ProfileRecord(
+                id=next(self._ids),
+                endpoint=endpoint,
+                path=path,
+                trigger=trigger,
+                started_at=started_at,
+                duration_ms=round(duration_ms, 3),
+                stages_ms=stages_ms,
+                summary=stream.getvalue(),
+                artifact=marshal.dumps(profiler.stats),
+                artifact_kind="pstats",
+            )
+
+        samples = samples or Counter()
+        folded = "\n".join(f"{stack} {count}" for stack, count in samples.most_common())
+        top = "\n".join(f"{count:>5}  {stack.rsplit(';', 1)[-1]}" for stack, count in samples.most_common(25))
+        return ProfileRecord(
+            id=next(self._ids),
+            endpoint=endpoint,
+            path=path,
+            trigger=trigger,
+            started_at=started_at,
+            duration_ms=round(duration_ms, 3),
+            stages_ms=stages_ms,
+            summary=f"{sum(samples.values())} sampel stack\n{top}",
+            artifact=folded.encode("utf-8"),
+            artifact_kind="folded",
+        )
+
+
+__all__ = ["DEBUG_HEADER", "ProfileRecord", "RequestProfiler", "StackSampler"]
@@ -0,0 +1,93 @@
+"""Cache in-process ber-TTL pendek untuk widget yang mahal dihitung.
+
+Dipakai landing page supaya lonjakan traffic anonim tidak diteruskan linear
+ke database: dalam satu jendela TTL hanya satu thread (single-flight) yang
+benar-benar menjalankan query, thread lain menunggu hasil yang sama atau
+langsung memakai nilai lama (stale) selama proses refresh berlangsung.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _CacheEntry:
+    value: object
+    expires_at: float
+
+
+@dataclass
+class _Flight:
+    done: threading.Event = field(default_factory=threading.Event)
+    value: object = None
+    error: Optional[BaseException] = None
+
+
+class SingleFlightCache:
+    """Cache TTL dengan proteksi stampede.
+
+    Args:
+        ttl: umur nilai dalam detik. ``0`` menonaktifkan cache (loader selalu dipanggil).
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, _CacheEntry] = {}
+        self._inflight: Dict[Hashable, _Flight] = {}
+
+    def get_or_compute(self, key: Hashable, loader: Callable[[], T]) -> T:
+        if self.ttl <= 0:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                return entry.value  # type: ignore[return-value]
+
+            flight = self._inflight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+
+        if not is_leader:
+            # Ada thread lain yang sedang refresh: pakai nilai lama bila ada.
+            if entry is not None:
+                return entry.value  # type: ignore[return-value]
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value  # type: ignore[return-value]
+
+        try:
+            value = loader()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                self._entries[key] = _CacheEntry(value=value, expires_at=time.monotonic() + self.ttl)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Hapus satu key, atau seluruh isi cache bila key tidak diberikan."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+__all__ = ["SingleFlightCache"]
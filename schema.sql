@@ -37,6 +37,9 @@ CREATE TABLE IF NOT EXISTS spareparts (
     FOREIGN KEY(id_kategori) REFERENCES kategori(id_kategori)
 );
 
+CREATE INDEX IF NOT EXISTS idx_spareparts_qr_code_norm ON spareparts(UPPER(TRIM(qr_code)));
+CREATE INDEX IF NOT EXISTS idx_spareparts_hologram_code_norm ON spareparts(UPPER(TRIM(hologram_code)));
+
 -- Tabel: verifikasi_log
 CREATE TABLE IF NOT EXISTS verifikasi_log (
     id_log      INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -44,15 +47,49 @@ CREATE TABLE IF NOT EXISTS verifikasi_log (
     status      TEXT,
     ip_address  TEXT,
     user_agent  TEXT,
+    user_agent_id INTEGER,
+    metode      TEXT    DEFAULT 'QR',
     waktu_cek   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Index riwayat: keyset pagination (waktu_cek, id_log) DESC, opsional per metode
+CREATE INDEX IF NOT EXISTS idx_verifikasi_log_waktu ON verifikasi_log (waktu_cek, id_log);
+CREATE INDEX IF NOT EXISTS idx_verifikasi_log_metode_waktu ON verifikasi_log (metode, waktu_cek, id_log);
+
+-- Tabel: verifikasi_log_harian (rekap harian, diisi oleh log_verification_event)
+CREATE TABLE IF NOT EXISTS verifikasi_log_harian (
+    tanggal           TEXT    PRIMARY KEY,
+    total             INTEGER NOT NULL DEFAULT 0,
+    total_asli        INTEGER NOT NULL DEFAULT 0,
+    total_tidak_valid INTEGER NOT NULL DEFAULT 0
+);
+
+-- Tabel: user_agent_dict (dictionary user agent, direferensikan verifikasi_log.user_agent_id)
+CREATE TABLE IF NOT EXISTS user_agent_dict (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    ua_hash     TEXT    NOT NULL UNIQUE,
+    user_agent  TEXT    NOT NULL
+);
+
+-- Tabel: verifikasi_log_bulanan (agregat log yang sudah melewati retensi)
+-- Log lama dipindah ke tabel rollover verifikasi_log_pYYYYMM oleh log_storage.py
+CREATE TABLE IF NOT EXISTS verifikasi_log_bulanan (
+    bulan       TEXT    NOT NULL,
+    kode_part   TEXT    NOT NULL,
+    metode      TEXT    NOT NULL,
+    status      TEXT    NOT NULL,
+    total       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bulan, kode_part, metode, status)
+);
+
 -- Tabel: training_images
 CREATE TABLE IF NOT EXISTS training_images (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
     kode_part   TEXT    NOT NULL,
     filename    TEXT    NOT NULL,
     filepath    TEXT    NOT NULL,
+    content_hash    TEXT,
+    perceptual_hash TEXT,
     label       TEXT    NOT NULL CHECK(label IN ('ASLI', 'PALSU')),
     catatan     TEXT,
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -60,6 +97,8 @@ CREATE TABLE IF NOT EXISTS training_images (
     FOREIGN KEY(uploaded_by) REFERENCES admin(id_admin)
 );
 
+CREATE UNIQUE INDEX IF NOT EXISTS uq_training_content_hash ON training_images(content_hash, kode_part);
+
 -- ==========================
 -- Seed Data
 -- ==========================
@@ -58,7 +58,11 @@ CREATE TABLE IF NOT EXISTS `spareparts` (
     `tanggal_produksi` DATE DEFAULT NULL,
     `is_original` TINYINT(1) DEFAULT 1,
     `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    `qr_code_norm` VARCHAR(80) GENERATED ALWAYS AS (UPPER(TRIM(`qr_code`))) STORED,
+    `hologram_code_norm` VARCHAR(80) GENERATED ALWAYS AS (UPPER(TRIM(`hologram_code`))) STORED,
     PRIMARY KEY (`id`),
+    KEY `idx_spareparts_qr_code_norm` (`qr_code_norm`),
+    KEY `idx_spareparts_hologram_code_norm` (`hologram_code_norm`),
     CONSTRAINT `fk_kategori` FOREIGN KEY (`kategori_id`) REFERENCES `kategori` (`id_kategori`) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -0,0 +1,120 @@
+"""Lapisan akses SQLite untuk mode ``DB_BACKEND=sqlite``.
+
+Alih-alih membuka ``honda_spareparts.db`` baru di setiap pemanggilan, modul ini
+menyimpan satu koneksi per thread yang sudah dikonfigurasi untuk throughput:
+
+* ``journal_mode=WAL`` sehingga penulis log tidak memblokir pembaca riwayat;
+* ``synchronous=NORMAL`` (aman untuk WAL, fsync hanya saat checkpoint);
+* ``cache_size`` dan ``mmap_size`` yang bisa diatur lewat environment;
+* cache prepared statement bawaan modul ``sqlite3`` yang baru efektif karena
+  koneksinya dipakai ulang (SQL yang sama tidak di-parse ulang).
+
+Pemanggil tetap memakai pola lama ``conn = get_db_connection(); ...; conn.close()``:
+``close()`` pada koneksi bersama hanya me-rollback transaksi yang belum di-commit.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import weakref
+from typing import Optional
+
+
+class SharedSQLiteConnection(sqlite3.Connection):
+    """Koneksi yang dipakai ulang oleh thread yang sama; ``close()`` tidak menutup."""
+
+    def close(self) -> None:  # type: ignore[override]
+        if self.in_transaction:
+            self.rollback()
+
+    def close_for_real(self) -> None:
+        super().close()
+
+
+class SQLiteConnectionManager:
+    """Membagikan satu koneksi SQLite per thread dengan PRAGMA performa.
+
+    Args:
+        path: lokasi file database.
+        performance_mode: ``False`` mengembalikan perilaku lama (koneksi baru tiap panggilan).
+        cache_size_kib: ukuran page cache per koneksi dalam KiB.
+        mmap_size: batas memory-mapped I/O dalam byte (0 menonaktifkan).
+        busy_timeout_ms: lama menunggu lock penulis lain sebelum ``database is locked``.
+        cached_statements: jumlah prepared statement yang disimpan per koneksi.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        performance_mode: bool = True,
+        cache_size_kib: int = 16384,
+        mmap_size: int = 256 * 1024 * 1024,
+        busy_timeout_ms: int = 5000,
+        cached_statements: int = 256,
+    ) -> None:
+        self.path = path
+        self.performance_mode = performance_mode
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # WeakSet: koneksi milik thread yang sudah selesai ikut dibebaskan bersama thread-local-nya.
+        self._connections: "weakref.WeakSet[SharedSQLiteConnection]" = weakref.WeakSet()
+        self._pid = os.getpid()
+
+    def connect(self) -> sqlite3.Connection:
+        if not self.performance_mode:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            return conn
+
+        self._check_fork()
+        conn: Optional[SharedSQLiteConnection] = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.add(conn)
+        return conn
+
+    def _open(self) -> SharedSQLiteConnection:
+        conn = sqlite3.connect(
+            self.path,
+            factory=SharedSQLiteConnection,
+            cached_statements=self.cached_statements,
+            timeout=self.busy_timeout_ms / 1000.0,
+            # Tetap satu thread per koneksi; dimatikan hanya agar close_all() bisa menutupnya.
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def _check_fork(self) -> None:
+        # Koneksi SQLite tidak boleh dibawa melintasi fork(); buang milik proses induk.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._lock = threading.Lock()
+            self._connections = weakref.WeakSet()
+
+    def close_all(self) -> None:
+        """Tutup seluruh koneksi yang pernah dibuka (mis. saat shutdown)."""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections = weakref.WeakSet()
+        for conn in connections:
+            conn.close_for_real()
+        self._local = threading.local()
+
+
+__all__ = ["SharedSQLiteConnection", "SQLiteConnectionManager"]
@@ -0,0 +1,493 @@
+"""Verifikasi dari kamera / video dengan pemilihan keyframe.
+
+Staf konter cukup mengarahkan part ke webcam; server menerima frame (stream
+MJPEG atau frame satu per satu per sesi) dan:
+
+* mendekode QR di setiap frame (murah, sering langsung memberi kode part);
+* memilih keyframe dengan uji murah pada frame 160x120 grayscale - varians
+  Laplacian (ketajaman, ide yang sama dengan fallback CNN) dan selisih
+  absolut rata-rata terhadap frame sebelumnya (gerakan);
+* menjalankan CNN/OCR hanya pada keyframe;
+* menggabungkan verdict keyframe dengan voting berbobot confidence pada
+  jendela terakhir sehingga hasil stabil walau satu frame meleset.
+
+State sesi frame-per-frame disimpan di SQLite agar dibagi semua proses worker.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from sqlite_store import SQLiteConnectionManager
+
+VERDICT_PENDING = "MENUNGGU"
+VERDICT_AUTHENTIC = "ASLI"
+VERDICT_INVALID = "TIDAK VALID"
+
+_SOI = b"\xff\xd8"
+_EOI = b"\xff\xd9"
+
+SQLITE_STREAM_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS stream_sessions (
+        id             TEXT PRIMARY KEY,
+        client         TEXT,
+        kode_part      TEXT,
+        frames         INTEGER NOT NULL DEFAULT 0,
+        keyframes      INTEGER NOT NULL DEFAULT 0,
+        qr_codes       TEXT,
+        votes          TEXT,
+        last_keyframe  TEXT,
+        previous       BLOB,
+        since_keyframe INTEGER NOT NULL DEFAULT 0,
+        created_at     REAL NOT NULL,
+        updated_at     REAL NOT NULL,
+        busy_until     REAL NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_stream_sessions_client ON stream_sessions (client)",
+    "CREATE INDEX IF NOT EXISTS idx_stream_sessions_updated ON stream_sessions (updated_at)",
+)
+
+
+class StreamSessionNotFound(KeyError):
+    """Sesi stream tidak ada atau sudah kedaluwarsa."""
+
+
+class StreamSessionBusy(RuntimeError):
+    """Frame lain dari sesi yang sama sedang diproses (di worker mana pun)."""
+
+
+class StreamSessionLimit(RuntimeError):
+    """Batas sesi aktif tercapai; ``per_client`` membedakan batas per klien dari batas global."""
+
+    def __init__(self, message: str, *, per_client: bool) -> None:
+        super().__init__(message)
+        self.per_client = per_client
+
+
+def iter_jpeg_frames(stream, chunk_size: int = 64 * 1024, max_frame_bytes: int = 8 * 1024 * 1024) -> Iterator[bytes]:
+    """Pisahkan JPEG dari body MJPEG (``multipart/x-mixed-replace``) atau JPEG yang disambung.
+
+    Frame dicari lewat marker SOI/EOI sehingga boundary multipart diabaikan;
+    buffer yang melebihi ``max_frame_bytes`` tanpa EOI dibuang.
+    """
+    buffer = bytearray()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+        while True:
+            start = buffer.find(_SOI)
+            if start < 0:
+                del buffer[:-1]  # sisakan byte terakhir, mungkin awal marker
+                break
+            end = buffer.find(_EOI, start + 2)
+            if end < 0:
+                if start:
+                    del buffer[:start]
+                if len(buffer) > max_frame_bytes:
+                    buffer.clear()
+                break
+            yield bytes(buffer[start:end + 2])
+            del buffer[:end + 2]
+
+
+@dataclass
+class FrameStats:
+    sharpness: float
+    motion: Optional[float]
+    keyframe: bool
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "sharpness": round(self.sharpness, 2),
+            "motion": None if self.motion is None else round(self.motion, 2),
+            "keyframe": self.keyframe,
+        }
+
+
+class KeyframeSelector:
+    """Pilih frame tajam dan diam; minimal ``min_gap`` frame antar keyframe.
+
+    Frame dengan gerakan besar (part sedang diarahkan) dilewati; setelah
+    ``max_gap`` frame tanpa keyframe, frame tajam berikutnya tetap dipakai.
+    """
+
+    def __init__(
+        self,
+        sharpness_threshold: float = 60.0,
+        motion_threshold: float = 8.0,
+        min_gap: int = 5,
+        max_gap: int = 30,
+        analysis_size: Tuple[int, int] = (160, 120),
+    ) -> None:
+        self.sharpness_threshold = sharpness_threshold
+        self.motion_threshold = motion_threshold
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.analysis_size = analysis_size
+        self._previous: Optional[np.ndarray] = None
+        self._since_keyframe = max_gap
+
+    def evaluate(self, image: np.ndarray) -> FrameStats:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        small = cv2.resize(gray, self.analysis_size, interpolation=cv2.INTER_AREA)
+        sharpness = float(cv2.Laplacian(small, cv2.CV_64F).var())
+        motion = None
+        if self._previous is not None:
+            motion = float(cv2.absdiff(small, self._previous).mean())
+        self._previous = small
+        self._since_keyframe += 1
+
+        steady = motion is None or motion <= self.motion_threshold or self._since_keyframe >= self.max_gap
+        keyframe = (
+            sharpness >= self.sharpness_threshold
+            and steady
+            and self._since_keyframe >= self.min_gap
+        )
+        if keyframe:
+            self._since_keyframe = 0
+        return FrameStats(sharpness, motion, keyframe)
+
+    def snapshot(self) -> Tuple[Optional[bytes], int]:
+        """State yang perlu disimpan antar frame: frame analisis terakhir + jarak dari keyframe."""
+        previous = None if self._previous is None else self._previous.tobytes()
+        return previous, self._since_keyframe
+
+    def restore(self, previous: Optional[bytes], since_keyframe: int) -> None:
+        width, height = self.analysis_size
+        self._previous = None if previous is None else np.frombuffer(previous, dtype=np.uint8).reshape(height, width)
+        self._since_keyframe = since_keyframe
+
+
+@dataclass
+class KeyframeVerdict:
+    authentic: bool
+    confidence: float
+    matched_code: Optional[str]
+
+
+class TemporalVoter:
+    """Voting berbobot confidence atas ``window`` keyframe terakhir."""
+
+    def __init__(self, window: int = 7, min_votes: int = 3, agreement: float = 0.6) -> None:
+        self.window = window
+        self.min_votes = min_votes
+        self.agreement = agreement
+        self._votes: Deque[KeyframeVerdict] = deque(maxlen=window)
+
+    def add(self, verdict: KeyframeVerdict) -> None:
+        self._votes.append(verdict)
+
+    def __len__(self) -> int:
+        return len(self._votes)
+
+    @property
+    def votes(self) -> List[KeyframeVerdict]:
+        return list(self._votes)
+
+    def result(self) -> Dict[str, object]:
+        votes = list(self._votes)
+        codes = Counter(vote.matched_code for vote in votes if vote.matched_code)
+        matched_code = codes.most_common(1)[0][0] if codes else None
+        weights = np.array([max(vote.confidence, 1e-3) for vote in votes], dtype=np.float64)
+        authentic = np.array([vote.authentic for vote in votes], dtype=bool)
+        share = float(weights[authentic].sum() / weights.sum()) if len(votes) else 0.0
+
+        verdict = VERDICT_PENDING
+        if len(votes) >= self.min_votes:
+            if share >= self.agreement:
+                verdict = VERDICT_AUTHENTIC
+            elif share <= 1.0 - self.agreement:
+                verdict = VERDICT_INVALID
+        return {
+            "verdict": verdict,
+            "authentic_share": round(share, 3),
+            "votes": len(votes),
+            "matched_code": matched_code,
+            "confidence": round(float(weights.mean()), 3) if len(votes) else 0.0,
+        }
+
+
+@dataclass
+class StreamSession:
+    session_id: str
+    selector: KeyframeSelector
+    voter: TemporalVoter
+    kode_part: Optional[str] = None
+    frames: int = 0
+    keyframes: int = 0
+    qr_codes: Counter = field(default_factory=Counter)
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    last_keyframe: Optional[Dict[str, object]] = None
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "session_id": self.session_id,
+            "kode_part": self.kode_part,
+            "frames": self.frames,
+            "keyframes": self.keyframes,
+            "qr_codes": [code for code, _ in self.qr_codes.most_common()],
+            "last_keyframe": self.last_keyframe,
+            **self.voter.result(),
+        }
+
+
+class StreamVerifier:
+    """Proses frame demi frame: QR tiap frame, verifikasi penuh hanya di keyframe.
+
+    Sesi mode frame-per-frame disimpan di SQLite bersama (``store_path``)
+    sehingga frame berikutnya boleh mendarat di worker gunicorn mana pun:
+    state selector (frame analisis terakhir), voting, dan hitungan QR dibaca
+    sebelum frame diproses lalu ditulis kembali. Satu sesi hanya memproses
+    satu frame pada satu waktu (lease ``busy_until``); frame yang datang
+    bersamaan ditolak dengan :class:`StreamSessionBusy`. Sesi baru ditolak
+    (bukan menggusur sesi aktif) bila batas global atau per klien tercapai.
+
+    Args:
+        decode_qr: ``fungsi(frame) -> list kode QR``.
+        verify_keyframe: ``fungsi(frame, qr_codes, kode_part) -> dict`` dengan
+            minimal ``authentic``, ``confidence``, ``matched_code``.
+        store_path: file SQLite sesi (dibagi antar proses worker).
+        ttl: detik tanpa aktivitas sebelum sesi dibuang.
+        max_sessions: sesi aktif maksimum di semua worker.
+        max_sessions_per_client: sesi aktif maksimum per alamat klien.
+        frame_timeout: detik maksimum satu frame memegang sesi.
+        encode: serializer hasil keyframe (mis. ``app.json.dumps``).
+    """
+
+    def __init__(
+        self,
+        decode_qr: Callable[[np.ndarray], List[str]],
+        verify_keyframe: Callable[[np.ndarray, List[str], Optional[str]], Dict[str, object]],
+        *,
+        store_path: str,
+        sharpness_threshold: float = 60.0,
+        motion_threshold: float = 8.0,
+        min_gap: int = 5,
+        max_gap: int = 30,
+        window: int = 7,
+        min_votes: int = 3,
+        agreement: float = 0.6,
+        ttl: float = 300.0,
+        max_sessions: int = 64,
+        max_sessions_per_client: int = 4,
+        frame_timeout: float = 60.0,
+        encode: Callable[[object], str] = json.dumps,
+    ) -> None:
+        self.decode_qr = decode_qr
+        self.verify_keyframe = verify_keyframe
+        self.selector_options = {
+            "sharpness_threshold": sharpness_threshold,
+            "motion_threshold": motion_threshold,
+            "min_gap": min_gap,
+            "max_gap": max_gap,
+        }
+        self.voter_options = {"window": window, "min_votes": min_votes, "agreement": agreement}
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.max_sessions_per_client = max(1, max_sessions_per_client)
+        self.frame_timeout = frame_timeout
+        self.encode = encode
+        self.store = SQLiteConnectionManager(store_path, mmap_size=0)
+        self._schema_ready = False
+
+    def new_session(self, kode_part: Optional[str] = None) -> StreamSession:
+        """Sesi lokal untuk satu request (stream MJPEG); tidak disimpan di store."""
+        return StreamSession(
+            session_id=uuid.uuid4().hex,
+            selector=KeyframeSelector(**self.selector_options),
+            voter=TemporalVoter(**self.voter_options),
+            kode_part=kode_part,
+        )
+
+    def open_session(self, kode_part: Optional[str] = None, client: Optional[str] = None) -> StreamSession:
+        """Buat sesi frame-per-frame; :class:`StreamSessionLimit` bila batas tercapai."""
+        session = self.new_session(kode_part)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM stream_sessions WHERE updated_at < ?", (now - self.ttl,))
+            if client is not None:
+                owned = conn.execute("SELECT COUNT(*) FROM stream_sessions WHERE client = ?", (client,)).fetchone()[0]
+                if owned >= self.max_sessions_per_client:
+                    raise StreamSessionLimit(
+                        f"Maksimal {self.max_sessions_per_client} sesi stream aktif per klien", per_client=True
+                    )
+            if conn.execute("SELECT COUNT(*) FROM stream_sessions").fetchone()[0] >= self.max_sessions:
+                raise StreamSessionLimit(f"Sesi stream penuh ({self.max_sessions} sesi aktif)", per_client=False)
+            conn.execute(
+                "INSERT INTO stream_sessions (id, client, kode_part, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (session.session_id, client, kode_part, session.created_at, session.updated_at),
+            )
+            self._save(conn, session)
+        return session
+
+    def get(self, session_id: str) -> StreamSession:
+        conn = self._connect()
+        try:
+            row = self._fetch(conn, session_id)
+        finally:
+            conn.close()
+        return self._load(row)
+
+    def close(self, session_id: str) -> StreamSession:
+        with self._transaction() as conn:
+            session = self._load(self._fetch(conn, session_id))
+            conn.execute("DELETE FROM stream_sessions WHERE id = ?", (session_id,))
+        return session
+
+    def process_frame(self, session_id: str, frame: np.ndarray) -> Dict[str, object]:
+        """Proses satu frame sesi bersama: klaim sesi, baca state, proses, tulis kembali."""
+        now = time.time()
+        claimed = self._execute(
+            "UPDATE stream_sessions SET busy_until = ? WHERE id = ? AND updated_at >= ? AND busy_until < ?",
+            (now + self.frame_timeout, session_id, now - self.ttl, now),
+        )
+        if not claimed:
+            conn = self._connect()
+            try:
+                self._fetch(conn, session_id)  # StreamSessionNotFound bila tidak ada / kedaluwarsa
+            finally:
+                conn.close()
+            raise StreamSessionBusy("Frame sebelumnya masih diproses")
+        try:
+            session = self.get(session_id)
+            result = self.process(session, frame)
+            with self._transaction() as conn:
+                self._save(conn, session)
+            return result
+        finally:
+            self._execute("UPDATE stream_sessions SET busy_until = 0 WHERE id = ?", (session_id,))
+
+    def process(self, session: StreamSession, frame: np.ndarray) -> Dict[str, object]:
+        """Proses satu frame dan kembalikan umpan balik terkini untuk klien."""
+        with session.lock:
+            session.frames += 1
+            session.updated_at = time.time()
+            qr_codes = self.decode_qr(frame)
+            session.qr_codes.update(qr_codes)
+            stats = session.selector.evaluate(frame)
+
+            keyframe_result = None
+            if stats.keyframe:
+                session.keyframes += 1
+                known_codes = [code for code, _ in session.qr_codes.most_common()]
+                keyframe_result = self.verify_keyframe(frame, known_codes, session.kode_part)
+                session.voter.add(
+                    KeyframeVerdict(
+                        authentic=bool(keyframe_result.get("authentic")),
+                        confidence=float(keyframe_result.get("confidence") or 0.0),
+                        matched_code=keyframe_result.get("matched_code"),
+                    )
+                )
+                session.last_keyframe = keyframe_result
+
+            return {
+                "frame": session.frames,
+                **stats.to_dict(),
+                "qr_codes": qr_codes,
+                "keyframe_result": keyframe_result,
+                **session.voter.result(),
+            }
+
+    # ------------------------------------------------------------------
+    # Store
+    # ------------------------------------------------------------------
+    def _connect(self):
+        conn = self.store.connect()
+        if not self._schema_ready:
+            for statement in SQLITE_STREAM_DDL:
+                conn.execute(statement)
+            conn.commit()
+            self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _execute(self, sql: str, params: Tuple = ()) -> int:
+        conn = self._connect()
+        try:
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _fetch(self, conn, session_id: str):
+        row = conn.execute("SELECT * FROM stream_sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or row["updated_at"] < time.time() - self.ttl:
+            raise StreamSessionNotFound(session_id)
+        return row
+
+    def _load(self, row) -> StreamSession:
+        session = StreamSession(
+            session_id=row["id"],
+            selector=KeyframeSelector(**self.selector_options),
+            voter=TemporalVoter(**self.voter_options),
+            kode_part=row["kode_part"],
+            frames=row["frames"],
+            keyframes=row["keyframes"],
+            qr_codes=Counter(json.loads(row["qr_codes"] or "{}")),
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            last_keyframe=json.loads(row["last_keyframe"]) if row["last_keyframe"] else None,
+        )
+        session.selector.restore(row["previous"], row["since_keyframe"])
+        for authentic, confidence, matched_code in json.loads(row["votes"] or "[]"):
+            session.voter.add(KeyframeVerdict(bool(authentic), float(confidence), matched_code))
+        return session
+
+    def _save(self, conn, session: StreamSession) -> None:
+        previous, since_keyframe = session.selector.snapshot()
+        conn.execute(
+            "UPDATE stream_sessions SET frames = ?, keyframes = ?, qr_codes = ?, votes = ?, last_keyframe = ?, "
+            "previous = ?, since_keyframe = ?, updated_at = ? WHERE id = ?",
+            (
+                session.frames,
+                session.keyframes,
+                json.dumps(dict(session.qr_codes)),
+                json.dumps([[vote.authentic, vote.confidence, vote.matched_code] for vote in session.voter.votes]),
+                None if session.last_keyframe is None else self.encode(session.last_keyframe),
+                previous,
+                since_keyframe,
+                session.updated_at,
+                session.session_id,
+            ),
+        )
+
+
+__all__ = [
+    "KeyframeSelector",
+    "SQLITE_STREAM_DDL",
+    "StreamSession",
+    "StreamSessionBusy",
+    "StreamSessionLimit",
+    "StreamSessionNotFound",
+    "StreamVerifier",
+    "TemporalVoter",
+    "VERDICT_AUTHENTIC",
+    "VERDICT_INVALID",
+    "VERDICT_PENDING",
+    "iter_jpeg_frames",
+]
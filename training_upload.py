@@ -0,0 +1,733 @@
+"""Upload gambar training bertahap: spool ke disk, forward paralel ke backend PHP.
+
+Alur lama meneruskan seluruh batch dalam satu panggilan ``requests`` (body
+multipart dibangun utuh di memori) dan menahan thread request sampai transfer
+selesai. Di sini:
+
+1. Request Flask hanya menyimpan tiap file ke ``spool_dir/<upload_id>/``
+   (``FileStorage.save`` menyalin per blok) lalu langsung membalas 202.
+2. File dikelompokkan per ``chunk_files`` dan diteruskan oleh pool worker
+   terbatas sebagai body multipart yang di-stream dari disk
+   (:class:`MultipartStream`, ``Content-Length`` diketahui di muka).
+3. Status per file (byte terkirim, id gambar, error) disimpan di SQLite
+   ``spool_dir/uploads.db`` yang dibagi semua proses worker, sehingga batch
+   bisa dipolling dan dilanjutkan dari worker mana pun: file dengan ``key``
+   yang sama tidak dikirim ulang, file gagal bisa di-resume.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlite_store import SQLiteConnectionManager
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+QUEUED = "queued"
+UPLOADING = "uploading"
+DONE = "done"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+_FINISHED = (DONE, DUPLICATE)
+_STORE = "uploads.db"
+_READ_BLOCK = 64 * 1024
+
+
+SQLITE_UPLOAD_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS training_upload_batches (
+        upload_id  TEXT PRIMARY KEY,
+        kode_part  TEXT NOT NULL,
+        label      TEXT NOT NULL,
+        catatan    TEXT NOT NULL,
+        admin      TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS training_upload_files (
+        upload_id     TEXT NOT NULL,
+        file_key      TEXT NOT NULL,
+        position      INTEGER NOT NULL,
+        original_name TEXT NOT NULL,
+        spool_name    TEXT NOT NULL,
+        size          INTEGER NOT NULL,
+        status        TEXT NOT NULL,
+        bytes_sent    INTEGER NOT NULL DEFAULT 0,
+        image_id      INTEGER,
+        stored_name   TEXT,
+        error         TEXT,
+        owner         TEXT,
+        lease_until   REAL,
+        PRIMARY KEY (upload_id, file_key)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_training_upload_files_owner ON training_upload_files (owner, status)",
+    "CREATE INDEX IF NOT EXISTS idx_training_upload_batches_updated ON training_upload_batches (updated_at)",
+)
+
+
+class UploadNotFound(KeyError):
+    """``upload_id`` tidak dikenal atau sudah kedaluwarsa."""
+
+
+class MultipartStream:
+    """Body ``multipart/form-data`` yang dibaca bertahap dari file di disk.
+
+    Objek ini punya ``__len__`` dan ``read()``, sehingga ``requests`` mengirim
+    ``Content-Length`` dan men-stream isinya per blok tanpa membangun body utuh.
+
+    Args:
+        fields: field teks biasa.
+        files: ``(nama_field, nama_file, path, content_type)``.
+        on_progress: dipanggil ``(index_file, byte_terkirim_file)`` setiap blok.
+    """
+
+    def __init__(
+        self,
+        fields: Dict[str, str],
+        files: Sequence[Tuple[str, str, str, str]],
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        self.boundary = uuid.uuid4().hex
+        self.on_progress = on_progress
+        self._segments: List[object] = []
+        for name, value in fields.items():
+            self._segments.append(
+                self._part_header(f'name="{name}"', None) + str(value).encode("utf-8") + b"\r\n"
+            )
+        for index, (name, filename, path, content_type) in enumerate(files):
+            disposition = f'name="{name}"; filename="{filename}"'
+            self._segments.append(self._part_header(disposition, content_type))
+            self._segments.append((index, path, os.path.getsize(path)))
+            self._segments.append(b"\r\n")
+        self._segments.append(f"--{self.boundary}--\r\n".encode("ascii"))
+        self._length = sum(len(seg) if isinstance(seg, bytes) else seg[2] for seg in self._segments)
+        self._position = 0
+        self._handle = None
+        self._sent = 0
+
+    def _part_header(self, disposition: str, content_type: Optional[str]) -> bytes:
+        header = f"--{self.boundary}\r\nContent-Disposition: form-data; {disposition}\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        return (header + "\r\n").encode("utf-8")
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(_READ_BLOCK)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._length
+        out = bytearray()
+        while len(out) < size and self._position < len(self._segments):
+            segment = self._segments[self._position]
+            if isinstance(segment, bytes):
+                out += segment
+                self._position += 1
+                continue
+            index, path, _ = segment
+            if self._handle is None:
+                self._handle = open(path, "rb")
+                self._sent = 0
+            data = self._handle.read(size - len(out))
+            if data:
+                out += data
+                self._sent += len(data)
+                if self.on_progress is not None:
+                    self.on_progress(index, self._sent)
+                continue
+            self._handle.close()
+            self._handle = None
+            self._position += 1
+        return bytes(out)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+@dataclass
+class UploadFile:
+    key: str
+    original_name: str
+    spool_name: str
+    size: int
+    status: str = PENDING
+    bytes_sent: int = 0
+    image_id: Optional[int] = None
+    stored_name: Optional[str] = None  # nama file di backend (hash konten), sama seperti kolom ``filename``
+    error: Optional[str] = None
+
+
+@dataclass
+class UploadBatch:
+    upload_id: str
+    kode_part: str
+    label: str
+    catatan: str
+    admin: Dict[str, object]
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    files: Dict[str, UploadFile] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, object]:
+        counts = {status: 0 for status in (PENDING, QUEUED, UPLOADING, DONE, DUPLICATE, FAILED)}
+        for item in self.files.values():
+            counts[item.status] += 1
+        total_bytes = sum(item.size for item in self.files.values())
+        sent_bytes = sum(item.size if item.status in _FINISHED else item.bytes_sent for item in self.files.values())
+        return {
+            "upload_id": self.upload_id,
+            "kode_part": self.kode_part,
+            "label": self.label,
+            "total": len(self.files),
+            "uploaded": counts[DONE],
+            "duplicates": counts[DUPLICATE],
+            "failed": counts[FAILED],
+            "in_progress": counts[PENDING] + counts[QUEUED] + counts[UPLOADING],
+            "complete": counts[PENDING] + counts[QUEUED] + counts[UPLOADING] == 0,
+            "bytes_total": total_bytes,
+            "bytes_sent": sent_bytes,
+            "files": [
+                {
+                    "key": item.key,
+                    "name": item.original_name,
+                    "status": item.status,
+                    "size": item.size,
+                    "bytes_sent": item.size if item.status in _FINISHED else item.bytes_sent,
+                    "image_id": item.image_id,
+                    "error": item.error,
+                }
+                for item in self.files.values()
+            ],
+        }
+
+
+class TrainingUploadManager:
+    """Status batch upload di SQLite bersama + pool worker yang meneruskan chunk ke backend.
+
+    Status batch dan file disimpan di ``spool_dir/uploads.db`` (WAL, dibagi
+    antar proses worker gunicorn) dan dibaca ulang di setiap pemanggilan,
+    sehingga chunk lanjutan, polling progres, dan resume boleh mendarat di
+    worker mana pun. File yang sedang diproses dipegang ``owner`` (token per
+    proses) dengan lease yang diperpanjang thread heartbeat pemiliknya; file
+    baru dianggap terputus (``failed``) setelah lease-nya habis, bukan saat
+    proses lain kebetulan membaca batch.
+
+    Args:
+        spool_dir: folder penampung file sebelum diteruskan.
+        forward: ``forward(body, admin) -> payload`` yang mengirim
+            :class:`MultipartStream` ke backend dan mengembalikan JSON-nya;
+            harus melempar exception bila gagal.
+        chunk_files: jumlah file per request ke backend.
+        max_workers: jumlah request paralel ke backend.
+        ttl: detik sebelum batch yang tidak berubah dibuang dari spool.
+        perceptual_hash: ``fungsi(path) -> int | None`` (dHash) yang dikirim ke
+            backend agar near-duplicate per ``kode_part`` ditolak.
+        near_duplicate_distance: jarak Hamming maksimum yang dianggap duplikat
+            (0 menonaktifkan pengecekan near-duplicate).
+        on_stored: ``fungsi(batch, file, path_spool)`` dipanggil untuk tiap file yang
+            berhasil disimpan backend, sebelum file spool-nya dihapus.
+        lease_seconds: detik tanpa heartbeat sebelum file milik proses lain dianggap terputus.
+    """
+
+    def __init__(
+        self,
+        spool_dir: str,
+        forward: Callable[[MultipartStream, Dict[str, object]], Dict[str, object]],
+        *,
+        chunk_files: int = 10,
+        max_workers: int = 3,
+        ttl: float = 24 * 3600,
+        perceptual_hash: Optional[Callable[[str], Optional[int]]] = None,
+        near_duplicate_distance: int = 0,
+        on_stored: Optional[Callable[[UploadBatch, UploadFile, str], None]] = None,
+        lease_seconds: float = 60.0,
+    ) -> None:
+        self.spool_dir = spool_dir
+        self.forward = forward
+        self.chunk_files = max(1, chunk_files)
+        self.max_workers = max(1, max_workers)
+        self.ttl = ttl
+        self.perceptual_hash = perceptual_hash
+        self.near_duplicate_distance = near_duplicate_distance
+        self.on_stored = on_stored
+        self.lease_seconds = max(1.0, lease_seconds)
+        os.makedirs(spool_dir, exist_ok=True)
+        self.store = SQLiteConnectionManager(os.path.join(spool_dir, _STORE), mmap_size=0)
+        self._schema_ready = False
+        self._last_cleanup = 0.0
+        self._reset_process_state()
+
+    def _reset_process_state(self) -> None:
+        self._pid = os.getpid()
+        self._owner = f"{self._pid}:{uuid.uuid4().hex[:12]}"
+        self._lock = threading.RLock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self._inflight = 0
+        self._progress_flushed: Dict[str, float] = {}
+
+    # ------------------------------------------------------------------
+    # Batch
+    # ------------------------------------------------------------------
+    def open_batch(
+        self,
+        upload_id: Optional[str],
+        kode_part: str,
+        label: str,
+        catatan: str,
+        admin: Dict[str, object],
+    ) -> UploadBatch:
+        """Ambil batch lama (untuk melanjutkan) atau buat batch baru."""
+        self._maybe_cleanup()
+        if upload_id:
+            batch = self.get(upload_id)
+            if (batch.kode_part, batch.label) != (kode_part, label):
+                raise ValueError("Kode part/label berbeda dengan batch upload yang dilanjutkan")
+            return batch
+        batch = UploadBatch(
+            upload_id=uuid.uuid4().hex,
+            kode_part=kode_part,
+            label=label,
+            catatan=catatan,
+            admin=dict(admin),
+        )
+        os.makedirs(self._batch_dir(batch.upload_id), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO training_upload_batches (upload_id, kode_part, label, catatan, admin, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    batch.upload_id, batch.kode_part, batch.label, batch.catatan,
+                    json.dumps(batch.admin), batch.created_at, batch.updated_at,
+                ),
+            )
+        return batch
+
+    def add_files(self, batch: UploadBatch, uploads: Iterable[Tuple[Optional[str], str, object]]) -> Dict[str, int]:
+        """Spool ``(key, nama_aman, FileStorage)`` ke disk; key yang sudah ada dilewati."""
+        accepted = skipped = 0
+        batch_dir = self._batch_dir(batch.upload_id)
+        for key, filename, file_storage in uploads:
+            key = key or f"{filename}:{uuid.uuid4().hex[:8]}"
+            existing = self._fetch_file(batch.upload_id, key)
+            if existing is not None and existing["status"] != FAILED:
+                skipped += 1
+                continue
+            # Simpan dulu ke nama sementara; nama akhir baru dipesan di dalam transaksi
+            # agar dua worker yang menerima chunk batch yang sama tidak bentrok.
+            tmp_path = os.path.join(batch_dir, f".{uuid.uuid4().hex}.part")
+            file_storage.save(tmp_path)
+            now = time.time()
+            with self._transaction() as conn:
+                existing = conn.execute(
+                    "SELECT status, spool_name FROM training_upload_files WHERE upload_id = ? AND file_key = ?",
+                    (batch.upload_id, key),
+                ).fetchone()
+                if existing is not None and existing["status"] != FAILED:
+                    spool_name = None
+                elif existing is not None:
+                    spool_name = existing["spool_name"]
+                    conn.execute(
+                        "UPDATE training_upload_files SET original_name = ?, size = ?, status = ?, bytes_sent = 0, "
+                        "error = NULL, owner = ?, lease_until = ? WHERE upload_id = ? AND file_key = ?",
+                        (filename, os.path.getsize(tmp_path), PENDING, self._owner, now + self.lease_seconds,
+                         batch.upload_id, key),
+                    )
+                else:
+                    position = conn.execute(
+                        "SELECT COALESCE(MAX(position) + 1, 0) FROM training_upload_files WHERE upload_id = ?",
+                        (batch.upload_id,),
+                    ).fetchone()[0]
+                    spool_name = f"{position:05d}_{filename}"
+                    conn.execute(
+                        "INSERT INTO training_upload_files (upload_id, file_key, position, original_name, spool_name, "
+                        "size, status, owner, lease_until) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (batch.upload_id, key, position, filename, spool_name, os.path.getsize(tmp_path),
+                         PENDING, self._owner, now + self.lease_seconds),
+                    )
+                if spool_name is not None:
+                    os.replace(tmp_path, os.path.join(batch_dir, spool_name))
+                    conn.execute(
+                        "UPDATE training_upload_batches SET updated_at = ? WHERE upload_id = ?",
+                        (now, batch.upload_id),
+                    )
+            if spool_name is None:
+                os.remove(tmp_path)
+                skipped += 1
+            else:
+                accepted += 1
+        return {"accepted": accepted, "skipped": skipped}
+
+    def schedule(self, batch: UploadBatch) -> None:
+        """Klaim file ``pending`` batch ini lalu antrikan dalam chunk ke pool worker."""
+        now = time.time()
+        with self._transaction() as conn:
+            keys = [
+                row["file_key"]
+                for row in conn.execute(
+                    "SELECT file_key FROM training_upload_files WHERE upload_id = ? AND status = ? ORDER BY position",
+                    (batch.upload_id, PENDING),
+                )
+            ]
+            conn.executemany(
+                "UPDATE training_upload_files SET status = ?, owner = ?, lease_until = ? "
+                "WHERE upload_id = ? AND file_key = ?",
+                [(QUEUED, self._owner, now + self.lease_seconds, batch.upload_id, key) for key in keys],
+            )
+        if not keys:
+            return
+        current = self.get(batch.upload_id)
+        pending = [current.files[key] for key in keys]
+        executor = self._get_executor()
+        with self._lock:
+            self._inflight += len(pending)
+        for start in range(0, len(pending), self.chunk_files):
+            executor.submit(self._forward_chunk, current, pending[start:start + self.chunk_files])
+
+    def resume(self, upload_id: str) -> UploadBatch:
+        """Antrikan ulang file yang gagal (dan yang terputus karena restart)."""
+        batch = self.get(upload_id)
+        retry = [
+            item.key for item in batch.files.values()
+            if item.status == FAILED and os.path.exists(self._spool_path(batch, item))
+        ]
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE training_upload_files SET status = ?, error = NULL, bytes_sent = 0, owner = ?, lease_until = ? "
+                "WHERE upload_id = ? AND file_key = ? AND status = ?",
+                [(PENDING, self._owner, now + self.lease_seconds, upload_id, key, FAILED) for key in retry],
+            )
+        self.schedule(batch)
+        return self.get(upload_id)
+
+    def get(self, upload_id: str) -> UploadBatch:
+        """Baca snapshot batch terbaru dari store bersama."""
+        self._expire_stale(upload_id)
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT * FROM training_upload_batches WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+            if row is None:
+                raise UploadNotFound(upload_id)
+            rows = conn.execute(
+                "SELECT * FROM training_upload_files WHERE upload_id = ? ORDER BY position", (upload_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        batch = UploadBatch(
+            upload_id=row["upload_id"],
+            kode_part=row["kode_part"],
+            label=row["label"],
+            catatan=row["catatan"],
+            admin=json.loads(row["admin"]),
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+        for file_row in rows:
+            batch.files[file_row["file_key"]] = self._file_from_row(file_row)
+        return batch
+
+    def progress(self, upload_id: str) -> Dict[str, object]:
+        return self.get(upload_id).summary()
+
+    def cleanup(self, now: Optional[float] = None) -> None:
+        """Buang batch yang tidak aktif melewati TTL beserta file spool-nya."""
+        now = now or time.time()
+        with self._transaction() as conn:
+            expired = [
+                row["upload_id"]
+                for row in conn.execute(
+                    "SELECT upload_id FROM training_upload_batches b WHERE updated_at < ? AND NOT EXISTS ("
+                    "SELECT 1 FROM training_upload_files f WHERE f.upload_id = b.upload_id "
+                    "AND f.status IN (?, ?, ?) AND f.lease_until >= ?)",
+                    (now - self.ttl, PENDING, QUEUED, UPLOADING, now),
+                )
+            ]
+            for upload_id in expired:
+                conn.execute("DELETE FROM training_upload_files WHERE upload_id = ?", (upload_id,))
+                conn.execute("DELETE FROM training_upload_batches WHERE upload_id = ?", (upload_id,))
+        for upload_id in expired:
+            shutil.rmtree(self._batch_dir(upload_id), ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _forward_chunk(self, batch: UploadBatch, items: List[UploadFile]) -> None:
+        for item in items:
+            item.status = UPLOADING
+            item.bytes_sent = 0
+        self._update_files(batch.upload_id, items)
+
+        def on_progress(index: int, sent: int) -> None:
+            with self._lock:
+                items[index].bytes_sent = sent
+                # Tulis ke store paling sering sekali per detik per batch, bukan setiap blok 64 KiB.
+                now = time.monotonic()
+                if now - self._progress_flushed.get(batch.upload_id, 0.0) < 1.0:
+                    return
+                self._progress_flushed[batch.upload_id] = now
+            self._update_progress(batch.upload_id, items[index])
+
+        fields = {"kode_part": batch.kode_part, "label": batch.label, "catatan": batch.catatan}
+        if self.perceptual_hash is not None:
+            fields["near_duplicate_distance"] = str(self.near_duplicate_distance)
+            for item in items:
+                try:
+                    value = self.perceptual_hash(self._spool_path(batch, item))
+                except Exception as exc:  # noqa: BLE001 - hash hanya pelengkap
+                    logger.debug("dHash %s gagal: %s", item.spool_name, exc)
+                    value = None
+                if value is not None:
+                    fields[f"perceptual_hash[{item.spool_name}]"] = f"{value:016x}"
+
+        body = MultipartStream(
+            fields,
+            [
+                (
+                    "images[]",
+                    item.spool_name,
+                    self._spool_path(batch, item),
+                    mimetypes.guess_type(item.spool_name)[0] or "application/octet-stream",
+                )
+                for item in items
+            ],
+            on_progress=on_progress,
+        )
+        finished: List[UploadFile] = []
+        try:
+            payload = self.forward(body, batch.admin)
+        except Exception as exc:  # noqa: BLE001 - status per file, batch lain tetap jalan
+            logger.warning("Forward upload %s gagal: %s", batch.upload_id, exc)
+            for item in items:
+                item.status = FAILED
+                item.error = str(exc)
+        else:
+            stored = {entry.get("original_name"): entry for entry in payload.get("files", [])}
+            duplicates = {entry.get("original_name"): entry for entry in payload.get("duplicates", [])}
+            for item in items:
+                entry = stored.get(item.spool_name)
+                duplicate = duplicates.get(item.spool_name)
+                if duplicate is not None:
+                    item.status = DUPLICATE
+                    item.image_id = duplicate.get("match_id")
+                    item.error = (
+                        "Gambar identik sudah ada"
+                        if duplicate.get("reason") == "duplicate"
+                        else f"Mirip gambar #{duplicate.get('match_id')} (jarak {duplicate.get('distance')})"
+                    )
+                elif entry is None:
+                    item.status = FAILED
+                    item.error = "Ditolak backend (format atau ukuran tidak valid)"
+                    continue
+                else:
+                    item.status = DONE
+                    item.image_id = entry.get("id")
+                    item.stored_name = entry.get("filename")
+                finished.append(item)
+            for item in finished:
+                if item.status == DONE:
+                    self._notify_stored(batch, item)
+        finally:
+            body.close()
+            try:
+                self._update_files(batch.upload_id, items)
+            except Exception as exc:  # noqa: BLE001 - lease habis, file tampil terputus
+                logger.warning("Gagal menyimpan status upload %s: %s", batch.upload_id, exc)
+            with self._lock:
+                self._inflight -= len(items)
+        for item in finished:
+            try:
+                os.remove(self._spool_path(batch, item))
+            except OSError:
+                pass
+
+    def _notify_stored(self, batch: UploadBatch, item: UploadFile) -> None:
+        if self.on_stored is None:
+            return
+        try:
+            self.on_stored(batch, item, self._spool_path(batch, item))
+        except Exception as exc:  # noqa: BLE001 - hook tidak boleh menggagalkan upload
+            logger.warning("Hook on_stored untuk %s gagal: %s", item.spool_name, exc)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._pid != os.getpid():
+            # Pool, heartbeat, dan token owner tidak ikut ter-fork dengan benar: buat ulang di proses anak.
+            self._reset_process_state()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="training-upload")
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(
+                    target=self._heartbeat_loop, name="training-upload-lease", daemon=True
+                )
+                self._heartbeat.start()
+            return self._executor
+
+    def _heartbeat_loop(self) -> None:
+        owner = self._owner
+        while owner == self._owner:
+            time.sleep(self.lease_seconds / 3)
+            with self._lock:
+                if self._inflight <= 0:
+                    continue
+            try:
+                self._execute(
+                    "UPDATE training_upload_files SET lease_until = ? WHERE owner = ? AND status IN (?, ?, ?)",
+                    (time.time() + self.lease_seconds, owner, PENDING, QUEUED, UPLOADING),
+                )
+            except Exception as exc:  # noqa: BLE001 - dicoba lagi pada putaran berikutnya
+                logger.warning("Gagal memperpanjang lease upload: %s", exc)
+
+    # ------------------------------------------------------------------
+    # Store
+    # ------------------------------------------------------------------
+    def _batch_dir(self, upload_id: str) -> str:
+        return os.path.join(self.spool_dir, upload_id)
+
+    def _spool_path(self, batch: UploadBatch, item: UploadFile) -> str:
+        return os.path.join(self._batch_dir(batch.upload_id), item.spool_name)
+
+    def _connect(self):
+        conn = self.store.connect()
+        if not self._schema_ready:
+            for statement in SQLITE_UPLOAD_DDL:
+                conn.execute(statement)
+            conn.commit()
+            self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Transaksi ``BEGIN IMMEDIATE``: klaim file diserialisasi antar proses worker."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _execute(self, sql: str, params: Tuple = ()) -> int:
+        conn = self._connect()
+        try:
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _fetch_file(self, upload_id: str, key: str):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT * FROM training_upload_files WHERE upload_id = ? AND file_key = ?", (upload_id, key)
+            ).fetchone()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _file_from_row(row) -> UploadFile:
+        return UploadFile(
+            key=row["file_key"],
+            original_name=row["original_name"],
+            spool_name=row["spool_name"],
+            size=row["size"],
+            status=row["status"],
+            bytes_sent=row["bytes_sent"],
+            image_id=row["image_id"],
+            stored_name=row["stored_name"],
+            error=row["error"],
+        )
+
+    def _update_files(self, upload_id: str, items: Sequence[UploadFile]) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE training_upload_files SET status = ?, bytes_sent = ?, image_id = ?, stored_name = ?, "
+                "error = ?, owner = ?, lease_until = ? WHERE upload_id = ? AND file_key = ?",
+                [
+                    (
+                        item.status, item.bytes_sent, item.image_id, item.stored_name, item.error,
+                        self._owner if item.status == UPLOADING else None,
+                        now + self.lease_seconds if item.status == UPLOADING else None,
+                        upload_id, item.key,
+                    )
+                    for item in items
+                ],
+            )
+            conn.execute(
+                "UPDATE training_upload_batches SET updated_at = ? WHERE upload_id = ?", (now, upload_id)
+            )
+
+    def _update_progress(self, upload_id: str, item: UploadFile) -> None:
+        try:
+            self._execute(
+                "UPDATE training_upload_files SET bytes_sent = ? WHERE upload_id = ? AND file_key = ? AND owner = ?",
+                (item.bytes_sent, upload_id, item.key, self._owner),
+            )
+        except Exception as exc:  # noqa: BLE001 - progres hanya informasi
+            logger.debug("Gagal menyimpan progres upload %s: %s", upload_id, exc)
+
+    def _expire_stale(self, upload_id: str) -> None:
+        """Tandai gagal file yang lease pemiliknya habis (proses berhenti di tengah transfer)."""
+        self._execute(
+            "UPDATE training_upload_files SET status = ?, error = ?, owner = NULL, lease_until = NULL "
+            "WHERE upload_id = ? AND status IN (?, ?, ?) AND lease_until < ?",
+            (FAILED, "Terputus, silakan lanjutkan upload", upload_id, PENDING, QUEUED, UPLOADING, time.time()),
+        )
+
+    def _maybe_cleanup(self) -> None:
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+        try:
+            self.cleanup(now)
+        except Exception as exc:  # noqa: BLE001 - pembersihan berikutnya akan mencoba lagi
+            logger.warning("Gagal membersihkan batch upload: %s", exc)
+
+
+__all__ = [
+    "DONE",
+    "DUPLICATE",
+    "FAILED",
+    "MultipartStream",
+    "PENDING",
+    "QUEUED",
+    "SQLITE_UPLOAD_DDL",
+    "TrainingUploadManager",
+    "UPLOADING",
+    "UploadBatch",
+    "UploadFile",
+    "UploadNotFound",
+]
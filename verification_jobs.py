@@ -0,0 +1,295 @@
+"""Mode async verifikasi foto: upload diterima, dikerjakan worker lokal, hasil diambil belakangan.
+
+Klien mobile yang lambat tidak lagi menahan thread request selama pipeline
+CNN/QR/OCR berjalan:
+
+1. request hanya memvalidasi gambar lalu :meth:`VerificationJobQueue.submit`
+   byte terkompresinya (decode ulang di worker) dan langsung membalas 202
+   berisi ``job_id``;
+2. pool worker terbatas (``ThreadPoolExecutor``) di proses yang sama
+   menjalankan ``handler``;
+3. status + hasil disimpan di SQLite lokal (WAL) sehingga bisa dipolling atau
+   diikuti lewat Server-Sent Events dari worker gunicorn mana pun - tanpa broker.
+
+Job yang terlalu lama antre (``job_ttl``) ditandai ``expired`` tanpa dijalankan;
+baris job dihapus ``result_ttl`` detik setelah selesai.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from sqlite_store import SQLiteConnectionManager
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_EXPIRED = "expired"
+
+FINAL_STATES = (JOB_DONE, JOB_FAILED, JOB_EXPIRED)
+
+SQLITE_JOB_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS verification_jobs (
+        id          TEXT PRIMARY KEY,
+        kind        TEXT NOT NULL,
+        state       TEXT NOT NULL,
+        created_at  REAL NOT NULL,
+        updated_at  REAL NOT NULL,
+        expires_at  REAL NOT NULL,
+        http_status INTEGER,
+        result      TEXT,
+        error       TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_verification_jobs_expires ON verification_jobs (expires_at)",
+)
+
+
+class JobNotFound(KeyError):
+    """``job_id`` tidak dikenal atau hasilnya sudah kedaluwarsa."""
+
+
+class JobQueueFull(RuntimeError):
+    """Antrean job lokal penuh."""
+
+
+class VerificationJobQueue:
+    """Antrean job lokal + penyimpanan status di SQLite.
+
+    Args:
+        handler: ``fungsi(payload) -> (body_json, http_status)`` yang dijalankan worker.
+        store_path: file SQLite status job (dibagi antar proses worker).
+        workers: jumlah job yang diproses bersamaan per proses.
+        max_pending: job antre + berjalan maksimum per proses sebelum :class:`JobQueueFull`.
+        job_ttl: detik maksimum job menunggu worker sebelum ``expired``.
+        result_ttl: detik hasil disimpan setelah job selesai.
+        encode: serializer hasil (mis. ``app.json.dumps`` agar sama dengan ``jsonify``).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, object]], Tuple[Dict[str, object], int]],
+        *,
+        store_path: str,
+        workers: int = 2,
+        max_pending: int = 64,
+        job_ttl: float = 300.0,
+        result_ttl: float = 600.0,
+        encode: Callable[[object], str] = json.dumps,
+    ) -> None:
+        self.handler = handler
+        self.store = SQLiteConnectionManager(store_path, mmap_size=0)
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.job_ttl = job_ttl
+        self.result_ttl = result_ttl
+        self.encode = encode
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._events: Dict[str, threading.Event] = {}
+        self._pid = os.getpid()
+        self._schema_ready = False
+        self._last_cleanup = 0.0
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    def submit(self, payload: Dict[str, object], kind: str = "verify_image") -> Dict[str, object]:
+        """Antrikan ``payload``; melempar :class:`JobQueueFull` bila antrean penuh."""
+        self._check_fork()
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"Antrean verifikasi penuh ({self.max_pending} job)")
+            self._pending += 1
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            self._execute(
+                "INSERT INTO verification_jobs (id, kind, state, created_at, updated_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, JOB_QUEUED, now, now, now + self.job_ttl + self.result_ttl),
+            )
+            with self._lock:
+                self._events[job_id] = threading.Event()
+            self._get_executor().submit(self._run, job_id, payload, now)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self._events.pop(job_id, None)
+            raise
+        self._maybe_cleanup(now)
+        return {"job_id": job_id, "state": JOB_QUEUED, "created_at": now}
+
+    def get(self, job_id: str) -> Dict[str, object]:
+        row = self._fetch(job_id)
+        if row is None or row["expires_at"] < time.time():
+            raise JobNotFound(job_id)
+        job: Dict[str, object] = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "state": row["state"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+        if row["state"] in FINAL_STATES:
+            job["http_status"] = row["http_status"]
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+            job["error"] = row["error"]
+        return job
+
+    def wait(self, job_id: str, timeout: float, poll_interval: float = 0.5) -> Dict[str, object]:
+        """Tunggu sampai state job berubah dari yang sekarang (atau ``timeout``)."""
+        job = self.get(job_id)
+        deadline = time.monotonic() + timeout
+        while job["state"] not in FINAL_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with self._lock:
+                event = self._events.get(job_id)
+            if event is not None:
+                event.wait(min(remaining, poll_interval))  # job milik proses ini: dibangunkan lebih cepat
+            else:
+                time.sleep(min(remaining, poll_interval))  # job di worker lain: polling SQLite
+            current = self.get(job_id)
+            if current["state"] != job["state"]:
+                return current
+        return job
+
+    def iter_updates(self, job_id: str, timeout: float, heartbeat: float = 15.0) -> Iterator[Optional[Dict[str, object]]]:
+        """Yield status job setiap berubah sampai final; ``None`` = heartbeat (untuk SSE)."""
+        job = self.get(job_id)
+        yield job
+        deadline = time.monotonic() + timeout
+        while job["state"] not in FINAL_STATES and time.monotonic() < deadline:
+            current = self.wait(job_id, min(heartbeat, max(deadline - time.monotonic(), 0.0)))
+            if current["state"] == job["state"]:
+                yield None
+                continue
+            job = current
+            yield job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pending": self._pending, "workers": self.workers, "max_pending": self.max_pending}
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """Hapus job yang hasilnya sudah kedaluwarsa."""
+        return self._execute("DELETE FROM verification_jobs WHERE expires_at < ?", (now or time.time(),))
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _run(self, job_id: str, payload: Dict[str, object], enqueued_at: float) -> None:
+        try:
+            if time.time() - enqueued_at > self.job_ttl:
+                self._finish(job_id, JOB_EXPIRED, None, None, "Job terlalu lama menunggu worker")
+                return
+            self._update_state(job_id, JOB_RUNNING)
+            try:
+                body, http_status = self.handler(payload)
+                encoded = self.encode(body)
+            except Exception as exc:  # noqa: BLE001 - dicatat sebagai job gagal
+                logger.exception("Job verifikasi %s gagal", job_id)
+                self._finish(job_id, JOB_FAILED, 500, None, str(exc))
+            else:
+                self._finish(job_id, JOB_DONE, http_status, encoded, None)
+        except Exception as exc:  # noqa: BLE001 - store tidak boleh mematikan worker
+            logger.warning("Gagal memperbarui status job %s: %s", job_id, exc)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                event = self._events.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+    def _update_state(self, job_id: str, state: str) -> None:
+        self._execute(
+            "UPDATE verification_jobs SET state = ?, updated_at = ? WHERE id = ?",
+            (state, time.time(), job_id),
+        )
+        with self._lock:
+            event = self._events.get(job_id)
+            if event is not None:
+                # bangunkan penunggu lalu siapkan event baru untuk perubahan berikutnya
+                self._events[job_id] = threading.Event()
+        if event is not None:
+            event.set()
+
+    def _finish(self, job_id: str, state: str, http_status: Optional[int], result: Optional[str], error: Optional[str]) -> None:
+        now = time.time()
+        self._execute(
+            "UPDATE verification_jobs SET state = ?, updated_at = ?, expires_at = ?, http_status = ?, "
+            "result = ?, error = ? WHERE id = ?",
+            (state, now, now + self.result_ttl, http_status, result, error, job_id),
+        )
+
+    # ------------------------------------------------------------------
+    # Store
+    # ------------------------------------------------------------------
+    def _execute(self, sql: str, params: Tuple = (), *, fetch: bool = False):
+        """Jalankan satu statement; ``fetch=True`` mengembalikan baris pertama, selain itu ``rowcount``."""
+        conn = self.store.connect()
+        try:
+            if not self._schema_ready:
+                for statement in SQLITE_JOB_DDL:
+                    conn.execute(statement)
+                self._schema_ready = True
+            cursor = conn.execute(sql, params)
+            if fetch:
+                return cursor.fetchone()
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _fetch(self, job_id: str):
+        return self._execute("SELECT * FROM verification_jobs WHERE id = ?", (job_id,), fetch=True)
+
+    def _maybe_cleanup(self, now: float) -> None:
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+        try:
+            self.cleanup(now)
+        except Exception as exc:  # noqa: BLE001 - pembersihan berikutnya akan mencoba lagi
+            logger.warning("Gagal membersihkan job verifikasi: %s", exc)
+
+    def _check_fork(self) -> None:
+        if self._pid != os.getpid():
+            # Thread pool dan job milik proses induk tidak ikut ter-fork.
+            self._pid = os.getpid()
+            self._lock = threading.Lock()
+            self._executor = None
+            self._pending = 0
+            self._events = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="verify-job")
+            return self._executor
+
+
+__all__ = [
+    "FINAL_STATES",
+    "JOB_DONE",
+    "JOB_EXPIRED",
+    "JOB_FAILED",
+    "JOB_QUEUED",
+    "JOB_RUNNING",
+    "JobNotFound",
+    "JobQueueFull",
+    "VerificationJobQueue",
+]
@@ -0,0 +1,6 @@
+"""Entry point WSGI untuk server pre-fork: ``gunicorn -c gunicorn.conf.py wsgi:application``."""
+from app import create_app
+
+application = create_app()
+
+__all__ = ["application"]